@@ -11,12 +11,29 @@ sys.stdout = io.TextIOWrapper(sys.stdout.buffer, encoding='utf-8')
 sys.stderr = io.TextIOWrapper(sys.stderr.buffer, encoding='utf-8')
 
 import json
+import gzip
 import hashlib
 import xml.etree.ElementTree as ET
 from datetime import datetime, timezone
 import time
 import os
 import re
+from concurrent.futures import ThreadPoolExecutor
+
+# spz_common.py sits next to the other scrapers, one level up when this runs from spz-rss-scraper/
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from spz_common import (
+    use_config, build_keyword_trie, match_keywords, canonical_url, format_rfc2822,
+    parse_pub_date, escape_xml, accept_encoding, transfer_stats, write_precompressed, SPZ_NS,
+    collect_json, skipped_elements, iso_date, save_json_outputs, load_media_cache,
+    save_media_cache, probe_media, load_media_store, proxy_media, save_media_store,
+    report_image_dupes, save_throttle, throttled_get, open_cpu_pool, run_in_pool, index_items,
+    archive_items, read_archive, parse_window, load_health, save_health, is_quarantined,
+    record_health, print_health_summary, schedule_sources, out_of_time, record_deadline_skip,
+    MEMORY_BUDGET_EXIT, start_memory_profile, memory_source, memory_stage,
+    finish_memory_profile, emit_breaking, load_budget, budget_reached, add_to_budget,
+    print_budget
+)
 
 # Israeli News RSS Feeds
 ISRAELI_FEEDS = [
@@ -70,40 +87,168 @@ CONFIG = {
     "score_threshold": 6,
     "timeout": 8,
     "content_timeout": 4,
+    "user_agent": "Mozilla/5.0",
     "max_summary_length": 300,
     "fetch_full_content": False,
     "extract_images": False,
     "output_dir": "spz-feeds/",
-    "delay_between_requests": 1.0,      # Reduced from 3.0
-    "delay_between_feeds": 2.0,         # Reduced from 4.0
+    "throttle_file": "spz-throttle.json",  # Per-host request state, shared by all scrapers
+    "throttle_rate": 1.0,               # Requests per second per host once the burst is spent
+    "throttle_burst": 3,
+    "throttle_retries": 2,              # Retries after a 429/5xx, each after the host's backoff
+    "throttle_backoff_base": 2,         # Seconds; doubles per failure, with jitter
+    "throttle_backoff_max": 600,
+    "throttle_max_wait": 30,            # Fail a request instead of waiting longer than this
+    "throttle_state_ttl": 3600,         # Forget a host's backoff and bucket after an hour
+    "max_total_time": 540,              # Fetch deadline, under run_scraper's 600s kill
+    "probe_media": False,               # HEAD-probe enclosures for real type/length
+    "media_probe_workers": 8,
+    "media_probe_timeout": 5,
+    "media_cache_file": "spz-media-cache.json",
+    "media_cache_ttl_hours": 24 * 30,
+    "media_probe_retry_hours": 6,       # Failed probes wait this long before being tried again
+    "media_proxy_base_url": None,       # Public URL of media_proxy_dir, e.g. "http://host:8080/media/" (None to disable)
+    "media_proxy_dir": "spz-feeds/media/",  # Thumbnail store shared by the scrapers, served by spz-feed-server.py
+    "media_proxy_max_bytes": 200 * 1024 * 1024,
+    "media_proxy_max_download": 20 * 1024 * 1024,  # Originals larger than this keep their remote URL
+    "media_proxy_workers": 8,
+    "media_thumb_size": 640,            # Longest side of a thumbnail, in px
+    "media_thumb_quality": 70,
+    "media_dhash_distance": 6,          # Bits of 64 two images may differ by and still count as one
+    "memory_budget_mb": None,           # Fail a --profile-memory run whose peak RSS passes this
+    "memory_top_sites": 8,              # Allocation sites listed per stage
+    "memory_report_file": "spz-rss-memory.json",  # Written by --profile-memory runs
+    "page_cache_dir": "spz-page-cache/",  # Shared article page cache (None to disable)
+    "page_cache_max_bytes": 50 * 1024 * 1024,
+    "precompress_outputs": False,       # Also write .xml.gz / .xml.br next to each feed
+    "index_db": "spz-index.db",         # Local full-text index (None to disable)
+    "index_retention_days": 30,
+    "archive_dir": "spz-archive/",      # Day-partitioned item archive (None to disable)
+    "health_file": "spz-rss-health.json",
+    "quarantine_after": 3,              # Consecutive failures before a feed is skipped
+    "quarantine_base": 3600,            # First re-probe after 1h, doubling per failed probe
+    "quarantine_max": 48 * 3600,
+    "health_latency_samples": 50,
+    "upload_workers": 4,                # Parallel catbox uploads
+    "cpu_workers": 0,                   # Processes for parse/score/render (0 = inline, e.g. 2-3 on a spare multi-core host)
+    "upload_timeout": 60,
+    "upload_map_file": "spz-catbox-urls.json",  # sha256 of feed bytes -> catbox URL
+    "xml_parser": "auto",               # "lxml" (recover mode), "etree", or auto = lxml if installed
+    "breaking_threshold": 9,            # Relevancy meter score (1-10) for the fast lane (None to disable)
+    "breaking_file": "breaking.xml",
+    "breaking_store_file": "spz-breaking.json",  # Shared by all scrapers
+    "breaking_max_items": 30,
+    "breaking_max_age_hours": 24,
+    "breaking_hook": None,              # Argv per item: JSON on stdin, alert text in $SPZ_ALERT
+    "breaking_webhook": None,           # URL to POST each item to as JSON
+    "breaking_publish_cmd": None,       # Argv, run for the first breaking batch of a run
+    "budget_file": "spz-shared/data/relevancy-budget.json",
+    "budget_window_hours": 4,
+    "budget_limit": 200,                # Accumulated meter score that ends the window (None to disable)
+    "budget_skip_priorities": ["low"],
 }
+use_config(CONFIG)
 
 # Ensure output directory exists
 os.makedirs(CONFIG['output_dir'], exist_ok=True)
 
+# POSITIVE: Israel/Jewish context keywords (always allow)
+ISRAEL_CONTEXT_KEYWORDS = [
+    'israel', 'israeli', 'israelis', 'gaza', 'palestine', 'palestinian', 
+    'idf', 'jerusalem', 'netanyahu', 'tel aviv', 'hamas', 
+    'jew', 'jewish', 'jews', 'zionist', 'zionism', 'judaism', 'rabbi',
+    'yom kippur', 'rosh hashanah', 'passover', 'hanukkah', 'shabbat',
+    # Israeli celebrities/politicians
+    'gal gadot', 'natalie portman', 'bar refaeli', 'yair lapid', 
+    'benjamin netanyahu', 'benny gantz', 'naftali bennett',
+    'mossad', 'shin bet', 'knesset', 'aliyah', 'diaspora'
+]
 
-def generate_article_id(url):
-    """Generate unique ID from URL"""
-    return hashlib.md5(url.encode()).hexdigest()[:16]
+# RELAXED FILTER: Only block obvious spam/non-news
+# Removed strict country blocking - keeping only spam/entertainment filters
+BLOCKED_KEYWORDS = [
+    # Spam/promotional patterns
+    'click here to', 'subscribe now', 'limited time offer',
+    'buy now', 'sale ends', 'discount code',
+    # Explicit adult content (spam filter)
+    'porn', 'xxx', 'adult video', 'sex dating',
+    # Casino/gambling spam
+    'online casino', 'slot machine', 'bet now', 'gambling',
+]
 
+# Relevance weighting (same as the Twitter scraper)
+HIGH_KEYWORDS = ['israel', 'gaza', 'hamas', 'war', 'attack', 'netanyahu', 'idf']
+MEDIUM_KEYWORDS = ['jerusalem', 'palestine', 'middle east', 'trump', 'iran']
 
-def format_rfc2822(dt=None):
-    """Format datetime to RFC 2822 format"""
-    if dt is None:
-        dt = datetime.now(timezone.utc)
-    return dt.strftime("%a, %d %b %Y %H:%M:%S %z")
+# Hebrew surface forms -> the English keyword they count as
+HEBREW_KEYWORD_ALIASES = {
+    # Israel/Jewish context
+    'ישראל': 'israel',
+    'ישראלי': 'israeli',
+    'ישראלית': 'israeli',
+    'ישראלים': 'israelis',
+    'עזה': 'gaza',
+    'פלסטין': 'palestine',
+    'פלסטיני': 'palestinian',
+    'פלסטינים': 'palestinian',
+    'צה"ל': 'idf',
+    'ירושלים': 'jerusalem',
+    'נתניהו': 'netanyahu',
+    'תל אביב': 'tel aviv',
+    'חמאס': 'hamas',
+    'יהודי': 'jew',
+    'יהודית': 'jewish',
+    'יהודים': 'jews',
+    'ציוני': 'zionist',
+    'ציונות': 'zionism',
+    'יהדות': 'judaism',
+    'הרב': 'rabbi',
+    'יום כיפור': 'yom kippur',
+    'ראש השנה': 'rosh hashanah',
+    'פסח': 'passover',
+    'חנוכה': 'hanukkah',
+    'שבת': 'shabbat',
+    'גל גדות': 'gal gadot',
+    'נטלי פורטמן': 'natalie portman',
+    'בר רפאלי': 'bar refaeli',
+    'יאיר לפיד': 'yair lapid',
+    'בנימין נתניהו': 'benjamin netanyahu',
+    'בני גנץ': 'benny gantz',
+    'נפתלי בנט': 'naftali bennett',
+    'המוסד': 'mossad',
+    'שב"כ': 'shin bet',
+    'כנסת': 'knesset',
+    'עולים חדשים': 'aliyah',
+    'תפוצות': 'diaspora',
+    # Relevance
+    'מלחמה': 'war',
+    'מתקפה': 'attack',
+    'פיגוע': 'attack',
+    'המזרח התיכון': 'middle east',
+    'מזרח התיכון': 'middle east',
+    'טראמפ': 'trump',
+    'איראן': 'iran',
+    # Spam
+    'לחצו כאן': 'click here to',
+    'קוד הנחה': 'discount code',
+    'קנו עכשיו': 'buy now',
+    'פורנו': 'porn',
+    'קזינו': 'online casino',
+    'הימורים': 'gambling',
+}
 
 
-def escape_xml(text):
-    """Escape special XML characters"""
-    if not text:
-        return ""
-    return (text
-        .replace("&", "&amp;")
-        .replace("<", "&lt;")
-        .replace(">", "&gt;")
-        .replace('"', "&quot;")
-        .replace("'", "&apos;"))
+KEYWORD_TRIE = build_keyword_trie({
+    'israel_context': ISRAEL_CONTEXT_KEYWORDS,
+    'blocked': BLOCKED_KEYWORDS,
+    'high': HIGH_KEYWORDS,
+    'medium': MEDIUM_KEYWORDS,
+}, HEBREW_KEYWORD_ALIASES)
+
+
+def generate_article_id(url):
+    """Generate unique ID from the canonical URL"""
+    return hashlib.md5(canonical_url(url).encode()).hexdigest()[:16]
 
 
 def extract_image_from_html(html_content, url):
@@ -298,8 +443,8 @@ def generate_feed_filename(feed_name):
     return f"{safe_name}.xml"
 
 
-def generate_single_feed_xml(articles, feed_info):
-    """Generate RSS XML for a single feed"""
+def generate_single_feed_xml(articles, feed_info, skipped=()):
+    """Generate RSS XML for a single feed (skipped: feeds this run left out for time)"""
     
     if not articles:
         return None
@@ -310,7 +455,7 @@ def generate_single_feed_xml(articles, feed_info):
     
     xml_parts = []
     xml_parts.append('<?xml version="1.0" encoding="UTF-8"?>')
-    xml_parts.append('<rss version="2.0" xmlns:atom="http://www.w3.org/2005/Atom" xmlns:media="http://search.yahoo.com/mrss/">')
+    xml_parts.append(f'<rss version="2.0" xmlns:atom="http://www.w3.org/2005/Atom" xmlns:media="http://search.yahoo.com/mrss/" xmlns:spz="{SPZ_NS}">')
     xml_parts.append('<channel>')
     xml_parts.append(f'  <title>{escape_xml(feed_name)}</title>')
     xml_parts.append(f'  <link>https://spz.local/{generate_feed_filename(feed_name)}</link>')
@@ -319,6 +464,7 @@ def generate_single_feed_xml(articles, feed_info):
     xml_parts.append(f'  <lastBuildDate>{build_date}</lastBuildDate>')
     xml_parts.append(f'  <atom:link href="https://spz.local/{generate_feed_filename(feed_name)}" rel="self" type="application/rss+xml" />')
     xml_parts.append(f'  <generator>SPZ Aggregator v2.0 (Per-Feed)</generator>')
+    xml_parts.extend(skipped_elements(skipped))
     
     for article in articles:
         xml_parts.append('  <item>')
@@ -331,11 +477,13 @@ def generate_single_feed_xml(articles, feed_info):
         
         # Add Twitter summary (max 280 chars)
         twitter_summary = create_twitter_summary(article)
-        xml_parts.append(f'    <twitter_summary><![CDATA[{twitter_summary}]]></twitter_summary>')
+        xml_parts.append(f'    <spz:twitter_summary><![CDATA[{twitter_summary}]]></spz:twitter_summary>')
         
         if article.get('image_url'):
-            xml_parts.append(f'    <enclosure url="{article["image_url"]}" type="image/jpeg" length="0" />')
-            xml_parts.append(f'    <media:content url="{article["image_url"]}" type="image/jpeg" medium="image" />')
+            image_type = article.get('image_type') or 'image/jpeg'
+            image_length = article.get('image_length') or 0
+            xml_parts.append(f'    <enclosure url="{article["image_url"]}" type="{image_type}" length="{image_length}" />')
+            xml_parts.append(f'    <media:content url="{article["image_url"]}" type="{image_type}" medium="image" />')
         
         pub_date = article.get('published') or article.get('fetched_at') or format_rfc2822()
         xml_parts.append(f'    <pubDate>{pub_date}</pubDate>')
@@ -359,127 +507,570 @@ def save_feed(xml_content, filename):
     filepath = os.path.join(CONFIG['output_dir'], filename)
     with open(filepath, 'w', encoding='utf-8') as f:
         f.write(xml_content)
+    if CONFIG['precompress_outputs']:
+        write_precompressed(filepath, xml_content.encode('utf-8'))
     return filepath
 
 
-def fetch_feed_articles(feed, state):
-    """Fetch articles from a single RSS feed"""
-    import requests
+def article_json(article):
+    """JSON Feed entry and snapshot record for one article"""
+    published = parse_pub_date(article.get('published') or article.get('fetched_at'))
+    twitter_summary = create_twitter_summary(article)
+    entry = {
+        "id": article['url'],
+        "url": article['url'],
+        "title": article.get('title', 'Untitled'),
+        "content_html": build_rss_description(article),
+        "summary": article.get('summary'),
+        "image": article.get('image_url'),
+        "date_published": iso_date(published),
+        "authors": [{"name": article['author']}] if article.get('author') else None,
+        "tags": [article['feed_category']] if article.get('feed_category') else None,
+        "_spz": {
+            "source": article.get('feed_name'),
+            "score_boost": article.get('score_boost'),
+            "relevance": article.get('relevance'),
+            "twitter_summary": twitter_summary,
+        },
+    }
+    snapshot = {
+        "id": article['id'],
+        "url": article['url'],
+        "title": article.get('title', ''),
+        "published": published,
+        "source": article.get('feed_name'),
+        "language": article.get('language'),
+        "category": article.get('feed_category'),
+        "author": article.get('author') or None,
+        "image": article.get('image_url'),
+        "summary": article.get('summary') or article.get('content'),
+        "score_boost": article.get('score_boost'),
+        "relevance": article.get('relevance'),
+        "relevancy_score": article.get('relevancy_score'),
+        "twitter_summary": twitter_summary,
+    }
+    return entry, snapshot
+
+
+def render_feed(articles, feed_info, skipped=()):
+    """RSS text plus the collected JSON outputs for one feed (None if it has no articles)
+    Runs on the CPU pool, so the JSON is returned for publish_feeds to save.
+    """
+    if not articles:
+        return None
+    collected = []
+    return generate_single_feed_xml(collect_json(articles, article_json, collected), feed_info, skipped), collected
+
+
+def save_feed_outputs(feed_info, rendered, skipped=()):
+    """Save a render_feed() result as .xml, .json and .ndjson; returns the XML path"""
+    xml_content, collected = rendered
+    filename = generate_feed_filename(feed_info['name'])
+    filepath = save_feed(xml_content, filename)
+    save_json_outputs(filename, feed_info['name'], f"Feed from {feed_info['name']}",
+                      feed_info['language'], collected, skipped)
+    return filepath
+
+
+def apply_media_metadata(articles, cache):
+    """Fill image_type/image_length on articles from probe results"""
+    probed = probe_media([a.get('image_url') for a in articles], cache)
+    for article in articles:
+        meta = probed.get(article.get('image_url'))
+        if meta:
+            article['image_type'] = meta['type']
+            article['image_length'] = meta['length']
+
+
+def apply_media_proxy(articles, store):
+    """Point each article's image at its local thumbnail (the original is kept in source_image_url)"""
+    for article in articles:
+        if article.get('image_url') and not article.get('source_image_url'):
+            article['source_image_url'] = article['image_url']
+    proxied = proxy_media([a.get('source_image_url') for a in articles], store)
+    for article in articles:
+        local = proxied.get(article.get('source_image_url'))
+        if local:
+            article['image_url'], article['image_length'] = local
+            article['image_type'] = 'image/jpeg'
+    report_image_dupes([(f"{a['feed_name']}: {a.get('title', '')[:50]}", a['source_image_url'])
+                        for a in articles if a.get('source_image_url')], store)
+
+
+def load_page_cache():
+    """Load the on-disk article page cache index
+    Bodies live in blobs/<sha256>.gz so URLs with identical pages share one copy.
+    """
+    cache_dir = CONFIG.get('page_cache_dir')
+    if not cache_dir:
+        return None
     
-    articles = []
-    known_ids = set(state.get("known_ids", []))
+    os.makedirs(os.path.join(cache_dir, 'blobs'), exist_ok=True)
+    try:
+        with open(os.path.join(cache_dir, 'index.json'), 'r') as f:
+            index = json.load(f)
+    except:
+        index = {}
+    
+    refs = {}                           # body hash -> number of URLs using that blob
+    for entry in index.values():
+        refs[entry['hash']] = refs.get(entry['hash'], 0) + 1
+    
+    return {
+        'dir': cache_dir,
+        'index': index,
+        'refs': refs,
+        'stats': {'hits': 0, 'misses': 0, 'evictions': 0, 'orphans': 0},
+    }
+
+
+def page_cache_blob_path(cache, body_hash):
+    return os.path.join(cache['dir'], 'blobs', f"{body_hash}.gz")
+
+
+def page_cache_release(cache, body_hash):
+    """Drop one reference to a blob, deleting it once no URL uses it; True if deleted"""
+    cache['refs'][body_hash] -= 1
+    if cache['refs'][body_hash] > 0:
+        return False
+    del cache['refs'][body_hash]
+    try:
+        os.remove(page_cache_blob_path(cache, body_hash))
+    except OSError:
+        pass
+    return True
+
+
+def page_cache_get(cache, url):
+    """Return cached entry for URL (extracted fields + body hash) or None"""
+    if cache is None:
+        return None
+    
+    entry = cache['index'].get(url)
+    if entry and os.path.exists(page_cache_blob_path(cache, entry['hash'])):
+        entry['last_access'] = time.time()
+        cache['stats']['hits'] += 1
+        return entry
+    
+    cache['stats']['misses'] += 1
+    return None
+
+
+def page_cache_read_body(cache, entry):
+    with gzip.open(page_cache_blob_path(cache, entry['hash']), 'rt', encoding='utf-8') as f:
+        return f.read()
+
+
+def page_cache_put(cache, url, body, extracted):
+    """Store compressed body (content-addressed) and extracted fields for URL"""
+    if cache is None:
+        return
+    
+    body_hash = hashlib.sha256(body.encode('utf-8')).hexdigest()
+    blob_path = page_cache_blob_path(cache, body_hash)
+    if not os.path.exists(blob_path):
+        tmp_path = f"{blob_path}.{os.getpid()}.tmp"
+        with gzip.open(tmp_path, 'wt', encoding='utf-8') as f:
+            f.write(body)
+        os.replace(tmp_path, blob_path)
+    
+    old = cache['index'].get(url)
+    cache['index'][url] = {
+        'hash': body_hash,
+        'size': os.path.getsize(blob_path),
+        'last_access': time.time(),
+        **extracted,
+    }
+    cache['refs'][body_hash] = cache['refs'].get(body_hash, 0) + 1
+    if old:
+        page_cache_release(cache, old['hash'])
+
+
+# Unreferenced blobs younger than this may belong to another run that hasn't saved its index yet
+PAGE_CACHE_ORPHAN_GRACE = 3600
+
+
+def save_page_cache(cache):
+    """Remove orphaned blobs, evict least recently used entries down to the byte cap, then save index
+    The cap counts every blob on disk, so orphans left by crashed or concurrent runs count too.
+    """
+    if cache is None:
+        return
+    
+    index = cache['index']
+    total = 0
+    for blob in os.scandir(os.path.join(cache['dir'], 'blobs')):
+        body_hash = blob.name.split('.')[0]
+        stat = blob.stat()
+        if body_hash not in cache['refs'] and stat.st_mtime < time.time() - PAGE_CACHE_ORPHAN_GRACE:
+            try:
+                os.remove(blob.path)
+                cache['stats']['orphans'] += 1
+                continue
+            except OSError:
+                pass
+        total += stat.st_size
+    
+    for url in sorted(index, key=lambda u: index[u]['last_access']):
+        if total <= CONFIG['page_cache_max_bytes']:
+            break
+        entry = index.pop(url)
+        cache['stats']['evictions'] += 1
+        if page_cache_release(cache, entry['hash']):
+            total -= entry['size']
+    
+    index_path = os.path.join(cache['dir'], 'index.json')
+    with open(f"{index_path}.{os.getpid()}.tmp", 'w') as f:
+        json.dump(index, f)
+    os.replace(f"{index_path}.{os.getpid()}.tmp", index_path)
+
+
+def extract_article_details(html, url):
+    """Run the HTML extraction stage once for a page (only the enabled fields)"""
+    details = {}
+    if CONFIG['extract_images']:
+        details['image_url'] = extract_image_from_html(html, url)
+    if CONFIG['fetch_full_content']:
+        content_html = extract_article_content(html)
+        details['summary'] = create_summary(content_html, CONFIG['max_summary_length']) or None
+    return details
+
+
+def fetch_article_details(url, page_cache=None):
+    """Get image/summary for an article page, via the page cache when possible
+    Returns (details, fetched) where fetched is True if the network was used.
+    The page is fetched from its own URL but cached under the canonical one.
+    """
+    cache_key = canonical_url(url)
+    entry = page_cache_get(page_cache, cache_key)
+    if entry:
+        # Extraction results are stored next to the body; only re-run
+        # extraction if this run asks for a field the cached entry lacks
+        needs_image = CONFIG['extract_images'] and 'image_url' not in entry
+        needs_summary = CONFIG['fetch_full_content'] and 'summary' not in entry
+        if needs_image or needs_summary:
+            entry.update(extract_article_details(page_cache_read_body(page_cache, entry), url))
+        return {'ok': True, 'image_url': entry.get('image_url'), 'summary': entry.get('summary')}, False
     
     try:
-        response = requests.get(feed['url'], timeout=CONFIG['timeout'])
-        response.raise_for_status()
+        article_resp = throttled_get(url, retries=0, timeout=CONFIG['content_timeout'],
+            headers={'User-Agent': CONFIG['user_agent'], 'Accept-Encoding': accept_encoding()})
         
-        root = ET.fromstring(response.content)
-        items = root.findall('.//item')
+        if not article_resp.ok:
+            return {'ok': False}, True
         
-        for item in items[:CONFIG['articles_per_feed']]:
-            title = item.findtext('title', '')
-            link = item.findtext('link', '') or item.findtext('guid', '')
-            description = item.findtext('description', '')
-            pub_date = item.findtext('pubDate', '')
-            author = item.findtext('author', '') or item.findtext('{http://purl.org/dc/elements/1.1/}creator', '')
-            
-            article_id = generate_article_id(link)
-            if article_id in known_ids:
-                continue
-            
-            # === CONTENT FILTERS ===
-            combined_text = f"{title} {description}".lower()
-            
-            # POSITIVE: Israel/Jewish context keywords (always allow)
-            israel_context = [
-                'israel', 'israeli', 'israelis', 'gaza', 'palestine', 'palestinian', 
-                'idf', 'jerusalem', 'netanyahu', 'tel aviv', 'hamas', 
-                'jew', 'jewish', 'jews', 'zionist', 'zionism', 'judaism', 'rabbi',
-                'yom kippur', 'rosh hashanah', 'passover', 'hanukkah', 'shabbat',
-                # Israeli celebrities/politicians
-                'gal gadot', 'natalie portman', 'bar refaeli', 'yair lapid', 
-                'benjamin netanyahu', 'benny gantz', 'naftali bennett',
-                'mossad', 'shin bet', 'knesset', 'aliyah', 'diaspora'
-            ]
-            has_israel_context = any(kw in combined_text for kw in israel_context)
-            
-            # RELAXED FILTER: Only block obvious spam/non-news
-            # Removed strict country blocking - keeping only spam/entertainment filters
-            blocked_content = [
-                # Spam/promotional patterns
-                'click here to', 'subscribe now', 'limited time offer',
-                'buy now', 'sale ends', 'discount code',
-                # Explicit adult content (spam filter)
-                'porn', 'xxx', 'adult video', 'sex dating',
-                # Casino/gambling spam
-                'online casino', 'slot machine', 'bet now', 'gambling',
-            ]
-            
-            # Check for spam only
-            has_blocked = any(kw in combined_text for kw in blocked_content)
-            
-            if has_blocked:
-                continue
-            
-            # Boost score for Israel-relevant content
-            score_boost = 3 if has_israel_context else 0
-            
-            # All other content is now allowed (relaxed filter)
-            
-            # Check for enclosure image
-            enclosure = item.find('enclosure')
-            rss_image = None
-            if enclosure is not None:
-                rss_image = enclosure.get('url')
-            
-            article = {
-                'id': article_id,
-                'title': title,
-                'content': description,
-                'url': link,
-                'published': pub_date,
-                'author': author,
-                'feed_name': feed['name'],
-                'feed_category': feed['category'],
-                'language': feed['language'],
-                'fetched_at': format_rfc2822(),
-                'rss_image': rss_image,
-            }
+        html = article_resp.text
+        details = extract_article_details(html, url)
+        page_cache_put(page_cache, cache_key, html, details)
+        return {'ok': True, **details}, True
+        
+    except Exception:
+        return {'ok': False}, True
+
+
+# Feed parsing: RSS 2.0, RSS 1.0 (RDF) and Atom all come out as the same item dicts
+FEED_ROOTS = ('rss', 'RDF', 'feed')
+ITEM_CHUNK_RE = re.compile(rb'<((?:\w+:)?(?:item|entry))\b[^>]*>.*?</\1\s*>', re.S)
+ROOT_TAG_RE = re.compile(rb'<(?:\w+:)?(?:rss|RDF|feed)\b[^>]*>')
+XMLNS_RE = re.compile(rb'\sxmlns(?::\w+)?\s*=\s*("[^"]*"|\'[^\']*\')')
+INVALID_XML_CHARS_RE = re.compile(rb'[\x00-\x08\x0b\x0c\x0e-\x1f]')
+
+
+def local_name(tag):
+    """Tag without its {namespace} (comments/PIs have no string tag)"""
+    return tag.rsplit('}', 1)[-1] if isinstance(tag, str) else ''
+
+
+def iso_to_rfc2822(value):
+    """Atom/Dublin Core ISO 8601 dates to the RFC 2822 form the RSS path uses"""
+    if not value or parse_pub_date(value):
+        return value
+    try:
+        dt = datetime.fromisoformat(value.strip().replace('Z', '+00:00'))
+    except ValueError:
+        return value
+    if dt.tzinfo is None:
+        dt = dt.replace(tzinfo=timezone.utc)
+    return format_rfc2822(dt)
+
+
+def normalize_feed_item(element):
+    """Map an RSS 2.0 <item>, RSS 1.0 <item> or Atom <entry> onto one dict"""
+    item = {'title': '', 'link': '', 'description': '', 'published': '', 'author': '', 'enclosure': None}
+    content = ''
+    updated = ''
+    
+    for child in element:
+        name = local_name(child.tag)
+        text = ''.join(child.itertext()).strip()
+        
+        if name == 'title':
+            item['title'] = text
+        elif name == 'link':
+            href = child.get('href')
+            rel = child.get('rel', 'alternate')
+            if href is None:
+                item['link'] = item['link'] or text
+            elif rel == 'alternate' and not item['link']:
+                item['link'] = href
+            elif rel == 'enclosure' and (child.get('type') or 'image/').startswith('image/'):
+                item['enclosure'] = item['enclosure'] or href
+        elif name in ('guid', 'id') and not item['link'] and text.startswith('http'):
+            item['link'] = text
+        elif name in ('description', 'summary'):
+            item['description'] = text
+        elif name in ('encoded', 'content'):
+            content = text
+        elif name in ('pubDate', 'published', 'date', 'issued'):
+            item['published'] = item['published'] or text
+        elif name in ('updated', 'modified'):
+            updated = text
+        elif name in ('author', 'creator'):
+            names = [c for c in child if local_name(c.tag) == 'name']
+            item['author'] = item['author'] or (''.join(names[0].itertext()).strip() if names else text)
+        elif name == 'enclosure':
+            item['enclosure'] = item['enclosure'] or child.get('url')
+    
+    item['description'] = item['description'] or content
+    item['published'] = iso_to_rfc2822(item['published'] or updated)
+    return item
+
+
+def parse_with_lxml(data):
+    """lxml in recover mode: skips past bad bytes/tags and keeps the rest"""
+    from lxml import etree
+    
+    parser = etree.XMLParser(recover=True, resolve_entities=False, no_network=True, huge_tree=True)
+    root = etree.fromstring(data, parser)
+    if root is None:
+        raise ValueError("unparseable document")
+    return root, 0
+
+
+def parse_with_etree(data):
+    """ElementTree, recovering item by item when the whole document won't parse"""
+    try:
+        return ET.fromstring(data), 0
+    except ET.ParseError as e:
+        error = e
+    
+    data = INVALID_XML_CHARS_RE.sub(b'', data)
+    try:
+        return ET.fromstring(data), 0
+    except ET.ParseError:
+        pass
+    
+    # Parse each <item>/<entry> on its own, inside a wrapper that carries the
+    # root's namespace declarations, so one bad item only loses itself
+    root_tag = ROOT_TAG_RE.search(data)
+    if not root_tag:
+        raise error
+    namespaces = b''.join(m.group(0) for m in XMLNS_RE.finditer(root_tag.group(0)))
+    root = ET.Element('rss')
+    dropped = 0
+    for chunk in ITEM_CHUNK_RE.finditer(data):
+        try:
+            wrapper = ET.fromstring(b'<spz-wrap' + namespaces + b'>' + chunk.group(0) + b'</spz-wrap>')
+        except ET.ParseError:
+            dropped += 1
+            continue
+        root.extend(list(wrapper))
+    if not len(root) and not dropped:
+        raise error
+    return root, dropped
+
+
+def parse_feed(data):
+    """Parse feed bytes into normalized item dicts, in document order
+    Returns (items, dropped) where dropped counts items lost to malformed markup.
+    """
+    backend = CONFIG.get('xml_parser', 'auto')
+    if backend == 'auto':
+        try:
+            import lxml
+            backend = 'lxml'
+        except ImportError:
+            backend = 'etree'
+    
+    root, dropped = parse_with_lxml(data) if backend == 'lxml' else parse_with_etree(data)
+    
+    elements = [el for el in root.iter() if local_name(el.tag) in ('item', 'entry')]
+    if not elements and local_name(root.tag) not in FEED_ROOTS:
+        raise ValueError(f"not an RSS/Atom feed (root <{local_name(root.tag)}>)")
+    return [normalize_feed_item(el) for el in elements], dropped
+
+
+def calculate_score_boost(text):
+    """Relevance boost for an article's title + description, None if blocked"""
+    # POSITIVE: Israel/Jewish context keywords (always allow)
+    hits = match_keywords(text, KEYWORD_TRIE)
+    
+    # Check for spam only
+    if 'blocked' in hits:
+        return None
+    
+    # Boost score for Israel-relevant content; all other content is allowed
+    return 3 if 'israel_context' in hits else 0
+
+
+def calculate_relevance(text):
+    """Relevancy meter score (1-10) from weighted keywords"""
+    hits = match_keywords(text, KEYWORD_TRIE)
+    return min(10, 5 + len(hits.get('high', ())) + 0.5 * len(hits.get('medium', ())))
+
+
+def download_feed(feed):
+    """Fetch one feed's raw bytes (raises on HTTP errors)"""
+    response = throttled_get(feed['url'], timeout=CONFIG['timeout'],
+        headers={'Accept-Encoding': accept_encoding()})
+    response.raise_for_status()
+    
+    wire, decoded = transfer_stats(response)
+    encoding = response.headers.get('Content-Encoding', 'identity')
+    print(f"   [NET] {wire / 1024:.1f} KB on wire, {decoded / 1024:.1f} KB decoded "
+          f"({encoding}, {decoded / max(wire, 1):.1f}x)")
+    return response.content
+
+
+def parse_feed_articles(feed, data):
+    """Parse, filter and score one downloaded feed into article dicts
+    CPU only (no network, no shared state), so main() runs it on the process pool.
+    """
+    items, dropped = parse_feed(data)
+    if dropped:
+        print(f"   [PARSE] {feed['name']}: recovered {len(items)} items, dropped {dropped} malformed")
+    
+    articles = []
+    for item in items[:CONFIG['articles_per_feed']]:
+        title = item['title']
+        link = item['link']
+        description = item['description']
+        if not link:
+            continue
+        
+        # === CONTENT FILTERS ===
+        # RELAXED FILTER: Only block obvious spam/non-news
+        score_boost = calculate_score_boost(f"{title} {description}")
+        if score_boost is None:
+            continue
+        
+        articles.append({
+            'id': generate_article_id(link),
+            'title': title,
+            'content': description,
+            'url': link,
+            'published': item['published'],
+            'author': item['author'],
+            'feed_name': feed['name'],
+            'feed_category': feed['category'],
+            'language': feed['language'],
+            'fetched_at': format_rfc2822(),
+            'rss_image': item['enclosure'],
+            'score_boost': score_boost,
+            'relevance': calculate_relevance(f"{title} {description}"),
+        })
+    return articles
+
+
+def complete_articles(articles, known_ids, page_cache=None):
+    """Drop articles we already published and fetch page details for the rest"""
+    new_articles = []
+    seen = set()
+    for article in articles:
+        if article['id'] in known_ids or article['id'] in seen:
+            continue
+        seen.add(article['id'])
+        
+        # Fetch full article details
+        fetched = False
+        if CONFIG['extract_images'] or CONFIG['fetch_full_content']:
+            details, fetched = fetch_article_details(article['url'], page_cache)
             
-            # Fetch full article details
-            if CONFIG['extract_images'] or CONFIG['fetch_full_content']:
-                try:
-                    article_resp = requests.get(link, timeout=CONFIG['content_timeout'], 
-                        headers={'User-Agent': 'Mozilla/5.0'})
-                    
-                    if article_resp.ok:
-                        html = article_resp.text
-                        
-                        if CONFIG['extract_images']:
-                            img = extract_image_from_html(html, link)
-                            if img:
-                                article['image_url'] = img
-                            elif rss_image:
-                                article['image_url'] = rss_image
-                        
-                        if CONFIG['fetch_full_content']:
-                            content_html = extract_article_content(html)
-                            summary = create_summary(content_html, CONFIG['max_summary_length'])
-                            if summary:
-                                article['summary'] = summary
-                    
-                except Exception as e:
-                    pass
+            if CONFIG['extract_images']:
+                if details.get('image_url'):
+                    article['image_url'] = details['image_url']
+                elif article['rss_image'] and details.get('ok'):
+                    article['image_url'] = article['rss_image']
             
-            articles.append(article)
-            known_ids.add(article_id)
-            time.sleep(CONFIG.get('delay_between_requests', 1.5))
+            if CONFIG['fetch_full_content'] and details.get('summary'):
+                article['summary'] = details['summary']
         
-        return articles, known_ids
-        
-    except Exception as e:
-        print(f"   [ERROR] {e}")
-        return [], known_ids
+        new_articles.append(article)
+    return new_articles
+
+
+def article_index_row(article):
+    return {
+        'uid': article['id'],
+        'kind': 'rss',
+        'source': article['feed_name'],
+        'language': article.get('language'),
+        'score': article.get('score_boost', 0),
+        'published': parse_pub_date(article.get('published')) or int(time.time()),
+        'url': article['url'],
+        'title': article.get('title', ''),
+        'body': create_summary(article.get('summary') or article.get('content') or '', 1000),
+    }
+
+
+def article_archive_record(article):
+    return {
+        'uid': article['id'],
+        'source': article['feed_name'],
+        'published': parse_pub_date(article.get('published')) or int(time.time()),
+        'item': article,
+    }
+
+
+def rerender_feeds(args):
+    """Regenerate per-feed XML for a time window from the archive, no network
+    Scoring and filters are re-applied, so rule and template changes take effect.
+    """
+    start, end = parse_window(args.since, args.until)
+    records = read_archive('rss', start, end, args.source)
+    print(f"[RERENDER] {len(records)} archived articles in window -> {args.out}")
+    
+    CONFIG['output_dir'] = args.out
+    CONFIG['precompress_outputs'] = False
+    os.makedirs(args.out, exist_ok=True)
+    
+    by_feed = {}
+    for record in reversed(records):
+        article = record['item']
+        boost = calculate_score_boost(f"{article.get('title', '')} {article.get('content', '')}")
+        if boost is None:
+            continue
+        article['score_boost'] = boost
+        if article.get('source_image_url'):
+            # Thumbnails may have been evicted since; the original's type/length aren't known
+            article['image_url'] = article.pop('source_image_url')
+            article.pop('image_type', None)
+            article.pop('image_length', None)
+        by_feed.setdefault(article['feed_name'], []).append(article)
+    
+    generated = 0
+    for feed in ISRAELI_FEEDS:
+        articles = by_feed.get(feed['name'])
+        if not articles:
+            continue
+        save_feed_outputs(feed, render_feed(articles, feed))
+        generated += 1
+        print(f"   [SAVED] {feed['name']} ({len(articles)} articles)")
+    
+    print(f"\n[DONE] Re-rendered {generated} feeds")
+
+
+def article_meter_entry(article):
+    return {
+        'uid': article['id'],
+        'kind': 'rss',
+        'source': article['feed_name'],
+        'title': article.get('title', ''),
+        'url': article['url'],
+        'summary': create_summary(article.get('summary') or article.get('content') or '', 280),
+        'published': article.get('published') or article.get('fetched_at'),
+        'relevance': article.get('relevance', 0),
+    }
 
 
 def load_state():
@@ -497,76 +1088,344 @@ def save_state(state):
         json.dump(state, f, indent=2)
 
 
-def upload_to_catbox(filepath):
-    """Upload file to catbox"""
-    import subprocess
+def upload_to_catbox(filepath, session=None):
+    """Upload file to catbox, return its URL (None on failure)"""
+    import requests
+    
     try:
-        result = subprocess.run(
-            ['curl', '-s', '-F', 'reqtype=fileupload', '-F', f'fileToUpload=@{filepath}', 
-             'https://catbox.moe/user/api.php'],
-            capture_output=True, text=True, timeout=60
-        )
-        return result.stdout.strip()
-    except:
+        with open(filepath, 'rb') as f:
+            resp = (session or requests).post('https://catbox.moe/user/api.php',
+                data={'reqtype': 'fileupload'},
+                files={'fileToUpload': (os.path.basename(filepath), f, 'application/rss+xml')},
+                timeout=CONFIG['upload_timeout'])
+        url = resp.text.strip()
+        return url if resp.ok and url.startswith('http') else None
+    except Exception:
         return None
 
 
-def main():
+def load_upload_map():
+    """Load content hash -> catbox URL from earlier uploads"""
+    try:
+        with open(CONFIG['upload_map_file'], 'r') as f:
+            return json.load(f)
+    except:
+        return {}
+
+
+def save_upload_map(upload_map):
+    # Dicts keep insertion order, so this keeps the most recent uploads
+    with open(CONFIG['upload_map_file'], 'w') as f:
+        json.dump(dict(list(upload_map.items())[-2000:]), f)
+
+
+BUILD_DATE_RE = re.compile(rb'<lastBuildDate>[^<]*</lastBuildDate>')
+
+
+def upload_digest(data):
+    """Content hash of a feed, ignoring lastBuildDate (which changes on every render)"""
+    return hashlib.sha256(BUILD_DATE_RE.sub(b'', data)).hexdigest()
+
+
+def upload_feeds(feed_results):
+    """Upload stage: fill in 'url' on each feed result
+    Files whose bytes were uploaded before reuse that URL; the rest go up
+    concurrently over one pooled session.
+    """
     import requests
     
+    if not feed_results:
+        return
+    
+    upload_map = load_upload_map()
+    pending = {}
+    for result in feed_results.values():
+        with open(result['filepath'], 'rb') as f:
+            digest = upload_digest(f.read())
+        result['url'] = upload_map.get(digest)
+        if result['url']:
+            print(f"   [UPLOAD] {result['filename']} unchanged, reusing {result['url']}")
+        else:
+            pending.setdefault(digest, []).append(result)
+    
+    if pending:
+        workers = min(CONFIG['upload_workers'], len(pending))
+        print(f"\n[UPLOAD] Uploading {len(pending)} changed feeds ({workers} at a time)...")
+        session = requests.Session()
+        session.mount('https://', requests.adapters.HTTPAdapter(pool_maxsize=workers))
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            futures = {pool.submit(upload_to_catbox, results[0]['filepath'], session): digest
+                       for digest, results in pending.items()}
+            for future, digest in futures.items():
+                url = future.result()
+                for result in pending[digest]:
+                    result['url'] = url
+                    if url:
+                        print(f"   [OK] {result['filename']}: {url}")
+                    else:
+                        print(f"   [WARN] Upload failed, saved locally: {result['filepath']}")
+                if url:
+                    upload_map[digest] = url
+        session.close()
+    
+    save_upload_map(upload_map)
+
+
+def parse_args():
+    import argparse
+    
+    parser = argparse.ArgumentParser(description="SPZ Multi-Feed RSS Generator")
+    parser.add_argument('--source', action='append',
+        help="Only process the named feed (repeatable)")
+    parser.add_argument('--report',
+        help="Write per-feed poll results (ok, item ids, publish times) as JSON")
+    parser.add_argument('--list-sources', action='store_true',
+        help="Print configured feeds as JSON and exit")
+    parser.add_argument('--deadline', type=float,
+        help="Seconds to spend fetching (default max_total_time); medium/low feeds that won't fit are skipped")
+    parser.add_argument('--results',
+        help="Fetch only: write fetched articles per feed as JSON, no XML or state")
+    parser.add_argument('--assemble',
+        help="Render only: write feeds from a --results JSON file, no fetching")
+    parser.add_argument('--rerender', action='store_true',
+        help="Regenerate feeds from the archive (see --since/--until/--out), no fetching")
+    parser.add_argument('--since', help="Re-render window start, e.g. 2026-10-01 or 2026-10-01T06:00")
+    parser.add_argument('--until', help="Re-render window end (default now)")
+    parser.add_argument('--out', default="spz-rerender/",
+        help="Output directory for --rerender (default spz-rerender/)")
+    parser.add_argument('--profile-memory', action='store_true',
+        help="Trace allocations and report memory per stage and per source (see memory_report_file)")
+    parser.add_argument('--memory-budget', type=float, metavar='MB',
+        help="With --profile-memory: exit with status 3 if peak RSS goes over this many MB")
+    return parser.parse_args()
+
+
+def publish_feeds(batch, media_cache=None, pool=None, media_store=None, skipped=()):
+    """Render (on the pool when given) and save each (feed, articles) pair
+    skipped: names of feeds this run left out for time, listed in every feed written.
+    Returns the summary records by feed name (see upload_feeds).
+    """
+    if media_cache is not None:
+        for feed, articles in batch:
+            apply_media_metadata(articles, media_cache)
+    if media_store is not None:
+        apply_media_proxy([a for feed, articles in batch for a in articles], media_store)
+    
+    renders = [run_in_pool(pool, render_feed, articles, feed, skipped) for feed, articles in batch]
+    
+    feed_results = {}
+    for (feed, articles), render in zip(batch, renders):
+        rendered = render.result()
+        if not rendered:
+            continue
+        
+        filename = generate_feed_filename(feed['name'])
+        filepath = save_feed_outputs(feed, rendered, skipped)
+        print(f"   [SAVED] {filename} (+ .json, .ndjson)")
+        
+        feed_results[feed['name']] = {
+            'articles': len(articles),
+            'with_images': sum(1 for a in articles if a.get('image_url')),
+            'with_summaries': sum(1 for a in articles if a.get('summary')),
+            'filename': filename,
+            'filepath': filepath,
+            'url': None
+        }
+    return feed_results
+
+
+def assemble_feeds(results_file):
+    """Render feeds from fetched results (see --results) and record their IDs"""
+    with open(results_file, 'r', encoding='utf-8') as f:
+        results = json.load(f)
+    
+    state = load_state()
+    all_ids = set(state.get("known_ids", []))
+    media_cache = load_media_cache() if CONFIG['probe_media'] else None
+    media_store = load_media_store()
+    
+    batch = []
+    accepted = []
+    for feed in ISRAELI_FEEDS:
+        articles = results.get(feed['name'], {}).get('articles') or []
+        if not articles:
+            continue
+        print(f"\n[ASSEMBLE] {feed['name']} ({len(articles)} articles)")
+        all_ids.update(a['id'] for a in articles)
+        accepted.extend(articles)
+        batch.append((feed, articles))
+    
+    pool = open_cpu_pool() if len(batch) > 1 else None
+    feed_results = publish_feeds(batch, media_cache, pool, media_store)
+    if pool is not None:
+        pool.shutdown()
+    upload_feeds(feed_results)
+    
+    state['known_ids'] = list(all_ids)[-5000:]
+    state['last_fetch'] = format_rfc2822()
+    save_state(state)
+    if media_cache is not None:
+        save_media_cache(media_cache)
+    save_media_store(media_store)
+    index_items([article_index_row(a) for a in accepted])
+    archive_items('rss', [article_archive_record(a) for a in accepted])
+    
+    print(f"\n[DONE] Assembled {len(feed_results)} separate feeds")
+
+
+def main(args=None):
+    if args is None:
+        args = parse_args()
+    
+    if args.list_sources:
+        print(json.dumps(ISRAELI_FEEDS, ensure_ascii=False))
+        return
+    
+    if args.assemble:
+        assemble_feeds(args.assemble)
+        return
+    
+    if args.rerender:
+        rerender_feeds(args)
+        return
+    
+    feeds = ISRAELI_FEEDS
+    if args.source:
+        feeds = [f for f in ISRAELI_FEEDS if f['name'] in args.source]
+    
     print("\n[STATUS] SPZ Multi-Feed RSS Generator")
     print("Creates separate RSS feeds for each source")
     print("=" * 60)
     
     state = load_state()
-    all_ids = set(state.get("known_ids", []))
+    known_ids = set(state.get("known_ids", []))
+    all_ids = set(known_ids)
+    media_cache = load_media_cache() if CONFIG['probe_media'] and not args.results else None
+    media_store = load_media_store() if not args.results else None
+    page_cache = None
+    if CONFIG['extract_images'] or CONFIG['fetch_full_content']:
+        page_cache = load_page_cache()
     
-    feed_results = {}
-    uploaded_urls = {}
-    total_feeds = len(ISRAELI_FEEDS)
+    health = load_health()
+    health_updates = {}
+    budget = load_budget()
+    feeds = schedule_sources(feeds, health)
+    deadline = time.time() + (args.deadline or CONFIG['max_total_time'])
+    deadline_skipped = []
+    errors = {}
+    report = {}
+    fetched = {}
+    accepted = []
+    total_feeds = len(feeds)
     processed_count = 0
     
     print(f"[INFO] Processing {total_feeds} RSS feeds...")
     
-    for feed in ISRAELI_FEEDS:
-        processed_count += 1
-        print(f"\n[{processed_count}/{total_feeds}] Processing: {feed['name']}")
-        
-        articles, new_ids = fetch_feed_articles(feed, state)
-        all_ids.update(new_ids)
-        
-        if articles:
-            # Generate feed-specific XML
-            xml_content = generate_single_feed_xml(articles, feed)
-            if xml_content:
-                filename = generate_feed_filename(feed['name'])
-                filepath = save_feed(xml_content, filename)
-                
-                # Upload to catbox
-                print(f"   [UPLOAD] Uploading {filename}...")
-                url = upload_to_catbox(filepath)
-                if url:
-                    uploaded_urls[feed['name']] = url
-                    print(f"   [OK] URL: {url}")
-                else:
-                    print(f"   [WARN] Upload failed, saved locally: {filepath}")
-                
-                feed_results[feed['name']] = {
-                    'articles': len(articles),
-                    'with_images': sum(1 for a in articles if a.get('image_url')),
-                    'with_summaries': sum(1 for a in articles if a.get('summary')),
-                    'filename': filename,
-                    'url': url
-                }
+    # Downloads stay in this process; parsing and scoring go to the pool, and each
+    # feed is finished (details, breaking lane, health) as soon as its parse is done
+    pool = open_cpu_pool()
+    queue = list(feeds)
+    pending = []                        # (feed, parse future or None if the download failed, seconds)
+    batch = []
+    while queue or pending:
+        if queue:
+            feed = queue.pop(0)
+            processed_count += 1
+            if is_quarantined(health.get(feed['name'])):
+                print(f"\n[{processed_count}/{total_feeds}] Skipping quarantined: {feed['name']}")
+                report[feed['name']] = {'ok': False, 'error': 'quarantined', 'items': []}
+                continue
+            if feed.get('priority') in CONFIG['budget_skip_priorities'] and budget_reached(budget):
+                print(f"\n[{processed_count}/{total_feeds}] Skipping (relevancy budget reached): {feed['name']}")
+                report[feed['name']] = {'ok': True, 'error': None, 'items': [], 'skipped': 'budget'}
+                continue
+            if out_of_time(feed.get('priority'), health.get(feed['name']), deadline):
+                print(f"\n[{processed_count}/{total_feeds}] Skipping ({feed['priority']}, "
+                      f"{max(0, deadline - time.time()):.0f}s left): {feed['name']}")
+                report[feed['name']] = {'ok': True, 'error': None, 'items': [], 'skipped': 'deadline'}
+                health_updates[feed['name']] = record_deadline_skip(health, feed['name'])
+                deadline_skipped.append(feed['name'])
+                continue
+            print(f"\n[{processed_count}/{total_feeds}] Processing: {feed['name']}")
+            
+            started = time.time()
+            try:
+                data = download_feed(feed)
+                pending.append((feed, run_in_pool(pool, parse_feed_articles, feed, data), time.time() - started))
+            except Exception as e:
+                print(f"   [ERROR] {e}")
+                errors[feed['name']] = f"{type(e).__name__}: {e}"
+                pending.append((feed, None, time.time() - started))
+            
+            done = [job for job in pending if job[1] is None or job[1].done()]
         else:
-            print(f"   [INFO] No new articles")
+            done = pending[:1]          # Nothing left to download: wait for parses in order
         
-        time.sleep(CONFIG.get('delay_between_feeds', 2.0))
+        for job in done:
+            pending.remove(job)
+            feed, parse, latency = job
+            articles = []
+            if parse is not None:
+                try:
+                    parsed = parse.result()
+                    started = time.time()
+                    articles = complete_articles(parsed, all_ids, page_cache)
+                    latency += time.time() - started
+                except Exception as e:
+                    print(f"   [ERROR] {feed['name']}: {e}")
+                    errors[feed['name']] = f"{type(e).__name__}: {e}"
+            
+            all_ids.update(a['id'] for a in articles)
+            meter_entries = [article_meter_entry(a) for a in articles]
+            emit_breaking(meter_entries)
+            budget = add_to_budget(meter_entries)
+            health_updates[feed['name']] = record_health(health, feed['name'], feed['name'] not in errors,
+                                                         latency, len(articles), errors.get(feed['name']))
+            report[feed['name']] = {
+                'ok': feed['name'] not in errors,
+                'error': errors.get(feed['name']),
+                'items': [[a['id'], parse_pub_date(a['published'])] for a in articles],
+            }
+            
+            if args.results:
+                fetched[feed['name']] = {'ok': report[feed['name']]['ok'], 'articles': articles}
+            elif articles:
+                accepted.extend(articles)
+                batch.append((feed, articles))
+            elif feed['name'] not in errors:
+                print(f"   [INFO] {feed['name']}: no new articles")
+            memory_source(feed['name'])
+    memory_stage('fetch')
     
-    # Save state
-    state['known_ids'] = list(all_ids)[-5000:]
-    state['last_fetch'] = format_rfc2822()
-    save_state(state)
+    feed_results = publish_feeds(batch, media_cache, pool, media_store, deadline_skipped)
+    if pool is not None:
+        pool.shutdown()
+    
+    # Upload only after fetching, so a slow upload never holds up the next feed
+    upload_feeds(feed_results)
+    memory_stage('publish')
+    
+    # Save state (in --results mode the assemble step records the IDs)
+    if args.results:
+        with open(args.results, 'w', encoding='utf-8') as f:
+            json.dump(fetched, f, ensure_ascii=False)
+    else:
+        state['known_ids'] = list(all_ids)[-5000:]
+        state['last_fetch'] = format_rfc2822()
+        state['deadline_skipped'] = deadline_skipped
+        save_state(state)
+        index_items([article_index_row(a) for a in accepted])
+        archive_items('rss', [article_archive_record(a) for a in accepted])
+    if media_cache is not None:
+        save_media_cache(media_cache)
+    save_media_store(media_store)
+    save_page_cache(page_cache)
+    save_health(health_updates)
+    save_throttle()
+    
+    if args.report:
+        with open(args.report, 'w') as f:
+            json.dump(report, f)
     
     # Summary
     print(f"\n{'='*60}")
@@ -581,8 +1440,23 @@ def main():
         if result['url']:
             print(f"   URL: {result['url']}")
     
+    if page_cache is not None:
+        stats = page_cache['stats']
+        print(f"\n[CACHE] Pages: {stats['hits']} hits, {stats['misses']} misses, {stats['evictions']} evictions, "
+              f"{stats['orphans']} orphaned blobs removed")
+    
+    print_health_summary(health)
+    print_budget(budget)
+    if deadline_skipped:
+        print(f"\n[DEADLINE] Skipped {len(deadline_skipped)} feeds: {', '.join(deadline_skipped)}")
+    
     print(f"\n[DONE] Generated {len(feed_results)} separate feeds")
 
 
 if __name__ == "__main__":
-    main()
+    args = parse_args()
+    if args.profile_memory:
+        start_memory_profile(args.memory_budget)
+    main(args)
+    if not finish_memory_profile():
+        sys.exit(MEMORY_BUDGET_EXIT)
@@ -15,15 +15,77 @@ import subprocess
 import shutil
 import time
 import glob
+import json
+import heapq
+import random
+import socket
+import sqlite3
+import zlib
+import hashlib
 from datetime import datetime, timedelta
 
+from spz_common import (
+    use_config, file_lock, MEMORY_BUDGET_EXIT, start_memory_profile, memory_stage,
+    memory_over_budget, finish_memory_profile, budget_window, load_budget, budget_reached,
+    print_budget
+)
+
 # Configuration
 GITHUB_REPO = "cliffyjoe25-lgtm/sppz"
 GITHUB_TOKEN = "YOUR_GITHUB_TOKEN_HERE"
+GITHUB_BRANCH = "main"
 FEEDS_DIR = "spz-feeds/"
-REPO_DIR = "spz-repo-temp/"
+GIT_DIR = "spz-repo.git/"           # Bare local repo; publishing never checks files out
+PUBLISH_EXTENSIONS = ('.xml', '.xml.gz', '.xml.br', '.json', '.ndjson')
 BACKUP_RETENTION_HOURS = 4
 
+SCRAPERS = [
+    ("spz-rss-scraper/multi_feed_generator.py", "RSS Feeds"),
+    ("spz-reddit-xml-generator.py", "Reddit Posts"),
+    ("spz-twitter-nitter.py", "Twitter Feeds"),
+]
+
+# Daemon mode: per-source adaptive polling
+DAEMON_CONFIG = {
+    "state_file": "spz-scheduler-state.json",
+    "report_file": "spz-scheduler-report.json",
+    "min_interval": 120,                 # 2 min
+    "max_interval": 6 * 3600,            # 6 hours
+    "initial_interval": {"high": 300, "medium": 900, "low": 1800},
+    "poll_fraction": 0.5,                # Poll ~twice per expected new item
+    "idle_growth": 1.5,                  # Stretch interval when nothing changed
+    "smoothing": 0.3,                    # Weight of the newest estimate
+    "publish_interval": 300,             # Min seconds between GitHub pushes
+}
+
+# Relevancy budget (relevancy_meter.md "Interval Stop"), filled in by the scrapers
+BUDGET_CONFIG = {
+    "budget_file": "spz-shared/data/relevancy-budget.json",
+    "budget_window_hours": 4,
+    "budget_limit": 200,
+    "budget_skip_priorities": ["low"],   # Deferred to the next window once the limit is hit
+}
+
+# Sharded mode: SQLite job queue shared by any number of workers
+QUEUE_CONFIG = {
+    "db_file": "spz-queue.db",
+    "results_dir": "spz-results/",
+    "visibility_timeout": 900,           # Longer than run_scraper's 600s timeout
+    "max_attempts": 3,
+    "keep_cycles": 5,
+    "assemble_wait": 1800,               # Max seconds to wait for workers
+}
+
+# --profile-memory: this process's stages, plus the same flags passed on to each scraper
+MEMORY_CONFIG = {
+    "memory_budget_mb": None,            # Fail once peak RSS passes this; each scraper checks its own
+    "memory_top_sites": 8,               # Allocation sites listed per stage
+    "memory_report_file": "spz-auto-update-memory.json",
+}
+# spz_common reads the budget and memory settings from one dict
+use_config({**BUDGET_CONFIG, **MEMORY_CONFIG})
+SCRAPER_ARGS = []                        # Extra flags for every scraper run, set from the command line
+
 def safe_remove_dir(path):
     """Safely remove directory - aggressive Windows handling"""
     if not os.path.exists(path):
@@ -76,6 +138,10 @@ def cleanup_old_backups():
     cutoff_time = datetime.now() - timedelta(hours=BACKUP_RETENTION_HOURS)
     
     xml_files = glob.glob(os.path.join(FEEDS_DIR, "*.xml"))
+    xml_files += glob.glob(os.path.join(FEEDS_DIR, "*.xml.gz"))
+    xml_files += glob.glob(os.path.join(FEEDS_DIR, "*.xml.br"))
+    xml_files += glob.glob(os.path.join(FEEDS_DIR, "*.json"))
+    xml_files += glob.glob(os.path.join(FEEDS_DIR, "*.ndjson"))
     removed = 0
     kept = 0
     
@@ -96,7 +162,7 @@ def cleanup_old_backups():
     print(f"[BACKUP] Kept {kept} recent, removed {removed} old")
     return removed
 
-def run_scraper(script_name, description):
+def run_scraper(script_name, description, extra_args=None):
     """Run a scraper with simple timeout"""
     print(f"\n[SOURCE] {description}")
     print(f"[RUN] {script_name}...")
@@ -106,7 +172,7 @@ def run_scraper(script_name, description):
     try:
         # Increased timeout for more sources
         result = subprocess.run(
-            ["python", script_name],
+            ["python", script_name] + (extra_args or []) + SCRAPER_ARGS,
             capture_output=True,
             text=True,
             timeout=600,  # 10 min timeout per scraper
@@ -125,6 +191,9 @@ def run_scraper(script_name, description):
                     if line.strip():
                         print(f"   {line[:78]}")
             return True
+        elif result.returncode == MEMORY_BUDGET_EXIT:
+            print(f"[MEMORY] {description} went over its memory budget in {elapsed:.1f}s")
+            return False
         else:
             print(f"[ERROR] {description} failed (exit {result.returncode})")
             if result.stderr:
@@ -139,90 +208,544 @@ def run_scraper(script_name, description):
         print(f"[ERROR] {description} crashed: {e}")
         return False
 
+def git(*args, input=None, timeout=30):
+    """Run a git command against the bare publish repo"""
+    return subprocess.run(["git", "--git-dir", GIT_DIR] + list(args), input=input,
+                          capture_output=True, timeout=timeout)
+
+
+def git_blob_sha(data):
+    return hashlib.sha1(b"blob %d\0" % len(data) + data).hexdigest()
+
+
+def write_git_blob(data):
+    """Store data as a loose blob object (unless present), return its SHA-1"""
+    sha = git_blob_sha(data)
+    path = os.path.join(GIT_DIR, "objects", sha[:2], sha[2:])
+    if not os.path.exists(path):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, 'wb') as f:
+            f.write(zlib.compress(b"blob %d\0" % len(data) + data))
+        os.replace(tmp_path, path)
+    return sha
+
+
+def load_blob_cache():
+    """filename -> {"stat": [mtime_ns, size], "sha": blob SHA-1} from the last publish"""
+    try:
+        with open(os.path.join(GIT_DIR, "spz-blob-cache.json"), 'r') as f:
+            return json.load(f)
+    except:
+        return {}
+
+
+def save_blob_cache(cache):
+    with open(os.path.join(GIT_DIR, "spz-blob-cache.json"), 'w') as f:
+        json.dump(cache, f)
+
+
 def upload_to_github():
-    """Upload all local XML files to GitHub"""
+    """Publish changed feed files to GitHub as one commit
+    Builds the commit straight from git objects in a bare repo: fetch the branch
+    head, write blobs only for files whose bytes changed, mktree, commit-tree, push.
+    No clone and no working tree.
+    """
     print("\n[GITHUB] Starting upload...")
+    remote = f"https://{GITHUB_TOKEN}@github.com/{GITHUB_REPO}.git"
     
-    # Use timestamped directory to avoid conflicts  
-    import random
-    REPO_DIR_UNIQUE = f"{REPO_DIR}{int(time.time())}-{random.randint(1000,9999)}"
+    # Cron runs, the daemon and the breaking lane's --publish can overlap; they all share
+    # GIT_DIR and its blob cache, so one build-and-push runs at a time
+    with file_lock(GIT_DIR.rstrip("/") + ".lock"):
+        try:
+            if not os.path.exists(os.path.join(GIT_DIR, "HEAD")):
+                safe_remove_dir(GIT_DIR)
+                subprocess.run(["git", "init", "--bare", "--quiet", GIT_DIR], capture_output=True, timeout=10)
+            
+            print("[GIT] Fetching branch head...")
+            fetch = git("fetch", "--depth", "1", "--quiet", remote, GITHUB_BRANCH, timeout=60)
+            if fetch.returncode != 0:
+                print(f"[ERROR] Fetch failed: {fetch.stderr.decode(errors='replace')}")
+                return False
+            parent = git("rev-parse", "FETCH_HEAD").stdout.decode().strip()
+            
+            # Current top-level tree: name -> "mode type sha"
+            entries = {}
+            for raw in git("ls-tree", "-z", parent).stdout.split(b"\0"):
+                if raw:
+                    meta, name = raw.split(b"\t", 1)
+                    entries[name.decode()] = meta.decode()
+            
+            # Only files whose stat changed are read and hashed; only changed blobs are written
+            cache = load_blob_cache()
+            changed = []
+            for filename in sorted(os.listdir(FEEDS_DIR)):
+                if not filename.endswith(PUBLISH_EXTENSIONS):
+                    continue
+                path = os.path.join(FEEDS_DIR, filename)
+                st = os.stat(path)
+                stat_key = [st.st_mtime_ns, st.st_size]
+                cached = cache.get(filename)
+                if cached and cached['stat'] == stat_key and entries.get(filename, "").endswith(cached['sha']):
+                    continue
+                
+                with open(path, 'rb') as f:
+                    data = f.read()
+                sha = git_blob_sha(data)
+                cache[filename] = {"stat": stat_key, "sha": sha}
+                if entries.get(filename, "").endswith(sha):
+                    continue
+                write_git_blob(data)
+                entries[filename] = f"100644 blob {sha}"
+                changed.append(filename)
+                print(f"   - {filename}")
+            
+            for filename in list(cache):
+                if not os.path.exists(os.path.join(FEEDS_DIR, filename)):
+                    del cache[filename]
+            save_blob_cache(cache)
+            
+            if not changed:
+                print("[OK] No changes to commit")
+                return True
+            
+            tree_input = b"".join(f"{meta}\t{name}".encode() + b"\0" for name, meta in entries.items())
+            tree = git("mktree", "-z", input=tree_input)
+            if tree.returncode != 0:
+                print(f"[ERROR] mktree failed: {tree.stderr.decode(errors='replace')}")
+                return False
+            
+            msg = f"Auto-update {datetime.now().strftime('%Y-%m-%d %H:%M')} - {len(changed)} feeds"
+            commit = git("-c", "user.name=SPZ Auto", "-c", "user.email=spz@auto.update",
+                         "commit-tree", tree.stdout.decode().strip(), "-p", parent, "-m", msg)
+            if commit.returncode != 0:
+                print(f"[ERROR] Commit failed: {commit.stderr.decode(errors='replace')}")
+                return False
+            commit_sha = commit.stdout.decode().strip()
+            
+            print("[GIT] Pushing...")
+            push = git("push", "--quiet", remote, f"{commit_sha}:refs/heads/{GITHUB_BRANCH}")
+            if push.returncode != 0:
+                print(f"[ERROR] Push failed: {push.stderr.decode(errors='replace')}")
+                return False
+            git("update-ref", f"refs/heads/{GITHUB_BRANCH}", commit_sha)
+            git("gc", "--auto", "--quiet", timeout=120)
+            
+            print(f"\n[OK] Uploaded {len(changed)} changed files to GitHub!")
+            return True
+            
+        except Exception as e:
+            print(f"[ERROR] Git upload failed: {e}")
+            return False
+
+
+def discover_sources():
+    """Ask each scraper for its configured sources
+    Returns {key: {"script", "description", "name", "priority"}}
+    """
+    sources = {}
+    for script_name, description in SCRAPERS:
+        try:
+            result = subprocess.run(["python", script_name, "--list-sources"],
+                                    capture_output=True, text=True, timeout=30,
+                                    encoding='utf-8', errors='replace')
+            listed = json.loads(result.stdout.strip().splitlines()[-1])
+        except Exception as e:
+            print(f"[WARN] Could not list sources for {script_name}: {e}")
+            continue
+        
+        for src in listed:
+            sources[f"{script_name}|{src['name']}"] = {
+                "script": script_name,
+                "description": description,
+                "name": src['name'],
+                "priority": src.get('priority', 'medium'),
+            }
+    return sources
+
+
+def load_scheduler_state():
+    try:
+        with open(DAEMON_CONFIG['state_file'], 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except:
+        return {}
+
+
+def save_scheduler_state(state):
+    with open(DAEMON_CONFIG['state_file'], 'w', encoding='utf-8') as f:
+        json.dump(state, f, ensure_ascii=False, indent=2)
+
+
+def update_schedule(entry, result, now):
+    """Learn a source's polling interval from one poll result
+    Publish-time gaps between the newest items estimate how often the
+    source changes; without timestamps, new items per elapsed second do.
+    Errors back off exponentially (with jitter) without touching the
+    learned interval. Returns the number of new items seen.
+    """
+    if result and result.get('skipped'):
+        # Not polled (run deadline or relevancy budget) - retry soon, learn nothing
+        entry['next_due'] = now + DAEMON_CONFIG['min_interval']
+        return 0
     
-    # Clean up old temp directories first  
-    safe_remove_dir(REPO_DIR)
+    elapsed = now - entry['last_poll'] if entry.get('last_poll') else None
+    entry['last_poll'] = now
+    
+    if not result or not result.get('ok'):
+        entry['errors'] = entry.get('errors', 0) + 1
+        entry['last_error'] = (result or {}).get('error') or "scraper failed"
+        delay = min(DAEMON_CONFIG['max_interval'], entry['interval'] * 2 ** entry['errors'])
+        entry['next_due'] = now + delay * random.uniform(0.8, 1.2)
+        return 0
+    
+    entry['errors'] = 0
+    entry.pop('last_error', None)
+    
+    seen = set(entry.get('seen', []))
+    new_items = [item for item in result.get('items', []) if item[0] not in seen]
+    entry['seen'] = (entry.get('seen', []) + [item[0] for item in new_items])[-200:]
+    
+    interval = entry['interval']
+    if new_items:
+        times = sorted(p for _, p in result['items'] if p)
+        gaps = sorted(b - a for a, b in zip(times, times[1:]) if b > a)
+        if gaps:
+            observed = gaps[len(gaps) // 2]
+        elif elapsed:
+            observed = elapsed / len(new_items)
+        else:
+            observed = interval / DAEMON_CONFIG['poll_fraction']
+        target = observed * DAEMON_CONFIG['poll_fraction']
+        alpha = DAEMON_CONFIG['smoothing']
+        interval = (1 - alpha) * interval + alpha * target
+    else:
+        interval *= DAEMON_CONFIG['idle_growth']
+    
+    entry['interval'] = max(DAEMON_CONFIG['min_interval'], min(DAEMON_CONFIG['max_interval'], interval))
+    entry['next_due'] = now + entry['interval']
+    return len(new_items)
+
+
+def poll_sources(keys, sources, state):
+    """Run one scraper for a batch of due sources, update their schedules
+    Returns True if any source yielded new items.
+    """
+    first = sources[keys[0]]
+    names = [sources[k]['name'] for k in keys]
+    report_file = DAEMON_CONFIG['report_file']
+    
+    extra_args = ["--report", report_file]
+    for name in names:
+        extra_args += ["--source", name]
+    
+    if os.path.exists(report_file):
+        os.remove(report_file)
+    run_scraper(first['script'], f"{first['description']}: {', '.join(names)}", extra_args)
     
     try:
-        # Clone the repo to unique directory
-        print("[GIT] Cloning repository...")
-        result = subprocess.run(
-            ["git", "clone", f"https://{GITHUB_TOKEN}@github.com/{GITHUB_REPO}.git", REPO_DIR_UNIQUE],
-            capture_output=True,
-            text=True,
-            timeout=60
-        )
-        if result.returncode != 0:
-            print(f"[ERROR] Clone failed: {result.stderr}")
-            safe_remove_dir(REPO_DIR_UNIQUE)
-            return False
-        
-        # Copy XML files
-        print("[GIT] Copying XML files...")
-        copied = 0
-        for filename in os.listdir(FEEDS_DIR):
-            if filename.endswith('.xml'):
-                src = os.path.join(FEEDS_DIR, filename)
-                dst = os.path.join(REPO_DIR_UNIQUE, filename)
-                try:
-                    shutil.copy2(src, dst)
-                    copied += 1
-                    print(f"   - {filename}")
-                except Exception as e:
-                    print(f"   [SKIP] {filename}: {e}")
-        
-        if copied == 0:
-            print("[WARN] No XML files found")
-            return False
-        
-        # Git config
-        subprocess.run(["git", "-C", REPO_DIR_UNIQUE, "config", "user.email", "spz@auto.update"], 
-                      capture_output=True, timeout=10)
-        subprocess.run(["git", "-C", REPO_DIR_UNIQUE, "config", "user.name", "SPZ Auto"], 
-                      capture_output=True, timeout=10)
-        
-        # Add and commit
-        subprocess.run(["git", "-C", REPO_DIR_UNIQUE, "add", "."], 
-                      capture_output=True, timeout=10)
+        with open(report_file, 'r', encoding='utf-8') as f:
+            report = json.load(f)
+    except:
+        report = {}
+    
+    changed = False
+    now = time.time()
+    for key in keys:
+        entry = state[key]
+        if update_schedule(entry, report.get(sources[key]['name']), now):
+            changed = True
+        print(f"   [SCHED] {sources[key]['name']}: next in {(entry['next_due'] - now) / 60:.1f} min"
+              + (f" (error #{entry['errors']})" if entry.get('errors') else ""))
+    return changed
+
+
+def run_daemon():
+    """Long-running mode: poll each source when it is due"""
+    print("=" * 65)
+    print(f"SPZ Auto-Update Daemon - {datetime.now().strftime('%Y-%m-%d %H:%M')}")
+    print("=" * 65)
+    
+    os.makedirs(FEEDS_DIR, exist_ok=True)
+    
+    sources = discover_sources()
+    if not sources:
+        print("[ERROR] No sources discovered")
+        return False
+    
+    state = load_scheduler_state()
+    now = time.time()
+    queue = []
+    for key, src in sources.items():
+        entry = state.setdefault(key, {
+            "interval": DAEMON_CONFIG['initial_interval'].get(src['priority'], 900),
+            "next_due": now,
+        })
+        heapq.heappush(queue, (entry['next_due'], key))
+    print(f"[DAEMON] Scheduling {len(sources)} sources")
+    
+    last_publish = 0
+    dirty = False
+    
+    try:
+        while True:
+            now = time.time()
+            if dirty and now - last_publish >= DAEMON_CONFIG['publish_interval']:
+                if upload_to_github():
+                    dirty = False
+                last_publish = now
+                cleanup_old_backups()
+            
+            next_due = queue[0][0]
+            if next_due > now:
+                time.sleep(min(next_due - now, 30))
+                continue
+            
+            # Batch everything due into one run per scraper
+            due = []
+            while queue and queue[0][0] <= now:
+                due.append(heapq.heappop(queue)[1])
+            
+            # Budget reached: low-priority sources wait for the next window
+            if budget_reached(load_budget()):
+                window_end = budget_window(now)[1]
+                deferred = [k for k in due if sources[k]['priority'] in BUDGET_CONFIG['budget_skip_priorities']]
+                for key in deferred:
+                    state[key]['next_due'] = window_end + random.uniform(0, 60)
+                    heapq.heappush(queue, (state[key]['next_due'], key))
+                if deferred:
+                    print(f"[BUDGET] Limit reached, deferring {len(deferred)} low-priority sources "
+                          f"to {datetime.fromtimestamp(window_end):%H:%M}")
+                due = [k for k in due if k not in deferred]
+            
+            for script_name, _ in SCRAPERS:
+                keys = [k for k in due if sources[k]['script'] == script_name]
+                if keys:
+                    if poll_sources(keys, sources, state):
+                        dirty = True
+                    for key in keys:
+                        heapq.heappush(queue, (state[key]['next_due'], key))
+            
+            save_scheduler_state(state)
+            memory_stage('poll')
+            if memory_over_budget():
+                print("[DAEMON] Stopping: over the memory budget")
+                return False
+    except KeyboardInterrupt:
+        print("\n[DAEMON] Stopping")
+        save_scheduler_state(state)
+        return True
+
+
+def open_queue():
+    """Open (and create if needed) the shared job queue / results store"""
+    conn = sqlite3.connect(QUEUE_CONFIG['db_file'], timeout=30, isolation_level=None)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.executescript("""
+        CREATE TABLE IF NOT EXISTS jobs (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            cycle TEXT NOT NULL,
+            script TEXT NOT NULL,
+            source TEXT NOT NULL,
+            status TEXT NOT NULL DEFAULT 'queued',
+            attempts INTEGER NOT NULL DEFAULT 0,
+            worker TEXT,
+            lease_until REAL,
+            UNIQUE (cycle, script, source)
+        );
+        CREATE INDEX IF NOT EXISTS jobs_status ON jobs (status, lease_until);
+        CREATE TABLE IF NOT EXISTS results (
+            cycle TEXT NOT NULL,
+            script TEXT NOT NULL,
+            source TEXT NOT NULL,
+            payload TEXT NOT NULL,
+            worker TEXT,
+            finished_at REAL,
+            PRIMARY KEY (cycle, script, source)
+        );
+    """)
+    return conn
+
+
+def enqueue_cycle():
+    """Create one job per source for a new cycle"""
+    sources = discover_sources()
+    if not sources:
+        print("[ERROR] No sources discovered")
+        return False
+    
+    cycle = datetime.now().strftime('%Y%m%d-%H%M%S')
+    conn = open_queue()
+    conn.execute("BEGIN IMMEDIATE")
+    conn.executemany("INSERT OR IGNORE INTO jobs (cycle, script, source) VALUES (?, ?, ?)",
+                     [(cycle, src['script'], src['name']) for src in sources.values()])
+    
+    # Forget old cycles
+    old = [row[0] for row in conn.execute("SELECT DISTINCT cycle FROM jobs ORDER BY cycle DESC")]
+    for stale in old[QUEUE_CONFIG['keep_cycles']:]:
+        conn.execute("DELETE FROM jobs WHERE cycle = ?", (stale,))
+        conn.execute("DELETE FROM results WHERE cycle = ?", (stale,))
+    conn.execute("COMMIT")
+    conn.close()
+    
+    print(f"[QUEUE] Cycle {cycle}: {len(sources)} jobs queued")
+    return True
+
+
+def claim_job(conn, worker):
+    """Lease the next queued (or lease-expired) job, or None
+    A job whose worker crashed becomes claimable again once its lease
+    runs out; after max_attempts it is marked failed.
+    """
+    while True:
+        now = time.time()
+        conn.execute("BEGIN IMMEDIATE")
+        row = conn.execute(
+            "SELECT id, cycle, script, source, attempts FROM jobs "
+            "WHERE status = 'queued' OR (status = 'leased' AND lease_until < ?) "
+            "ORDER BY id LIMIT 1", (now,)).fetchone()
+        if row is None:
+            conn.execute("COMMIT")
+            return None
         
-        # Check for changes
-        status = subprocess.run(["git", "-C", REPO_DIR_UNIQUE, "status", "--porcelain"],
-                               capture_output=True, text=True, timeout=10)
-        if not status.stdout.strip():
-            print("[OK] No changes to commit")
-            return True
+        job_id, cycle, script_name, source, attempts = row
+        if attempts >= QUEUE_CONFIG['max_attempts']:
+            conn.execute("UPDATE jobs SET status = 'failed' WHERE id = ?", (job_id,))
+            conn.execute("COMMIT")
+            print(f"[QUEUE] Giving up on {source} after {attempts} attempts")
+            continue
         
-        # Commit
-        msg = f"Auto-update {datetime.now().strftime('%Y-%m-%d %H:%M')} - {copied} feeds"
-        commit = subprocess.run(["git", "-C", REPO_DIR_UNIQUE, "commit", "-m", msg],
-                               capture_output=True, text=True, timeout=10)
-        if commit.returncode != 0:
-            print(f"[ERROR] Commit failed: {commit.stderr}")
-            return False
+        conn.execute("UPDATE jobs SET status = 'leased', worker = ?, lease_until = ?, attempts = attempts + 1 "
+                     "WHERE id = ?", (worker, now + QUEUE_CONFIG['visibility_timeout'], job_id))
+        conn.execute("COMMIT")
+        return {"id": job_id, "cycle": cycle, "script": script_name, "source": source}
+
+
+def ack_job(conn, job, worker, payload):
+    """Store a job's results and mark it done (only if we still hold the lease)"""
+    conn.execute("BEGIN IMMEDIATE")
+    held = conn.execute("SELECT 1 FROM jobs WHERE id = ? AND worker = ? AND status = 'leased'",
+                        (job['id'], worker)).fetchone()
+    if held:
+        conn.execute("INSERT OR REPLACE INTO results (cycle, script, source, payload, worker, finished_at) "
+                     "VALUES (?, ?, ?, ?, ?, ?)",
+                     (job['cycle'], job['script'], job['source'], payload, worker, time.time()))
+        conn.execute("UPDATE jobs SET status = 'done', lease_until = NULL WHERE id = ?", (job['id'],))
+    conn.execute("COMMIT")
+    return bool(held)
+
+
+def release_job(conn, job, worker):
+    """Give a failed job back to the queue for another attempt"""
+    conn.execute("UPDATE jobs SET status = 'queued', worker = NULL, lease_until = NULL "
+                 "WHERE id = ? AND worker = ? AND status = 'leased'", (job['id'], worker))
+
+
+def pending_jobs(conn, cycle=None):
+    query = "SELECT COUNT(*) FROM jobs WHERE status IN ('queued', 'leased')"
+    if cycle:
+        return conn.execute(query + " AND cycle = ?", (cycle,)).fetchone()[0]
+    return conn.execute(query).fetchone()[0]
+
+
+def run_worker():
+    """Claim and run jobs until the queue is drained"""
+    worker = f"{socket.gethostname()}:{os.getpid()}"
+    descriptions = dict(SCRAPERS)
+    os.makedirs(QUEUE_CONFIG['results_dir'], exist_ok=True)
+    conn = open_queue()
+    done = failed = 0
+    
+    print(f"[WORKER] {worker} started")
+    while True:
+        job = claim_job(conn, worker)
+        if job is None:
+            if not pending_jobs(conn):
+                break
+            # Other workers hold leases; wait in case one of them dies
+            time.sleep(5)
+            continue
         
-        # Push
-        print("[GIT] Pushing...")
-        push = subprocess.run(["git", "-C", REPO_DIR_UNIQUE, "push"],
-                             capture_output=True, text=True, timeout=30)
-        if push.returncode != 0:
-            print(f"[ERROR] Push failed: {push.stderr}")
-            return False
+        results_file = os.path.join(QUEUE_CONFIG['results_dir'], f"job-{job['id']}-{os.getpid()}.json")
+        ok = run_scraper(job['script'], f"{descriptions.get(job['script'], job['script'])}: {job['source']}",
+                         ["--source", job['source'], "--results", results_file])
         
-        print(f"\n[OK] Uploaded {copied} files to GitHub!")
-        return True
+        payload = None
+        if ok and os.path.exists(results_file):
+            with open(results_file, 'r', encoding='utf-8') as f:
+                payload = f.read()
+            os.remove(results_file)
         
-    except Exception as e:
-        print(f"[ERROR] Git upload failed: {e}")
+        if payload and ack_job(conn, job, worker, payload):
+            done += 1
+        else:
+            release_job(conn, job, worker)
+            failed += 1
+    
+    conn.close()
+    print(f"[WORKER] {worker} finished: {done} done, {failed} released")
+    return True
+
+
+def assemble_cycle():
+    """Wait for the latest cycle's jobs, render all outputs, then publish"""
+    conn = open_queue()
+    row = conn.execute("SELECT MAX(cycle) FROM jobs").fetchone()
+    cycle = row[0] if row else None
+    if not cycle:
+        print("[ERROR] Nothing queued")
         return False
-    finally:
-        safe_remove_dir(REPO_DIR_UNIQUE)
+    
+    deadline = time.time() + QUEUE_CONFIG['assemble_wait']
+    while pending_jobs(conn, cycle) and time.time() < deadline:
+        print(f"[QUEUE] Waiting for {pending_jobs(conn, cycle)} jobs in cycle {cycle}...")
+        time.sleep(10)
+    
+    os.makedirs(QUEUE_CONFIG['results_dir'], exist_ok=True)
+    for script_name, description in SCRAPERS:
+        merged = {}
+        for (payload,) in conn.execute("SELECT payload FROM results WHERE cycle = ? AND script = ?",
+                                       (cycle, script_name)):
+            merged.update(json.loads(payload))
+        if not merged:
+            continue
+        
+        merged_file = os.path.join(QUEUE_CONFIG['results_dir'], f"assemble-{cycle}.json")
+        with open(merged_file, 'w', encoding='utf-8') as f:
+            json.dump(merged, f, ensure_ascii=False)
+        run_scraper(script_name, f"{description} (assemble {len(merged)} sources)", ["--assemble", merged_file])
+        os.remove(merged_file)
+    
+    failed = conn.execute("SELECT source FROM jobs WHERE cycle = ? AND status != 'done'", (cycle,)).fetchall()
+    conn.close()
+    if failed:
+        print(f"[WARN] {len(failed)} sources missing from cycle {cycle}: {', '.join(r[0] for r in failed)}")
+    
+    upload_ok = upload_to_github()
+    cleanup_old_backups()
+    return upload_ok
+
+
+def parse_args():
+    import argparse
+    
+    parser = argparse.ArgumentParser(description="SPZ Auto-Update")
+    parser.add_argument('--daemon', action='store_true',
+                        help="Run continuously, polling each source on its own learned interval")
+    parser.add_argument('--enqueue', action='store_true',
+                        help="Queue one job per source for a new cycle")
+    parser.add_argument('--worker', action='store_true',
+                        help="Claim and run queued jobs until the queue is drained (run many)")
+    parser.add_argument('--assemble', action='store_true',
+                        help="Render outputs from the latest cycle's results and upload")
+    parser.add_argument('--publish', action='store_true',
+                        help="Only push changed feed files to GitHub (e.g. from the breaking hook)")
+    parser.add_argument('--profile-memory', action='store_true',
+                        help="Report memory per stage here and in every scraper run (see MEMORY_CONFIG)")
+    parser.add_argument('--memory-budget', type=float, metavar='MB',
+                        help="With --profile-memory: exit with status 3 if peak RSS goes over this many MB (also passed to each scraper)")
+    return parser.parse_args()
+
 
 def main():
     print("=" * 65)
@@ -244,6 +767,7 @@ def main():
     
     scraping_time = time.time() - total_start
     print(f"\n[PHASE 1] Done in {scraping_time:.1f}s")
+    memory_stage('scrape')
     
     # Count local files
     local_files = [f for f in os.listdir(FEEDS_DIR) if f.endswith('.xml')]
@@ -262,6 +786,7 @@ def main():
         print(f"[PHASE 2] Done in {upload_time:.1f}s")
     else:
         print(f"[PHASE 2] Failed after {upload_time:.1f}s")
+    memory_stage('upload')
     
     # PHASE 3: CLEANUP
     print("\n" + "=" * 65)
@@ -279,6 +804,7 @@ def main():
     print(f"Twitter Scraping: {'✅ Success' if twitter_ok else '❌ Failed'}")
     print(f"GitHub Upload:    {'✅ Success' if upload_ok else '❌ Failed'}")
     print(f"Old files:        {removed} cleaned")
+    print_budget(load_budget())
     print(f"Total time:       {total_time:.1f}s")
     print("=" * 65)
     
@@ -290,6 +816,25 @@ if __name__ == "__main__":
     os.chdir(script_dir)
     print(f"[INIT] Working directory: {script_dir}")
     
-    success = main()
+    args = parse_args()
+    if args.profile_memory:
+        start_memory_profile(args.memory_budget)
+        SCRAPER_ARGS.append('--profile-memory')
+        if args.memory_budget is not None:
+            SCRAPER_ARGS += ['--memory-budget', f"{args.memory_budget:g}"]
+    if args.daemon:
+        success = run_daemon()
+    elif args.enqueue:
+        success = enqueue_cycle()
+    elif args.worker:
+        success = run_worker()
+    elif args.assemble:
+        success = assemble_cycle()
+    elif args.publish:
+        success = upload_to_github()
+    else:
+        success = main()
+    if not finish_memory_profile():
+        sys.exit(MEMORY_BUDGET_EXIT)
     sys.exit(0 if success else 1)
 
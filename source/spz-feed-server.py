@@ -0,0 +1,287 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+SPZ Feed Server
+Serves everything in spz-feeds/ straight from memory, so readers can poll us
+directly instead of waiting for GitHub or a fresh catbox link
+"""
+
+import sys
+import io
+sys.stdout = io.TextIOWrapper(sys.stdout.buffer, encoding='utf-8', line_buffering=True)
+
+import os
+import re
+import gzip
+import json
+import hashlib
+import argparse
+import threading
+from collections import namedtuple
+from datetime import datetime
+from email.utils import formatdate, parsedate_to_datetime
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+CONFIG = {
+    "feeds_dir": "spz-feeds/",
+    "host": "127.0.0.1",
+    "port": 8080,
+    "scan_interval": 1.0,          # Seconds between checks for rewritten feeds
+    "min_gzip_bytes": 512,         # Tiny responses aren't worth compressing
+    "media_dir": "media/",         # Scraper thumbnails, under feeds_dir; read from disk per request
+    "content_types": {
+        ".xml": "application/rss+xml; charset=utf-8",
+        ".json": "application/feed+json; charset=utf-8",
+        ".ndjson": "application/x-ndjson; charset=utf-8",
+    },
+}
+
+# Thumbnails are content-addressed (see the scrapers' media_proxy_dir), so never change
+MEDIA_NAME_RE = re.compile(r'^media/([0-9a-f]{32}\.jpg)$')
+
+# One immutable snapshot per feed; swapping the dict entry is atomic
+Feed = namedtuple('Feed', ['body', 'gzip_body', 'etag', 'mtime', 'content_type', 'stat_key'])
+
+feeds = {}
+
+
+def is_complete(filename, body):
+    """Skip files a scraper is still in the middle of writing"""
+    if filename.endswith('.xml'):
+        return body.rstrip().endswith(b'</rss>')
+    if filename.endswith('.json'):
+        return body.rstrip().endswith(b'}')
+    if filename.endswith('.ndjson'):
+        return not body or body.endswith(b'\n')    # An empty feed is an empty snapshot
+    return bool(body)
+
+
+def load_feed(path, filename, stat_key):
+    """Read one feed file into a Feed snapshot, or None if it isn't ready"""
+    try:
+        with open(path, 'rb') as f:
+            body = f.read()
+    except OSError:
+        return None
+    if not is_complete(filename, body):
+        return None
+    
+    digest = hashlib.sha256(body).hexdigest()[:32]
+    gzip_body = None
+    if len(body) >= CONFIG['min_gzip_bytes']:
+        gzip_body = gzip.compress(body, compresslevel=9, mtime=0)
+    ext = os.path.splitext(filename)[1]
+    return Feed(body, gzip_body, digest, int(stat_key[0]), CONFIG['content_types'][ext], stat_key)
+
+
+def scan_feeds():
+    """Pick up new, rewritten and deleted feed files
+    Returns the names that changed.
+    """
+    global feeds
+    changed = []
+    seen = set()
+    
+    try:
+        entries = list(os.scandir(CONFIG['feeds_dir']))
+    except FileNotFoundError:
+        entries = []
+    
+    current = dict(feeds)
+    for entry in entries:
+        name = entry.name
+        if os.path.splitext(name)[1] not in CONFIG['content_types'] or not entry.is_file():
+            continue
+        seen.add(name)
+        st = entry.stat()
+        stat_key = (st.st_mtime, st.st_size)
+        old = current.get(name)
+        if old and old.stat_key == stat_key:
+            continue
+        feed = load_feed(entry.path, name, stat_key)
+        if feed is None:
+            continue                   # Half-written; try again next scan
+        if old and old.etag == feed.etag:
+            current[name] = feed       # Touched but identical, keep the same ETag
+            continue
+        current[name] = feed
+        changed.append(name)
+    
+    for name in set(current) - seen:
+        del current[name]
+        changed.append(name)
+    
+    if changed:
+        feeds = current
+    return changed
+
+
+def watch_feeds(stop):
+    while not stop.wait(CONFIG['scan_interval']):
+        try:
+            changed = scan_feeds()
+        except Exception as e:
+            print(f"[ERROR] Scan failed: {e}")
+            continue
+        if changed:
+            print(f"[RELOAD] {len(changed)} feed(s): {', '.join(sorted(changed)[:5])}"
+                  + (" ..." if len(changed) > 5 else ""))
+
+
+def build_index(snapshot):
+    """Small JSON listing of every feed we serve"""
+    items = []
+    for name in sorted(snapshot):
+        feed = snapshot[name]
+        items.append({
+            "url": "/" + name,
+            "bytes": len(feed.body),
+            "etag": feed.etag,
+            "last_modified": datetime.fromtimestamp(feed.mtime).isoformat(timespec='seconds'),
+        })
+    return json.dumps({"feeds": items}, ensure_ascii=False, indent=1).encode('utf-8')
+
+
+class FeedHandler(BaseHTTPRequestHandler):
+    server_version = "SPZFeedServer/1.0"
+    protocol_version = "HTTP/1.1"
+    
+    def log_message(self, format, *args):
+        pass
+    
+    def do_HEAD(self):
+        self.handle_get(head=True)
+    
+    def do_GET(self):
+        self.handle_get(head=False)
+    
+    def handle_get(self, head):
+        snapshot = feeds
+        path = self.path.split('?', 1)[0].lstrip('/')
+        
+        if path in ('', 'index.json'):
+            self.send_body(200, build_index(snapshot), "application/json; charset=utf-8", head)
+            return
+        
+        media = MEDIA_NAME_RE.match(path)
+        if media:
+            self.send_media(media.group(1), head)
+            return
+        
+        feed = snapshot.get(path)
+        if feed is None:
+            self.send_body(404, b"Not found\n", "text/plain; charset=utf-8", head)
+            return
+        
+        use_gzip = feed.gzip_body is not None and accepts_gzip(self.headers.get('Accept-Encoding', ''))
+        etag = f'"{feed.etag}-gz"' if use_gzip else f'"{feed.etag}"'
+        headers = {
+            "ETag": etag,
+            "Last-Modified": formatdate(feed.mtime, usegmt=True),
+            "Cache-Control": "no-cache",
+            "Vary": "Accept-Encoding",
+        }
+        
+        if not_modified(self.headers, feed):
+            self.send_response(304)
+            for key, value in headers.items():
+                self.send_header(key, value)
+            self.end_headers()
+            return
+        
+        if use_gzip:
+            headers["Content-Encoding"] = "gzip"
+        self.send_body(200, feed.gzip_body if use_gzip else feed.body, feed.content_type, head, headers)
+    
+    def send_media(self, name, head):
+        etag = f'"{name[:-4]}"'
+        headers = {"ETag": etag, "Cache-Control": "public, max-age=31536000, immutable"}
+        if self.headers.get('If-None-Match', '').strip() == etag:
+            self.send_response(304)
+            for key, value in headers.items():
+                self.send_header(key, value)
+            self.end_headers()
+            return
+        try:
+            with open(os.path.join(CONFIG['feeds_dir'], CONFIG['media_dir'], name), 'rb') as f:
+                body = f.read()
+        except OSError:
+            self.send_body(404, b"Not found\n", "text/plain; charset=utf-8", head)
+            return
+        self.send_body(200, body, "image/jpeg", head, headers)
+    
+    def send_body(self, status, body, content_type, head, headers=None):
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        for key, value in (headers or {}).items():
+            self.send_header(key, value)
+        self.end_headers()
+        if not head:
+            self.wfile.write(body)
+
+
+def accepts_gzip(header):
+    for part in header.split(','):
+        coding, _, params = part.strip().partition(';')
+        if coding.strip().lower() in ('gzip', '*'):
+            return params.replace(' ', '') not in ('q=0', 'q=0.0', 'q=0.00', 'q=0.000')
+    return False
+
+
+def not_modified(headers, feed):
+    """If-None-Match wins over If-Modified-Since (RFC 9110 13.2.2)"""
+    inm = headers.get('If-None-Match')
+    if inm is not None:
+        if inm.strip() == '*':
+            return True
+        for tag in inm.split(','):
+            tag = tag.strip()
+            if tag.startswith('W/'):
+                tag = tag[2:]
+            if tag.strip('"').removesuffix('-gz') == feed.etag:
+                return True
+        return False
+    
+    ims = headers.get('If-Modified-Since')
+    if ims:
+        try:
+            return int(parsedate_to_datetime(ims).timestamp()) >= feed.mtime
+        except (TypeError, ValueError):
+            return False
+    return False
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Serve SPZ feeds over HTTP from memory")
+    parser.add_argument('--host', default=CONFIG['host'])
+    parser.add_argument('--port', type=int, default=CONFIG['port'])
+    parser.add_argument('--dir', default=CONFIG['feeds_dir'], help="Feeds directory (default spz-feeds/)")
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    CONFIG['feeds_dir'] = args.dir
+    
+    scan_feeds()
+    print(f"[SERVER] {len(feeds)} feeds from {CONFIG['feeds_dir']}")
+    
+    stop = threading.Event()
+    threading.Thread(target=watch_feeds, args=(stop,), daemon=True).start()
+    
+    server = ThreadingHTTPServer((args.host, args.port), FeedHandler)
+    server.daemon_threads = True
+    print(f"[SERVER] Listening on http://{args.host}:{args.port}/ (index at /index.json)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print("\n[SERVER] Stopped")
+    finally:
+        stop.set()
+        server.server_close()
+    return True
+
+
+if __name__ == "__main__":
+    sys.exit(0 if main() else 1)
@@ -11,10 +11,22 @@ sys.stdout = io.TextIOWrapper(sys.stdout.buffer, encoding='utf-8')
 sys.stderr = io.TextIOWrapper(sys.stderr.buffer, encoding='utf-8')
 
 from datetime import datetime, timezone
+import json
 import time
 import os
 import re
-import requests
+
+from spz_common import (
+    use_config, build_keyword_trie, match_keywords, canonical_url, format_rfc2822, escape_xml,
+    accept_encoding, transfer_stats, write_precompressed, SPZ_NS, collect_json,
+    skipped_elements, top_unique, iso_date, save_json_outputs, load_media_cache,
+    save_media_cache, probe_media, load_media_store, proxy_media, save_media_store,
+    report_image_dupes, save_throttle, throttled_get, index_items, archive_items, read_archive,
+    parse_window, load_health, save_health, is_quarantined, record_health, print_health_summary,
+    schedule_sources, out_of_time, record_deadline_skip, MEMORY_BUDGET_EXIT,
+    start_memory_profile, memory_source, memory_stage, finish_memory_profile, emit_breaking,
+    load_budget, budget_reached, add_to_budget, print_budget
+)
 
 REDDIT_SUBREDDITS = [
     {"name": "r/Israel", "subreddit": "Israel", "category": "news", "priority": "high"},
@@ -39,23 +51,195 @@ CONFIG = {
     "timeout": 10,
     "output_dir": "spz-feeds/",
     "user_agent": "Mozilla/5.0 (compatible; SPZ-Research/1.0; Bot)",
-    "delay_between_subreddits": 2.0,   # Reduced from 4.0
+    "throttle_file": "spz-throttle.json",  # Per-host request state, shared by all scrapers
+    "throttle_rate": 0.5,              # Requests per second per host once the burst is spent
+    "throttle_burst": 2,
+    "throttle_retries": 2,             # Retries after a 429/5xx, each after the host's backoff
+    "throttle_backoff_base": 2,        # Seconds; doubles per failure, with jitter
+    "throttle_backoff_max": 600,
+    "throttle_max_wait": 30,           # Fail a request instead of waiting longer than this
+    "throttle_state_ttl": 3600,        # Forget a host's backoff and bucket after an hour
+    "max_total_time": 540,             # Fetch deadline, under run_scraper's 600s kill
+    "probe_media": False,              # HEAD-probe enclosures for real type/length
+    "media_probe_workers": 8,
+    "media_probe_timeout": 5,
+    "media_cache_file": "spz-media-cache.json",
+    "media_cache_ttl_hours": 24 * 30,
+    "media_probe_retry_hours": 6,      # Failed probes wait this long before being tried again
+    "media_proxy_base_url": None,      # Public URL of media_proxy_dir, e.g. "http://host:8080/media/" (None to disable)
+    "media_proxy_dir": "spz-feeds/media/",  # Thumbnail store shared by the scrapers, served by spz-feed-server.py
+    "media_proxy_max_bytes": 200 * 1024 * 1024,
+    "media_proxy_max_download": 20 * 1024 * 1024,  # Originals larger than this keep their remote URL
+    "media_proxy_workers": 8,
+    "media_thumb_size": 640,           # Longest side of a thumbnail, in px
+    "media_thumb_quality": 70,
+    "media_dhash_distance": 6,         # Bits of 64 two images may differ by and still count as one
+    "precompress_outputs": False,      # Also write .xml.gz / .xml.br next to each feed
+    "posts_store_file": "spz-reddit-posts.json",  # Last posts per subreddit (for --source runs)
+    "index_db": "spz-index.db",        # Local full-text index (None to disable)
+    "index_retention_days": 30,
+    "archive_dir": "spz-archive/",     # Day-partitioned item archive (None to disable)
+    "health_file": "spz-reddit-health.json",
+    "quarantine_after": 3,             # Consecutive failures before a subreddit is skipped
+    "quarantine_base": 3600,           # First re-probe after 1h, doubling per failed probe
+    "quarantine_max": 48 * 3600,
+    "health_latency_samples": 50,
+    "memory_budget_mb": None,          # Fail a --profile-memory run whose peak RSS passes this
+    "memory_top_sites": 8,             # Allocation sites listed per stage
+    "memory_report_file": "spz-reddit-memory.json",  # Written by --profile-memory runs
+    "breaking_threshold": 9,           # Relevancy meter score (1-10) for the fast lane (None to disable)
+    "breaking_file": "breaking.xml",
+    "breaking_store_file": "spz-breaking.json",  # Shared by all scrapers
+    "breaking_max_items": 30,
+    "breaking_max_age_hours": 24,
+    "breaking_hook": None,             # Argv per item: JSON on stdin, alert text in $SPZ_ALERT
+    "breaking_webhook": None,          # URL to POST each item to as JSON
+    "breaking_publish_cmd": None,      # Argv, run for the first breaking batch of a run
+    "budget_file": "spz-shared/data/relevancy-budget.json",
+    "budget_window_hours": 4,
+    "budget_limit": 200,               # Accumulated meter score that ends the window (None to disable)
+    "budget_skip_priorities": ["low"],
 }
+use_config(CONFIG)
 
 os.makedirs(CONFIG['output_dir'], exist_ok=True)
 
+# === CONTENT FILTERS ===
+# POSITIVE: Israel/Jewish context (always allow)
+ISRAEL_CONTEXT_KEYWORDS = [
+    'israel', 'israeli', 'israelis', 'gaza', 'palestine', 'palestinian', 
+    'idf', 'jerusalem', 'netanyahu', 'tel aviv', 'hamas', 
+    'jew', 'jewish', 'jews', 'zionist', 'zionism', 'judaism', 'rabbi',
+    'yom kippur', 'rosh hashanah', 'passover', 'hanukkah', 'shabbat',
+    'gal gadot', 'natalie portman', 'bar refaeli', 'yair lapid', 
+    'mossad', 'knesset', 'aliyah'
+]
+
+# NEGATIVE: Other countries (block unless has Israel context)
+OTHER_COUNTRY_KEYWORDS = [
+    'ukraine', 'ukrainian', 'kyiv', 'kharkiv', 'odesa', 'odessa', 'luhansk', 'donetsk', 'kiev',
+    'russia', 'russian', 'putin', 'kremlin', 'moscow', 'vladimir',
+    'france', 'french', 'macron', 'paris', 'germany', 'german', 'merkel', 'scholz', 'berlin',
+    'uk', 'british', 'britain', 'england', 'london', 'boris johnson', 'rishi sunak',
+    'italy', 'italian', 'rome', 'meloni', 'spain', 'spanish', 'madrid',
+    'china', 'chinese', 'beijing', 'xi jinping', 'japan', 'japanese', 'tokyo',
+    'india', 'indian', 'modi', 'pakistan', 'bangladesh',
+    'iran', 'iranian', 'tehran', 'iraq', 'iraqi', 'baghdad', 
+    'syria', 'syrian', 'damascus', 'assad', 'lebanon', 'lebanese', 'beirut',
+    'turkey', 'turkish', 'erdogan', 'istanbul',
+    'egypt', 'egyptian', 'cairo', 'saudi', 'uae', 'dubai', 'qatar',
+    'usa', 'united states', 'america', 'american', 'biden', 'trump',
+    'canada', 'canadian', 'trudeau', 'mexico', 'mexican',
+    'brazil', 'brazilian', 'lula', 'argentina', 'chile', 'colombia',
+    'south africa', 'nigeria', 'kenya', 'australia', 'australian'
+]
+
+# Title keywords for the content half of the dual score (+5 each)
+CONTENT_SCORE_KEYWORDS = ['israel', 'gaza', 'war', 'hamas', 'trump', 'ukraine', 'attack']
 
-def format_rfc2822(dt=None):
-    if dt is None:
-        dt = datetime.now(timezone.utc)
-    return dt.strftime("%a, %d %b %Y %H:%M:%S %z")
+# Hebrew surface forms -> the English keyword they count as
+HEBREW_KEYWORD_ALIASES = {
+    # Israel/Jewish context
+    'ישראל': 'israel',
+    'ישראלי': 'israeli',
+    'ישראלית': 'israeli',
+    'ישראלים': 'israelis',
+    'עזה': 'gaza',
+    'פלסטין': 'palestine',
+    'פלסטיני': 'palestinian',
+    'פלסטינים': 'palestinian',
+    'צה"ל': 'idf',
+    'ירושלים': 'jerusalem',
+    'נתניהו': 'netanyahu',
+    'תל אביב': 'tel aviv',
+    'חמאס': 'hamas',
+    'יהודי': 'jew',
+    'יהודית': 'jewish',
+    'יהודים': 'jews',
+    'ציוני': 'zionist',
+    'ציונות': 'zionism',
+    'יהדות': 'judaism',
+    'הרב': 'rabbi',
+    'יום כיפור': 'yom kippur',
+    'ראש השנה': 'rosh hashanah',
+    'פסח': 'passover',
+    'חנוכה': 'hanukkah',
+    'שבת': 'shabbat',
+    'גל גדות': 'gal gadot',
+    'נטלי פורטמן': 'natalie portman',
+    'בר רפאלי': 'bar refaeli',
+    'יאיר לפיד': 'yair lapid',
+    'בנימין נתניהו': 'benjamin netanyahu',
+    'בני גנץ': 'benny gantz',
+    'נפתלי בנט': 'naftali bennett',
+    'המוסד': 'mossad',
+    'שב"כ': 'shin bet',
+    'כנסת': 'knesset',
+    'עולים חדשים': 'aliyah',
+    'תפוצות': 'diaspora',
+    # Other countries
+    'אוקראינה': 'ukraine',
+    'קייב': 'kyiv',
+    'רוסיה': 'russia',
+    'פוטין': 'putin',
+    'הקרמלין': 'kremlin',
+    'מוסקבה': 'moscow',
+    'צרפת': 'france',
+    'מקרון': 'macron',
+    'פריז': 'paris',
+    'גרמניה': 'germany',
+    'ברלין': 'berlin',
+    'בריטניה': 'britain',
+    'אנגליה': 'england',
+    'לונדון': 'london',
+    'איטליה': 'italy',
+    'ספרד': 'spain',
+    'סין': 'china',
+    'בייג\'ינג': 'beijing',
+    'יפן': 'japan',
+    'פקיסטן': 'pakistan',
+    'איראן': 'iran',
+    'איראני': 'iranian',
+    'טהרן': 'tehran',
+    'עיראק': 'iraq',
+    'סוריה': 'syria',
+    'סורי': 'syrian',
+    'דמשק': 'damascus',
+    'אסד': 'assad',
+    'לבנון': 'lebanon',
+    'ביירות': 'beirut',
+    'טורקיה': 'turkey',
+    'ארדואן': 'erdogan',
+    'מצרים': 'egypt',
+    'קהיר': 'cairo',
+    'סעודיה': 'saudi',
+    'איחוד האמירויות': 'uae',
+    'דובאי': 'dubai',
+    'קטאר': 'qatar',
+    'ארה"ב': 'usa',
+    'ארצות הברית': 'united states',
+    'אמריקה': 'america',
+    'אמריקאי': 'american',
+    'ביידן': 'biden',
+    'טראמפ': 'trump',
+    'קנדה': 'canada',
+    'מקסיקו': 'mexico',
+    'ברזיל': 'brazil',
+    'ארגנטינה': 'argentina',
+    'דרום אפריקה': 'south africa',
+    'אוסטרליה': 'australia',
+    # Scoring
+    'מלחמה': 'war',
+    'מתקפה': 'attack',
+    'פיגוע': 'attack',
+}
 
 
-def escape_xml(text):
-    if not text:
-        return ""
-    return (text.replace("&", "&amp;").replace("<", "&lt;").replace(">", "&gt;")
-            .replace('"', "&quot;").replace("'", "&apos;"))
+KEYWORD_TRIE = build_keyword_trie({
+    'israel_context': ISRAEL_CONTEXT_KEYWORDS,
+    'other_country': OTHER_COUNTRY_KEYWORDS,
+    'content': CONTENT_SCORE_KEYWORDS,
+}, HEBREW_KEYWORD_ALIASES)
 
 
 def extract_media_urls(post_data):
@@ -105,11 +289,19 @@ def extract_media_urls(post_data):
     return unique[:2]  # Top 2
 
 
+def is_off_topic(text):
+    """True for posts about other countries with no Israel context"""
+    # === CONTENT FILTERS ===
+    # POSITIVE: Israel/Jewish context (always allow)
+    # NEGATIVE: Other countries (block unless has Israel context)
+    hits = match_keywords(text, KEYWORD_TRIE)
+    return 'other_country' in hits and 'israel_context' not in hits
+
+
 def calculate_dual_score(post):
     """Combined content + engagement score"""
-    title = post.get('title', '').lower()
-    keywords = ['israel', 'gaza', 'war', 'hamas', 'trump', 'ukraine', 'attack']
-    content_score = sum(5 for kw in keywords if kw in title)
+    hits = match_keywords(post.get('title', ''), KEYWORD_TRIE)
+    content_score = 5 * len(hits.get('content', ()))
     
     upvotes = post.get('score', 0)
     comments = post.get('num_comments', 0)
@@ -176,16 +368,20 @@ def build_rss_description(post, media_urls):
     return "\n".join(parts)
 
 
-def fetch_subreddit_posts(subreddit_config):
+def fetch_subreddit_posts(subreddit_config, errors=None):
     subreddit = subreddit_config['subreddit']
     url = f"https://www.reddit.com/r/{subreddit}/new.json?limit={CONFIG['posts_per_subreddit']}"
-    headers = {"User-Agent": CONFIG['user_agent']}
+    headers = {"User-Agent": CONFIG['user_agent'], "Accept-Encoding": accept_encoding()}
     
     try:
-        resp = requests.get(url, headers=headers, timeout=CONFIG['timeout'])
+        resp = throttled_get(url, headers=headers, timeout=CONFIG['timeout'])
         resp.raise_for_status()
         data = resp.json()
         
+        wire, decoded = transfer_stats(resp)
+        print(f"   [NET] {wire / 1024:.1f} KB wire / {decoded / 1024:.1f} KB "
+              f"({resp.headers.get('Content-Encoding', 'identity')}, {decoded / max(wire, 1):.1f}x)")
+        
         posts = []
         for child in data.get('data', {}).get('children', []):
             pd = child.get('data', {})
@@ -196,43 +392,9 @@ def fetch_subreddit_posts(subreddit_config):
                 continue
             
             # Filter out Ukraine-related posts
-            title_lower = (pd.get('title', '') or '').lower()
-            selftext_lower = (pd.get('selftext', '') or '').lower()
-            combined = title_lower + ' ' + selftext_lower
-            
-            # === CONTENT FILTERS ===
-            # POSITIVE: Israel/Jewish context (always allow)
-            israel_context = [
-                'israel', 'israeli', 'israelis', 'gaza', 'palestine', 'palestinian', 
-                'idf', 'jerusalem', 'netanyahu', 'tel aviv', 'hamas', 
-                'jew', 'jewish', 'jews', 'zionist', 'zionism', 'judaism', 'rabbi',
-                'yom kippur', 'rosh hashanah', 'passover', 'hanukkah', 'shabbat',
-                'gal gadot', 'natalie portman', 'bar refaeli', 'yair lapid', 
-                'mossad', 'knesset', 'aliyah'
-            ]
-            has_israel_context = any(kw in combined for kw in israel_context)
-            
-            # NEGATIVE: Other countries (block unless has Israel context)
-            other_countries = [
-                'ukraine', 'ukrainian', 'kyiv', 'kharkiv', 'odesa', 'odessa', 'luhansk', 'donetsk', 'kiev',
-                'russia', 'russian', 'putin', 'kremlin', 'moscow', 'vladimir',
-                'france', 'french', 'macron', 'paris', 'germany', 'german', 'merkel', 'scholz', 'berlin',
-                'uk', 'british', 'britain', 'england', 'london', 'boris johnson', 'rishi sunak',
-                'italy', 'italian', 'rome', 'meloni', 'spain', 'spanish', 'madrid',
-                'china', 'chinese', 'beijing', 'xi jinping', 'japan', 'japanese', 'tokyo',
-                'india', 'indian', 'modi', 'pakistan', 'bangladesh',
-                'iran', 'iranian', 'tehran', 'iraq', 'iraqi', 'baghdad', 
-                'syria', 'syrian', 'damascus', 'assad', 'lebanon', 'lebanese', 'beirut',
-                'turkey', 'turkish', 'erdogan', 'istanbul',
-                'egypt', 'egyptian', 'cairo', 'saudi', 'uae', 'dubai', 'qatar',
-                'usa', 'united states', 'america', 'american', 'biden', 'trump',
-                'canada', 'canadian', 'trudeau', 'mexico', 'mexican',
-                'brazil', 'brazilian', 'lula', 'argentina', 'chile', 'colombia',
-                'south africa', 'nigeria', 'kenya', 'australia', 'australian'
-            ]
-            is_about_other = any(kw in combined for kw in other_countries)
+            combined = (pd.get('title', '') or '') + ' ' + (pd.get('selftext', '') or '')
             
-            if is_about_other and not has_israel_context:
+            if is_off_topic(combined):
                 print(f"   [FILTERED] Non-Israel content skipped: {pd.get('title', '')[:40]}...")
                 continue
             
@@ -249,6 +411,7 @@ def fetch_subreddit_posts(subreddit_config):
                 'upvote_ratio': pd.get('upvote_ratio', 0),
                 'domain': pd.get('domain', ''),
                 'is_self': pd.get('is_self', False),
+                'created_utc': int(pd.get('created_utc') or 0) or None,
                 'fetched_at': format_rfc2822(),
                 'category': subreddit_config.get('category', 'reddit'),
             }
@@ -264,73 +427,454 @@ def fetch_subreddit_posts(subreddit_config):
         
     except Exception as e:
         print(f"   [ERR] {str(e)[:40]}")
+        if errors is not None:
+            errors[subreddit_config['name']] = f"{type(e).__name__}: {e}"
         return []
 
 
-def generate_feed_xml(items, title, desc, filename):
-    items = items or []
-    
-    items.sort(key=lambda x: (-x.get('dual_score', 0), -x.get('score', 0)))
-    date = format_rfc2822()
-    
-    xml = ['<?xml version="1.0" encoding="UTF-8"?>']
-    xml.append('<rss version="2.0" xmlns:atom="http://www.w3.org/2005/Atom" xmlns:media="http://search.yahoo.com/mrss/">')
-    xml.append('<channel>')
-    xml.append(f'  <title>{escape_xml(title)}</title>')
-    xml.append(f'  <link>https://spz.local/{filename}</link>')
-    xml.append(f'  <description>{escape_xml(desc)}</description>')
-    xml.append(f'  <lastBuildDate>{date}</lastBuildDate>')
+def apply_media_metadata(posts, cache):
+    """Fill media_type/media_length for each post's enclosure"""
+    probed = probe_media([p['media_urls'][0][1] for p in posts if p.get('media_urls')], cache)
+    for post in posts:
+        if post.get('media_urls'):
+            meta = probed.get(post['media_urls'][0][1])
+            if meta:
+                post['media_type'] = meta['type']
+                post['media_length'] = meta['length']
+
+
+def apply_media_proxy(posts, store):
+    """Point each post's images at local thumbnails (the originals are kept in source_media_urls)
+    Videos keep their v.redd.it URLs.
+    """
+    for post in posts:
+        if post.get('media_urls') and 'source_media_urls' not in post:
+            post['source_media_urls'] = post['media_urls']
+    proxied = proxy_media([url for p in posts for src, url, mtype in p.get('source_media_urls', [])
+                           if mtype == 'image'], store)
+    for post in posts:
+        media = []
+        for src, url, mtype in post.get('source_media_urls', []):
+            local = proxied.get(url) if mtype == 'image' else None
+            media.append((src, local[0] if local else url, mtype))
+            if local and len(media) == 1:
+                post['media_type'], post['media_length'] = 'image/jpeg', local[1]
+        if media:
+            post['media_urls'] = media
+    report_image_dupes([(f"r/{p.get('subreddit', '')}: {p.get('title', '')[:50]}", url)
+                        for p in posts for src, url, mtype in p.get('source_media_urls', []) if mtype == 'image'], store)
+
+
+def iter_feed_xml(items, title, desc, filename, skipped=()):
+    """Yield one feed document line by line (items already ranked)
+    skipped: subreddits this run left out for time, listed on the channel.
+    """
+    yield '<?xml version="1.0" encoding="UTF-8"?>'
+    yield f'<rss version="2.0" xmlns:atom="http://www.w3.org/2005/Atom" xmlns:media="http://search.yahoo.com/mrss/" xmlns:spz="{SPZ_NS}">'
+    yield '<channel>'
+    yield f'  <title>{escape_xml(title)}</title>'
+    yield f'  <link>https://spz.local/{filename}</link>'
+    yield f'  <description>{escape_xml(desc)}</description>'
+    yield f'  <lastBuildDate>{format_rfc2822()}</lastBuildDate>'
+    yield from skipped_elements(skipped)
     
     for item in items:
-        xml.append('  <item>')
-        xml.append(f'    <title>{escape_xml(item["title"])}</title>')
-        xml.append(f'    <link>https://reddit.com{item["permalink"]}</link>')
+        yield '  <item>'
+        yield f'    <title>{escape_xml(item["title"])}</title>'
+        yield f'    <link>https://reddit.com{item["permalink"]}</link>'
         
         media = item.get('media_urls', [])
         desc_content = build_rss_description(item, media)
-        xml.append(f'    <description><![CDATA[{desc_content}]]></description>')
+        yield f'    <description><![CDATA[{desc_content}]]></description>'
         
         # Enclosure for first media
         if media:
             url, mtype = media[0][1], media[0][2]
-            mtype_full = 'video/mp4' if mtype == 'video' else 'image/jpeg'
-            xml.append(f'    <enclosure url="{url}" type="{mtype_full}" />')
-            xml.append(f'    <media:content url="{url}" type="{mtype_full}" />')
+            mtype_full = item.get('media_type') or ('video/mp4' if mtype == 'video' else 'image/jpeg')
+            length = item.get('media_length') or 0
+            yield f'    <enclosure url="{url}" type="{mtype_full}" length="{length}" />'
+            yield f'    <media:content url="{url}" type="{mtype_full}" />'
         
-        xml.append(f'    <dual_score>{item["dual_score"]}</dual_score>')
-        xml.append(f'    <tier>{item["tier"]}</tier>')
-        xml.append('  </item>')
+        yield f'    <spz:dual_score>{item["dual_score"]}</spz:dual_score>'
+        yield f'    <spz:tier>{item["tier"]}</spz:tier>'
+        yield '  </item>'
     
-    xml.append('</channel>')
-    xml.append('</rss>')
+    yield '</channel>'
+    yield '</rss>'
+
+
+def save_feed(lines, filename):
+    """Write a feed line by line to a temp file, then swap it in atomically"""
+    filepath = os.path.join(CONFIG['output_dir'], filename)
+    tmp_path = f"{filepath}.{os.getpid()}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        f.write(next(lines))
+        for line in lines:
+            f.write('\n')
+            f.write(line)
+    os.replace(tmp_path, filepath)
+    if CONFIG['precompress_outputs']:
+        with open(filepath, 'rb') as f:
+            write_precompressed(filepath, f.read())
+
+
+def post_json(post):
+    """JSON Feed entry and snapshot record for one post"""
+    permalink_url = f"https://reddit.com{post.get('permalink', '')}"
+    link = post['url'] if post.get('url') and not post.get('is_self') else None
+    images = [url for src, url, mtype in post.get('media_urls', []) if mtype == 'image']
+    twitter_summary = create_twitter_summary(post)
+    entry = {
+        "id": permalink_url,
+        "url": permalink_url,
+        "external_url": link,
+        "title": post.get('title', ''),
+        "content_html": build_rss_description(post, post.get('media_urls', [])),
+        "image": images[0] if images else None,
+        "date_published": iso_date(post.get('created_utc')),
+        "authors": [{"name": f"u/{post['author']}"}] if post.get('author') else None,
+        "tags": [f"r/{post.get('subreddit', '')}"],
+        "_spz": {
+            "score": post.get('score', 0),
+            "num_comments": post.get('num_comments', 0),
+            "upvote_ratio": post.get('upvote_ratio', 0),
+            "dual_score": post.get('dual_score'),
+            "tier": post.get('tier'),
+            "twitter_summary": twitter_summary,
+        },
+    }
+    snapshot = {
+        "id": post['id'],
+        "subreddit": post.get('subreddit'),
+        "title": post.get('title', ''),
+        "url": permalink_url,
+        "link": link,
+        "created": post.get('created_utc'),
+        "author": post.get('author'),
+        "score": post.get('score', 0),
+        "num_comments": post.get('num_comments', 0),
+        "upvote_ratio": post.get('upvote_ratio', 0),
+        "dual_score": post.get('dual_score'),
+        "tier": post.get('tier'),
+        "media": [[mtype, url] for src, url, mtype in post.get('media_urls', [])],
+        "twitter_summary": twitter_summary,
+    }
+    return entry, snapshot
+
+
+def post_index_row(post):
+    text = f"{post.get('title', '')} {post.get('selftext', '')}"
+    return {
+        'uid': f"reddit:{post['id']}",
+        'kind': 'reddit',
+        'source': f"r/{post.get('subreddit', '')}",
+        'language': 'he' if re.search(r'[\u05d0-\u05ea]', text) else 'en',
+        'score': post.get('dual_score', 0),
+        'published': post.get('created_utc') or int(time.time()),
+        'url': f"https://reddit.com{post.get('permalink', '')}",
+        'title': post.get('title', ''),
+        'body': (post.get('selftext', '') or '')[:2000],
+    }
+
+
+def post_archive_record(post):
+    return {
+        'uid': f"reddit:{post['id']}",
+        'source': f"r/{post.get('subreddit', '')}",
+        'published': post.get('created_utc') or int(time.time()),
+        'item': post,
+    }
+
+
+def record_posts(posts):
+    """Add posts to the search index and the archive"""
+    index_items([post_index_row(p) for p in posts])
+    archive_items('reddit', [post_archive_record(p) for p in posts])
+
+
+def rerender_posts(args):
+    """Rebuild the four Reddit feeds for a time window from the archive, no network
+    Posts are re-filtered and re-scored, so rule and template changes take effect.
+    """
+    start, end = parse_window(args.since, args.until)
+    records = read_archive('reddit', start, end, args.source)
+    print(f"[RERENDER] {len(records)} archived posts in window -> {args.out}")
+    
+    CONFIG['output_dir'] = args.out
+    CONFIG['precompress_outputs'] = False
+    CONFIG['probe_media'] = False
+    CONFIG['media_proxy_base_url'] = None
+    os.makedirs(args.out, exist_ok=True)
+    
+    posts = []
+    for record in records:
+        post = record['item']
+        if is_off_topic(f"{post.get('title', '') or ''} {post.get('selftext', '') or ''}"):
+            continue
+        post['dual_score'] = calculate_dual_score(post)
+        post['tier'] = get_tier(post['dual_score'])
+        posts.append(post)
+    
+    write_feeds(posts)
+
+
+def post_meter_entry(post):
+    created = post.get('created_utc')
+    return {
+        'uid': f"reddit:{post['id']}",
+        'kind': 'reddit',
+        'source': f"r/{post.get('subreddit', '')}",
+        'title': post.get('title', ''),
+        'url': f"https://reddit.com{post.get('permalink', '')}",
+        'summary': (post.get('selftext', '') or '')[:280],
+        'published': format_rfc2822(datetime.fromtimestamp(created, timezone.utc)) if created else post.get('fetched_at'),
+        'relevance': round(post.get('dual_score', 0) / 10, 1),
+    }
+
+
+def poll_subreddits(subreddits, health, health_updates, report, deadline_skipped, budget_skipped, deadline):
+    """Fetch, parse, filter and score one subreddit at a time, yielding (cfg, posts, result)
+    Skips, health records, the breaking lane and the relevancy budget are handled as
+    each subreddit comes in. `result` is the subreddit's --report entry; skipped ones
+    only go into `report`, which may be None.
+    """
+    budget = load_budget()
+    for idx, cfg in enumerate(subreddits, 1):
+        skipped = None
+        if is_quarantined(health.get(cfg['name'])):
+            print(f"[{idx}/{len(subreddits)}] {cfg['name']} - quarantined, skipped")
+            skipped = {'ok': False, 'error': 'quarantined', 'items': []}
+        elif cfg.get('priority') in CONFIG['budget_skip_priorities'] and budget_reached(budget):
+            print(f"[{idx}/{len(subreddits)}] {cfg['name']} - relevancy budget reached, skipped")
+            skipped = {'ok': True, 'error': None, 'items': [], 'skipped': 'budget'}
+            budget_skipped.append(cfg['name'])
+        elif out_of_time(cfg.get('priority'), health.get(cfg['name']), deadline):
+            print(f"[{idx}/{len(subreddits)}] {cfg['name']} - {cfg['priority']} priority, "
+                  f"{max(0, deadline - time.time()):.0f}s left, skipped")
+            skipped = {'ok': True, 'error': None, 'items': [], 'skipped': 'deadline'}
+            health_updates[cfg['name']] = record_deadline_skip(health, cfg['name'])
+            deadline_skipped.append(cfg['name'])
+        if skipped:
+            if report is not None:
+                report[cfg['name']] = skipped
+            continue
+        
+        print(f"[{idx}/{len(subreddits)}] {cfg['name']}")
+        started = time.time()
+        errors = {}
+        posts = fetch_subreddit_posts(cfg, errors)
+        meter_entries = [post_meter_entry(p) for p in posts]
+        emit_breaking(meter_entries)
+        budget = add_to_budget(meter_entries)
+        health_updates[cfg['name']] = record_health(health, cfg['name'], cfg['name'] not in errors,
+                                                    time.time() - started, len(posts), errors.get(cfg['name']))
+        result = {
+            'ok': cfg['name'] not in errors,
+            'error': errors.get(cfg['name']),
+            'items': [[p['id'], p.get('created_utc')] for p in posts],
+        }
+        if report is not None:
+            report[cfg['name']] = result
+        memory_source(cfg['name'])
+        yield cfg, posts, result
+
+
+def record_stage(polled):
+    """Index and archive each subreddit's posts as they pass, then pass them on"""
+    for cfg, posts, result in polled:
+        record_posts(posts)
+        yield from posts
+
+
+def load_posts_store():
+    """Load last fetched posts per subreddit name"""
+    try:
+        with open(CONFIG['posts_store_file'], 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except:
+        return {}
+
+
+def save_posts_store(store):
+    with open(CONFIG['posts_store_file'], 'w', encoding='utf-8') as f:
+        json.dump(store, f, ensure_ascii=False)
+
+
+def parse_args():
+    import argparse
     
-    return '\n'.join(xml)
+    parser = argparse.ArgumentParser(description="SPZ Reddit XML Generator")
+    parser.add_argument('--source', action='append',
+                        help="Only fetch the named subreddit, e.g. r/Israel (repeatable)")
+    parser.add_argument('--report',
+                        help="Write per-subreddit poll results (ok, item ids, publish times) as JSON")
+    parser.add_argument('--list-sources', action='store_true',
+                        help="Print configured subreddits as JSON and exit")
+    parser.add_argument('--deadline', type=float,
+                        help="Seconds to spend fetching (default max_total_time); medium/low subreddits that won't fit are skipped")
+    parser.add_argument('--results',
+                        help="Fetch only: write fetched posts per subreddit as JSON, no XML")
+    parser.add_argument('--stream', action='store_true',
+                        help="Low-memory run: keep only the top 40 posts, no per-subreddit store (not with --results)")
+    parser.add_argument('--assemble',
+                        help="Render only: write feeds from a --results JSON file, no fetching")
+    parser.add_argument('--rerender', action='store_true',
+                        help="Regenerate feeds from the archive (see --since/--until/--out), no fetching")
+    parser.add_argument('--since', help="Re-render window start, e.g. 2026-10-01 or 2026-10-01T06:00")
+    parser.add_argument('--until', help="Re-render window end (default now)")
+    parser.add_argument('--out', default="spz-rerender/",
+                        help="Output directory for --rerender (default spz-rerender/)")
+    parser.add_argument('--profile-memory', action='store_true',
+                        help="Trace allocations and report memory per stage and per source (see memory_report_file)")
+    parser.add_argument('--memory-budget', type=float, metavar='MB',
+                        help="With --profile-memory: exit with status 3 if peak RSS goes over this many MB")
+    return parser.parse_args()
 
 
-def save_feed(xml_content, filename):
-    with open(os.path.join(CONFIG['output_dir'], filename), 'w', encoding='utf-8') as f:
-        f.write(xml_content)
+def assemble_posts(results_file):
+    """Merge fetched results (see --results) into the posts store, return all posts"""
+    with open(results_file, 'r', encoding='utf-8') as f:
+        results = json.load(f)
+    
+    store = load_posts_store()
+    for name, result in results.items():
+        if result.get('ok'):
+            store[name] = result.get('posts', [])
+    save_posts_store(store)
+    
+    return [p for cfg in REDDIT_SUBREDDITS for p in store.get(cfg['name'], [])]
 
 
-def main():
+def main(args=None):
+    if args is None:
+        args = parse_args()
+    
+    if args.list_sources:
+        print(json.dumps(REDDIT_SUBREDDITS, ensure_ascii=False))
+        return
+    
+    if args.assemble:
+        all_posts = assemble_posts(args.assemble)
+        record_posts(all_posts)
+        write_feeds(all_posts)
+        return
+    
+    if args.rerender:
+        rerender_posts(args)
+        return
+    
+    subreddits = REDDIT_SUBREDDITS
+    if args.source:
+        subreddits = [s for s in REDDIT_SUBREDDITS if s['name'] in args.source]
+    
     print("="*60)
     print("SPZ Reddit XML Generator v3.0 - With Media")
     print("="*60)
     
-    all_posts = []
-    for idx, cfg in enumerate(REDDIT_SUBREDDITS, 1):
-        print(f"[{idx}/{len(REDDIT_SUBREDDITS)}] {cfg['name']}")
-        posts = fetch_subreddit_posts(cfg)
-        if posts:
+    store = load_posts_store()
+    health = load_health()
+    health_updates = {}
+    # A streamed run only keeps per-subreddit results if they were asked for
+    report = {} if args.report or not args.stream else None
+    deadline_skipped = []
+    budget_skipped = []
+    subreddits = schedule_sources(subreddits, health)
+    deadline = time.time() + (args.deadline or CONFIG['max_total_time'])
+    polled = poll_subreddits(subreddits, health, health_updates, report, deadline_skipped, budget_skipped, deadline)
+    
+    if args.stream:
+        # Posts flow through one subreddit at a time; only the feed slots stay in memory
+        top = top_unique(record_stage(polled), FEED_SLOTS, post_rank, post_link_key)
+    else:
+        fetched = {}
+        all_posts = []
+        for cfg, posts, result in polled:
             all_posts.extend(posts)
-        time.sleep(CONFIG.get('delay_between_subreddits', 2.5))
+            if result['ok']:
+                store[cfg['name']] = posts
+            fetched[cfg['name']] = {'ok': result['ok'], 'posts': posts}
+    
+    memory_stage('fetch')
+    
+    save_health(health_updates)
+    save_throttle()
+    print_health_summary(health)
+    print_budget(load_budget())
+    if deadline_skipped:
+        print(f"\n[DEADLINE] Skipped {len(deadline_skipped)} subreddits: {', '.join(deadline_skipped)}")
     
+    if args.report:
+        with open(args.report, 'w') as f:
+            json.dump(report, f)
+    
+    if args.stream:
+        write_feeds(top, deadline_skipped)
+        return
+    
+    # Fetch-only run: the assemble step renders and updates the store
+    if args.results:
+        with open(args.results, 'w', encoding='utf-8') as f:
+            json.dump(fetched, f, ensure_ascii=False)
+        return
+    
+    save_posts_store(store)
+    
+    # Partial runs (and subreddits skipped for time or budget) keep their last posts in the ranking
+    for cfg in REDDIT_SUBREDDITS:
+        if cfg not in subreddits or cfg['name'] in deadline_skipped or cfg['name'] in budget_skipped:
+            all_posts.extend(store.get(cfg['name'], []))
+    
+    record_posts(all_posts)
+    write_feeds(all_posts, deadline_skipped)
+
+
+# Four feeds of ten: top10, hot, trending, fresh
+FEED_SLOTS = 40
+
+
+def post_rank(post):
+    return post['dual_score'], post['score']
+
+
+def post_link_key(post):
+    """Link posts are the same story wherever they're posted; self posts are their own"""
+    if post.get('url') and not post.get('is_self'):
+        return canonical_url(post['url'])
+    return post.get('permalink')
+
+
+def dedupe_posts(posts):
+    """Keep the best ranked post per link, so a story crossposted to several subreddits shows once"""
+    seen = set()
+    unique = []
+    for post in posts:
+        key = post_link_key(post)
+        if key not in seen:
+            seen.add(key)
+            unique.append(post)
+    return unique
+
+
+def write_feeds(all_posts, skipped=()):
+    """Rank posts and write the four Reddit feeds (skipped: subreddits left out for time)"""
     print(f"\nTotal: {len(all_posts)} posts, {sum(1 for p in all_posts if p['media_urls'])} with media")
     
     if not all_posts:
         return
     
-    all_posts.sort(key=lambda x: (-x['dual_score'], -x['score']))
+    all_posts.sort(key=post_rank, reverse=True)
+    all_posts = dedupe_posts(all_posts)
+    
+    if CONFIG['probe_media']:
+        media_cache = load_media_cache()
+        apply_media_metadata(all_posts[:FEED_SLOTS], media_cache)
+        save_media_cache(media_cache)
+        print(f"[MEDIA] {sum(1 for p in all_posts[:FEED_SLOTS] if p.get('media_type'))} enclosures probed")
+    
+    media_store = load_media_store()
+    if media_store is not None:
+        apply_media_proxy(all_posts[:FEED_SLOTS], media_store)
+        save_media_store(media_store)
     
     feeds = [
         ('reddit-top10.xml', all_posts[0:10], 'Reddit Top 10', 'Top posts'),
@@ -341,15 +885,19 @@ def main():
     
     for filename, items, title, desc in feeds:
         # Always create file, even with 0 posts
-        items = items if items else []
-        xml = generate_feed_xml(items, title, desc, filename)
-        if xml:
-            save_feed(xml, filename)
-            media_cnt = sum(1 for p in items if p.get('media_urls'))
-            print(f"[SAVED] {filename} ({len(items)} posts, {media_cnt} with media)")
+        collected = []
+        save_feed(iter_feed_xml(collect_json(items, post_json, collected), title, desc, filename, skipped), filename)
+        save_json_outputs(filename, title, desc, None, collected, skipped)
+        media_cnt = sum(1 for p in items if p.get('media_urls'))
+        print(f"[SAVED] {filename} ({len(items)} posts, {media_cnt} with media)")
     
     print("\n[DONE]")
 
 
 if __name__ == "__main__":
-    main()
+    args = parse_args()
+    if args.profile_memory:
+        start_memory_profile(args.memory_budget)
+    main(args)
+    if not finish_memory_profile():
+        sys.exit(MEMORY_BUDGET_EXIT)
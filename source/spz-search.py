@@ -0,0 +1,123 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+SPZ Search
+Query the local full-text index (spz-index.db) that the scrapers fill
+"""
+
+import sys
+import io
+sys.stdout = io.TextIOWrapper(sys.stdout.buffer, encoding='utf-8')
+
+import os
+import time
+import sqlite3
+import argparse
+from datetime import datetime
+
+# Same normalization the scrapers use when filling the terms column
+from spz_common import normalize_text, token_variants, TOKEN_RE
+
+INDEX_DB = "spz-index.db"
+
+
+def build_match(query, phrase=False):
+    """Turn a plain query into an FTS5 expression on the terms column
+    Each word also matches its prefix/plural-stripped forms, as indexing adds them;
+    a phrase matches the words as written.
+    """
+    tokens = TOKEN_RE.findall(normalize_text(query))
+    if not tokens:
+        return None
+    if phrase:
+        return 'terms : "' + ' '.join(tokens) + '"'
+    return 'terms : (' + ' AND '.join('(' + ' OR '.join(f'"{v}"' for v in token_variants(t)) + ')'
+                                      for t in tokens) + ')'
+
+
+def search(conn, args):
+    cutoff = int(time.time() - args.hours * 3600)
+    where = ["i.published >= ?"]
+    params = [cutoff]
+    
+    if args.source:
+        where.append("i.source = ?")
+        params.append(args.source)
+    if args.lang:
+        where.append("i.language = ?")
+        params.append(args.lang)
+    if args.kind:
+        where.append("i.kind = ?")
+        params.append(args.kind)
+    if args.min_score is not None:
+        where.append("i.score >= ?")
+        params.append(args.min_score)
+    
+    query = ' '.join(args.query)
+    match = query if args.raw else build_match(query, args.phrase)
+    if match:
+        sql = ("SELECT i.published, i.source, i.language, i.score, i.title, i.url "
+               "FROM items_fts JOIN items i ON i.rowid = items_fts.rowid "
+               "WHERE items_fts MATCH ? AND " + " AND ".join(where))
+        params[:0] = [match]
+        sql += " ORDER BY rank" if args.rank else " ORDER BY i.published DESC"
+    else:
+        sql = ("SELECT i.published, i.source, i.language, i.score, i.title, i.url FROM items i "
+               "WHERE " + " AND ".join(where) + " ORDER BY i.published DESC")
+    sql += " LIMIT ?"
+    params.append(args.limit)
+    
+    return conn.execute(sql, params).fetchall()
+
+
+def format_time(timestamp):
+    return f"{datetime.fromtimestamp(timestamp):%Y-%m-%d %H:%M}" if timestamp is not None else "????-??-?? ??:??"
+
+
+def print_stats(conn):
+    total = conn.execute("SELECT COUNT(*) FROM items").fetchone()[0]
+    print(f"[INDEX] {total} items")
+    for kind, source, count, newest in conn.execute(
+            "SELECT kind, source, COUNT(*), MAX(published) FROM items GROUP BY kind, source ORDER BY kind, source"):
+        print(f"   {kind:8} {source[:40]:40} {count:6}  newest {format_time(newest)}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Search everything the SPZ scrapers ingested")
+    parser.add_argument('query', nargs='*', help="Words to find (Hebrew or English)")
+    parser.add_argument('--hours', type=float, default=48, help="Only items published in the last N hours (default 48)")
+    parser.add_argument('--source', help="Exact source name, e.g. 'Ynet Main News', 'r/Israel', '@IDF'")
+    parser.add_argument('--lang', help="Language code (he/en)")
+    parser.add_argument('--kind', choices=['rss', 'reddit', 'twitter'])
+    parser.add_argument('--min-score', type=float)
+    parser.add_argument('--limit', type=int, default=20)
+    parser.add_argument('--phrase', action='store_true', help="Match the words as one phrase")
+    parser.add_argument('--rank', action='store_true', help="Order by relevance instead of newest first")
+    parser.add_argument('--raw', action='store_true', help="Pass the query to FTS5 as-is")
+    parser.add_argument('--stats', action='store_true', help="Show item counts per source")
+    parser.add_argument('--db', default=INDEX_DB)
+    args = parser.parse_args()
+    
+    if not os.path.exists(args.db):
+        print(f"[ERROR] No index at {args.db} - run the scrapers first")
+        return False
+    
+    conn = sqlite3.connect(args.db)
+    if args.stats:
+        print_stats(conn)
+        return True
+    
+    start = time.perf_counter()
+    rows = search(conn, args)
+    elapsed_ms = (time.perf_counter() - start) * 1000
+    
+    for published, source, language, score, title, url in rows:
+        print(f"{format_time(published)}  [{source}] ({language}, {'-' if score is None else f'{score:g}'})")
+        print(f"   {title}")
+        print(f"   {url}")
+    print(f"\n[DONE] {len(rows)} results in {elapsed_ms:.1f} ms")
+    return True
+
+
+if __name__ == "__main__":
+    sys.exit(0 if main() else 1)
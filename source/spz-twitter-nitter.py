@@ -11,18 +11,26 @@ sys.stdout = io.TextIOWrapper(sys.stdout.buffer, encoding='utf-8')
 sys.stderr = io.TextIOWrapper(sys.stderr.buffer, encoding='utf-8')
 
 from datetime import datetime, timezone
+import hashlib
+import heapq
+import json
 import time
 import os
 import re
-import requests
 import xml.etree.ElementTree as ET
+from itertools import islice
 
-# Nitter instances (try multiple if one fails)
-NITTER_INSTANCES = [
-    "https://nitter.privacydev.net",
-    "https://nitter.net",
-    "https://nitter.it",
-]
+from spz_common import (
+    use_config, build_keyword_trie, match_keywords, NITTER_INSTANCES, canonical_url,
+    format_rfc2822, parse_pub_date, escape_xml, accept_encoding, transfer_stats,
+    write_precompressed, SPZ_NS, collect_json, skipped_elements, top_unique, iso_date,
+    save_json_outputs, save_throttle, throttled_get, open_cpu_pool, run_in_pool, index_items,
+    archive_items, read_archive, parse_window, load_health, save_health, is_quarantined,
+    record_health, print_health_summary, schedule_sources, out_of_time, record_deadline_skip,
+    MEMORY_BUDGET_EXIT, start_memory_profile, memory_source, memory_stage,
+    finish_memory_profile, emit_breaking, load_budget, budget_reached, add_to_budget,
+    print_budget
+)
 
 # Twitter accounts to scrape (Full list restored)
 ACCOUNTS = [
@@ -67,186 +75,379 @@ ACCOUNTS = [
     "AP",
 ]
 
+# Fetched first and never skipped for time; every other account is "medium"
+HIGH_PRIORITY_ACCOUNTS = {"IDF", "IsraeliPM", "netanyahu", "IsraelMFA", "BBCBreaking", "Reuters"}
+
+# Skipped once the relevancy budget is reached
+LOW_PRIORITY_ACCOUNTS = {"elonmusk", "michaelisikoff", "GeopoliticalCris"}
+
 CONFIG = {
     "output_dir": "spz-feeds/",
     "timeout": 12,
     "max_tweets_per_account": 5,        # Reduced from 10
     "user_agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36",
-    "delay_between_accounts": 2.5,      # Reduced from 5.0
-    "max_total_time": 600,              # 10 min max
+    "throttle_file": "spz-throttle.json",  # Per-host request state, shared by all scrapers
+    "throttle_rate": 0.4,               # Requests per second per host once the burst is spent
+    "throttle_burst": 2,
+    "throttle_retries": 2,              # Retries after a 429/5xx, each after the host's backoff
+    "throttle_backoff_base": 2,         # Seconds; doubles per failure, with jitter
+    "throttle_backoff_max": 600,
+    "throttle_max_wait": 30,            # Fail a request instead of waiting longer than this
+    "throttle_state_ttl": 3600,         # Forget a host's backoff and bucket after an hour
+    "max_total_time": 540,              # Fetch deadline, under run_scraper's 600s kill
+    "cpu_workers": 0,                   # Processes for parse/score (0 = inline, e.g. 2-3 on a spare multi-core host)
+    "precompress_outputs": False,       # Also write .xml.gz / .xml.br next to each feed
+    "tweets_store_file": "spz-twitter-tweets.json",  # Last tweets per account (for --source runs)
+    "index_db": "spz-index.db",         # Local full-text index (None to disable)
+    "index_retention_days": 30,
+    "archive_dir": "spz-archive/",      # Day-partitioned item archive (None to disable)
+    "health_file": "spz-twitter-health.json",
+    "quarantine_after": 3,              # Consecutive failures before an account is skipped
+    "quarantine_base": 3600,            # First re-probe after 1h, doubling per failed probe
+    "quarantine_max": 48 * 3600,
+    "health_latency_samples": 50,
+    "memory_budget_mb": None,           # Fail a --profile-memory run whose peak RSS passes this
+    "memory_top_sites": 8,              # Allocation sites listed per stage
+    "memory_report_file": "spz-twitter-memory.json",  # Written by --profile-memory runs
+    "breaking_threshold": 9,            # Relevancy meter score (1-10) for the fast lane (None to disable)
+    "breaking_file": "breaking.xml",
+    "breaking_store_file": "spz-breaking.json",  # Shared by all scrapers
+    "breaking_max_items": 30,
+    "breaking_max_age_hours": 24,
+    "breaking_hook": None,              # Argv per item: JSON on stdin, alert text in $SPZ_ALERT
+    "breaking_webhook": None,           # URL to POST each item to as JSON
+    "breaking_publish_cmd": None,       # Argv, run for the first breaking batch of a run
+    "budget_file": "spz-shared/data/relevancy-budget.json",
+    "budget_window_hours": 4,
+    "budget_limit": 200,                # Accumulated meter score that ends the window (None to disable)
+    "budget_skip_priorities": ["low"],
 }
+use_config(CONFIG)
 
 os.makedirs(CONFIG['output_dir'], exist_ok=True)
 
+ISRAEL_KEYWORDS = [
+    'israel', 'israeli', 'israelis', 'gaza', 'palestine', 'palestinian', 
+    'idf', 'jerusalem', 'netanyahu', 'tel aviv', 'hamas', 
+    'jew', 'jewish', 'jews', 'zionist', 'zionism', 'judaism', 'rabbi',
+    'yom kippur', 'rosh hashanah', 'passover', 'hanukkah', 'shabbat',
+    'gal gadot', 'natalie portman', 'bar refaeli', 'yair lapid', 
+    'benjamin netanyahu', 'benny gantz', 'naftali bennett',
+    'mossad', 'shin bet', 'knesset', 'aliyah', 'diaspora'
+]
+
+OTHER_COUNTRY_KEYWORDS = [
+    # Ukraine
+    'ukraine', 'ukrainian', 'kyiv', 'kharkiv', 'odesa', 'odessa', 'luhansk', 'donetsk', 'kiev',
+    # Russia
+    'russia', 'russian', 'putin', 'kremlin', 'moscow', 'vladimir',
+    # Europe
+    'france', 'french', 'macron', 'paris', 'germany', 'german', 'merkel', 'scholz', 'berlin',
+    'uk', 'british', 'britain', 'england', 'london', 'boris johnson', 'rishi sunak',
+    'italy', 'italian', 'rome', 'meloni', 'spain', 'spanish', 'madrid', 'poland', 'sweden',
+    'norway', 'denmark', 'netherlands', 'belgium', 'switzerland', 'austria',
+    # Asia
+    'china', 'chinese', 'beijing', 'xi jinping', 'japan', 'japanese', 'tokyo',
+    'south korea', 'korean', 'seoul', 'north korea', 'pyongyang', 'kim jong',
+    'india', 'indian', 'modi', 'pakistan', 'bangladesh', 'thailand', 'vietnam',
+    'singapore', 'malaysia', 'indonesia', 'philippines', 'myanmar', 'cambodia',
+    # Middle East (non-Israel)
+    'iran', 'iranian', 'tehran', 'iraq', 'iraqi', 'baghdad', 'syria', 'syrian', 'damascus', 'assad',
+    'lebanon', 'lebanese', 'beirut', 'hezbollah', 'jordan', 'jordanian', 'amman',
+    'egypt', 'egyptian', 'cairo', 'turkey', 'turkish', 'erdogan', 'istanbul', 'ankara',
+    'saudi', 'saudi arabia', 'riyadh', 'uae', 'emirates', 'dubai', 'qatar', 'doha',
+    'kuwait', 'bahrain', 'oman', 'yemen', 'yemeni', 'houthi',
+    # Americas
+    'usa', 'united states', 'america', 'american', 'biden', 'canada', 'canadian', 'trudeau',
+    'mexico', 'mexican', 'brazil', 'brazilian', 'lula', 'argentina', 'chile', 'colombia',
+    'venezuela', 'peru', 'bolivia', 'uruguay', 'paraguay',
+    # Africa
+    'south africa', 'nigeria', 'kenya', 'ethiopia', 'ghana', 'morocco', 'algeria', 'tunisia', 'libya', 'sudan',
+    # Australia
+    'australia', 'australian', 'new zealand',
+]
+
+HIGH_KEYWORDS = ['israel', 'gaza', 'hamas', 'war', 'attack', 'netanyahu', 'idf']
+MEDIUM_KEYWORDS = ['jerusalem', 'palestine', 'middle east', 'trump', 'iran']
 
-def format_rfc2822(dt=None):
-    if dt is None:
-        dt = datetime.now(timezone.utc)
-    return dt.strftime("%a, %d %b %Y %H:%M:%S %z")
+# Hebrew surface forms -> the English keyword they count as
+HEBREW_KEYWORD_ALIASES = {
+    # Israel/Jewish context
+    'ישראל': 'israel',
+    'ישראלי': 'israeli',
+    'ישראלית': 'israeli',
+    'ישראלים': 'israelis',
+    'עזה': 'gaza',
+    'פלסטין': 'palestine',
+    'פלסטיני': 'palestinian',
+    'פלסטינים': 'palestinian',
+    'צה"ל': 'idf',
+    'ירושלים': 'jerusalem',
+    'נתניהו': 'netanyahu',
+    'תל אביב': 'tel aviv',
+    'חמאס': 'hamas',
+    'יהודי': 'jew',
+    'יהודית': 'jewish',
+    'יהודים': 'jews',
+    'ציוני': 'zionist',
+    'ציונות': 'zionism',
+    'יהדות': 'judaism',
+    'הרב': 'rabbi',
+    'יום כיפור': 'yom kippur',
+    'ראש השנה': 'rosh hashanah',
+    'פסח': 'passover',
+    'חנוכה': 'hanukkah',
+    'שבת': 'shabbat',
+    'גל גדות': 'gal gadot',
+    'נטלי פורטמן': 'natalie portman',
+    'בר רפאלי': 'bar refaeli',
+    'יאיר לפיד': 'yair lapid',
+    'בנימין נתניהו': 'benjamin netanyahu',
+    'בני גנץ': 'benny gantz',
+    'נפתלי בנט': 'naftali bennett',
+    'המוסד': 'mossad',
+    'שב"כ': 'shin bet',
+    'כנסת': 'knesset',
+    'עולים חדשים': 'aliyah',
+    'תפוצות': 'diaspora',
+    # Other countries
+    'אוקראינה': 'ukraine',
+    'קייב': 'kyiv',
+    'רוסיה': 'russia',
+    'פוטין': 'putin',
+    'הקרמלין': 'kremlin',
+    'מוסקבה': 'moscow',
+    'צרפת': 'france',
+    'מקרון': 'macron',
+    'פריז': 'paris',
+    'גרמניה': 'germany',
+    'ברלין': 'berlin',
+    'בריטניה': 'britain',
+    'אנגליה': 'england',
+    'לונדון': 'london',
+    'איטליה': 'italy',
+    'ספרד': 'spain',
+    'סין': 'china',
+    'בייג\'ינג': 'beijing',
+    'יפן': 'japan',
+    'פקיסטן': 'pakistan',
+    'איראן': 'iran',
+    'איראני': 'iranian',
+    'טהרן': 'tehran',
+    'עיראק': 'iraq',
+    'סוריה': 'syria',
+    'סורי': 'syrian',
+    'דמשק': 'damascus',
+    'אסד': 'assad',
+    'לבנון': 'lebanon',
+    'ביירות': 'beirut',
+    'טורקיה': 'turkey',
+    'ארדואן': 'erdogan',
+    'מצרים': 'egypt',
+    'קהיר': 'cairo',
+    'סעודיה': 'saudi',
+    'איחוד האמירויות': 'uae',
+    'דובאי': 'dubai',
+    'קטאר': 'qatar',
+    'ארה"ב': 'usa',
+    'ארצות הברית': 'united states',
+    'אמריקה': 'america',
+    'אמריקאי': 'american',
+    'ביידן': 'biden',
+    'טראמפ': 'trump',
+    'קנדה': 'canada',
+    'מקסיקו': 'mexico',
+    'ברזיל': 'brazil',
+    'ארגנטינה': 'argentina',
+    'דרום אפריקה': 'south africa',
+    'אוסטרליה': 'australia',
+    'חיזבאללה': 'hezbollah',
+    'ירדן': 'jordan',
+    'תימן': 'yemen',
+    'החות\'ים': 'houthi',
+    # Scoring
+    'מלחמה': 'war',
+    'מתקפה': 'attack',
+    'פיגוע': 'attack',
+    'המזרח התיכון': 'middle east',
+    'מזרח התיכון': 'middle east',
+}
 
 
-def escape_xml(text):
-    if not text:
-        return ""
-    return (text.replace("&", "&amp;").replace("<", "&lt;").replace(">", "&gt;")
-            .replace('"', "&quot;").replace("'", "&apos;"))
+KEYWORD_TRIE = build_keyword_trie({
+    'israel_context': ISRAEL_KEYWORDS,
+    'other_country': OTHER_COUNTRY_KEYWORDS,
+    'high': HIGH_KEYWORDS,
+    'medium': MEDIUM_KEYWORDS,
+}, HEBREW_KEYWORD_ALIASES)
 
 
-def fetch_nitter_feed(username, instance_idx=0, max_retries=2):
-    """Fetch RSS feed from Nitter with limited retries"""
+def fetch_nitter_feed(username, instance_idx=0, max_retries=2, errors=None):
+    """Fetch RSS feed from Nitter with limited retries
+    The last failure is recorded in `errors` (username -> message) when given.
+    """
+    if errors is None:
+        errors = {}
     if instance_idx >= len(NITTER_INSTANCES) or instance_idx > max_retries:
         print(f"   [SKIP] @{username} - all instances failed")
         return None
     
     base_url = NITTER_INSTANCES[instance_idx]
     url = f"{base_url}/{username}/rss"
-    headers = {"User-Agent": CONFIG['user_agent']}
+    headers = {"User-Agent": CONFIG['user_agent'], "Accept-Encoding": accept_encoding()}
     
     try:
         print(f"   [TRY] {base_url}/@{username}")
-        resp = requests.get(url, headers=headers, timeout=CONFIG['timeout'])
+        resp = throttled_get(url, retries=0, headers=headers, timeout=CONFIG['timeout'])
         
         if resp.status_code == 200:
-            return resp.text
+            wire, decoded = transfer_stats(resp)
+            print(f"   [NET] {wire / 1024:.1f} KB wire / {decoded / 1024:.1f} KB "
+                  f"({resp.headers.get('Content-Encoding', 'identity')}, {decoded / max(wire, 1):.1f}x)")
+            return resp.content
         elif resp.status_code == 404:
             print(f"   [404] Account not found: @{username}")
+            errors[username] = f"NotFound: HTTP 404 from {base_url}"
             return None
         else:
             # Try next instance
-            return fetch_nitter_feed(username, instance_idx + 1, max_retries)
+            errors[username] = f"HTTPError: HTTP {resp.status_code} from {base_url}"
+            return fetch_nitter_feed(username, instance_idx + 1, max_retries, errors)
             
     except Exception as e:
         print(f"   [ERR] {str(e)[:40]}")
+        errors[username] = f"{type(e).__name__}: {e}"
         # Try next instance
-        return fetch_nitter_feed(username, instance_idx + 1, max_retries)
+        return fetch_nitter_feed(username, instance_idx + 1, max_retries, errors)
 
 
-def parse_tweets(rss_content, username):
-    """Parse RSS content into tweet objects"""
-    tweets = []
-    
-    try:
-        root = ET.fromstring(rss_content)
+# Status IDs are snowflakes: creation time in ms since Twitter's epoch, above bit 22
+TWITTER_EPOCH_MS = 1288834974657
+SNOWFLAKE_MIN = 1 << 40                 # Older sequential IDs carry no timestamp
+
+
+def snowflake_ms(tweet_id):
+    """Creation time (epoch ms) encoded in a status ID, or None"""
+    if not str(tweet_id).isdigit() or int(tweet_id) < SNOWFLAKE_MIN:
+        return None
+    return (int(tweet_id) >> 22) + TWITTER_EPOCH_MS
+
+
+def tweet_snowflake(tweet):
+    """Status ID as an int, for ordering and dedup (0 for tweets without one)"""
+    tweet_id = tweet.get('id', '')
+    return int(tweet_id) if tweet_id.isdigit() else 0
+
+
+def merge_timelines(timelines):
+    """Merge per-account tweet lists into one stream, oldest first, on status IDs alone
+    Nitter lists pinned tweets and retweets out of order, so each list is sorted first.
+    """
+    return heapq.merge(*(sorted(tweets, key=tweet_snowflake) for tweets in timelines), key=tweet_snowflake)
+
+
+def iter_tweets(rss_content, username, seen_id=0):
+    """Yield tweet objects from Nitter RSS bytes one <item> at a time
+    Statuses up to seen_id (the newest one already stored for the account) are skipped;
+    status IDs grow with time, so those were all seen by an earlier run.
+    """
+    for _, item in ET.iterparse(io.BytesIO(rss_content)):
+        if item.tag != 'item':
+            continue
+        title = item.find('title')
+        link = item.find('link')
+        pub_date = item.find('pubDate')
+        description = item.find('description')
         
-        for item in root.findall('.//item'):
-            title = item.find('title')
-            link = item.find('link')
-            pub_date = item.find('pubDate')
-            description = item.find('description')
-            
-            # Extract tweet text from title or description
-            text = ""
-            if title is not None and title.text:
-                text = title.text
-            elif description is not None and description.text:
-                text = description.text
-            
-            # Clean up text
-            text = re.sub(r'<[^>]+>', ' ', text).strip()
-            
-            # Get tweet ID from link
-            tweet_id = ""
-            if link is not None and link.text:
-                match = re.search(r'/status/(\d+)', link.text)
-                if match:
-                    tweet_id = match.group(1)
-            
-            # Parse date
-            date_str = ""
-            if pub_date is not None and pub_date.text:
-                date_str = pub_date.text
-            
-            tweet = {
-                'id': tweet_id or str(int(time.time())),
-                'username': username,
-                'text': text[:500],
-                'url': link.text if link is not None else f"https://twitter.com/{username}/status/{tweet_id}",
-                'published': date_str,
-                'fetched_at': format_rfc2822(),
-            }
-            tweets.append(tweet)
-            
+        # Extract tweet text from title or description
+        text = ""
+        if title is not None and title.text:
+            text = title.text
+        elif description is not None and description.text:
+            text = description.text
+        
+        # Clean up text
+        text = re.sub(r'<[^>]+>', ' ', text).strip()
+        
+        # Get tweet ID from link (Nitter mirror URLs map back to twitter.com)
+        tweet_id = ""
+        url = canonical_url(link.text) if link is not None and link.text else ""
+        match = re.search(r'/status/(\d+)', url)
+        if match:
+            tweet_id = match.group(1)
+            if int(tweet_id) <= seen_id:
+                item.clear()
+                continue
+        
+        # Creation time comes from the snowflake; pubDate only for links without one
+        created_ms = snowflake_ms(tweet_id)
+        date_str = ""
+        if created_ms:
+            date_str = format_rfc2822(datetime.fromtimestamp(created_ms / 1000, timezone.utc))
+        elif pub_date is not None and pub_date.text:
+            date_str = pub_date.text
+        
+        # Without a status link, an ID from the content stays the same across runs
+        if not tweet_id:
+            tweet_id = 'h' + hashlib.md5(f"{username}\n{url}\n{text}".encode()).hexdigest()[:16]
+        
+        yield {
+            'id': tweet_id,
+            'username': username,
+            'text': text[:500],
+            'url': url or f"https://twitter.com/{username}",
+            'published': date_str,
+            'fetched_at': format_rfc2822(),
+        }
+        item.clear()
+
+
+def parse_tweets(rss_content, username, seen_id=0):
+    """Parse RSS content into tweet objects (stops after max_tweets_per_account new ones)"""
+    try:
+        return list(islice(iter_tweets(rss_content, username, seen_id), CONFIG['max_tweets_per_account']))
     except ET.ParseError as e:
         print(f"   [PARSE ERR] {str(e)[:50]}")
         return []
-    
-    return tweets[:CONFIG['max_tweets_per_account']]
 
 
 def has_israel_context(text):
     """Check if content has Israel/Jewish context"""
-    text = text.lower()
-    israel_keywords = [
-        'israel', 'israeli', 'israelis', 'gaza', 'palestine', 'palestinian', 
-        'idf', 'jerusalem', 'netanyahu', 'tel aviv', 'hamas', 
-        'jew', 'jewish', 'jews', 'zionist', 'zionism', 'judaism', 'rabbi',
-        'yom kippur', 'rosh hashanah', 'passover', 'hanukkah', 'shabbat',
-        'gal gadot', 'natalie portman', 'bar refaeli', 'yair lapid', 
-        'benjamin netanyahu', 'benny gantz', 'naftali bennett',
-        'mossad', 'shin bet', 'knesset', 'aliyah', 'diaspora'
-    ]
-    return any(kw in text for kw in israel_keywords)
+    return 'israel_context' in match_keywords(text, KEYWORD_TRIE)
 
 
 def is_about_other_country(text):
     """Check if content is about other countries (not Israel)"""
-    text = text.lower()
-    other_countries = [
-        # Ukraine
-        'ukraine', 'ukrainian', 'kyiv', 'kharkiv', 'odesa', 'odessa', 'luhansk', 'donetsk', 'kiev',
-        # Russia
-        'russia', 'russian', 'putin', 'kremlin', 'moscow', 'vladimir',
-        # Europe
-        'france', 'french', 'macron', 'paris', 'germany', 'german', 'merkel', 'scholz', 'berlin',
-        'uk', 'british', 'britain', 'england', 'london', 'boris johnson', 'rishi sunak',
-        'italy', 'italian', 'rome', 'meloni', 'spain', 'spanish', 'madrid', 'poland', 'sweden',
-        'norway', 'denmark', 'netherlands', 'belgium', 'switzerland', 'austria',
-        # Asia
-        'china', 'chinese', 'beijing', 'xi jinping', 'japan', 'japanese', 'tokyo',
-        'south korea', 'korean', 'seoul', 'north korea', 'pyongyang', 'kim jong',
-        'india', 'indian', 'modi', 'pakistan', 'bangladesh', 'thailand', 'vietnam',
-        'singapore', 'malaysia', 'indonesia', 'philippines', 'myanmar', 'cambodia',
-        # Middle East (non-Israel)
-        'iran', 'iranian', 'tehran', 'iraq', 'iraqi', 'baghdad', 'syria', 'syrian', 'damascus', 'assad',
-        'lebanon', 'lebanese', 'beirut', 'hezbollah', 'jordan', 'jordanian', 'amman',
-        'egypt', 'egyptian', 'cairo', 'turkey', 'turkish', 'erdogan', 'istanbul', 'ankara',
-        'saudi', 'saudi arabia', 'riyadh', 'uae', 'emirates', 'dubai', 'qatar', 'doha',
-        'kuwait', 'bahrain', 'oman', 'yemen', 'yemeni', 'houthi',
-        # Americas
-        'usa', 'united states', 'america', 'american', 'biden', 'canada', 'canadian', 'trudeau',
-        'mexico', 'mexican', 'brazil', 'brazilian', 'lula', 'argentina', 'chile', 'colombia',
-        'venezuela', 'peru', 'bolivia', 'uruguay', 'paraguay',
-        # Africa
-        'south africa', 'nigeria', 'kenya', 'ethiopia', 'ghana', 'morocco', 'algeria', 'tunisia', 'libya', 'sudan',
-        # Australia
-        'australia', 'australian', 'new zealand',
-    ]
-    return any(kw in text for kw in other_countries)
+    return 'other_country' in match_keywords(text, KEYWORD_TRIE)
 
 
 def calculate_score(tweet):
     """Calculate relevance score with strict filtering"""
-    text = tweet['text'].lower()
+    hits = match_keywords(tweet['text'], KEYWORD_TRIE)
     
     # STRICT FILTER: Only allow if has Israel context OR not about other countries
-    if is_about_other_country(text) and not has_israel_context(text):
+    if 'other_country' in hits and 'israel_context' not in hits:
         return -100  # Will be filtered out
     
     score = 50  # Base
-    
-    high_keywords = ['israel', 'gaza', 'hamas', 'war', 'attack', 'netanyahu', 'idf']
-    medium_keywords = ['jerusalem', 'palestine', 'middle east', 'trump', 'iran']
-    
-    for kw in high_keywords:
-        if kw in text:
-            score += 10
-    for kw in medium_keywords:
-        if kw in text:
-            score += 5
+    score += 10 * len(hits.get('high', ()))
+    score += 5 * len(hits.get('medium', ()))
     
     return min(100, score)
 
 
+def parse_account(username, rss_content, seen_id=0):
+    """Parse and score one account's Nitter RSS bytes -> (new tweets parsed, tweets kept)
+    CPU only (no network, no shared state), so main() runs it on the process pool.
+    """
+    tweets = parse_tweets(rss_content, username, seen_id)
+    for tweet in tweets:
+        tweet['score'] = calculate_score(tweet)
+    
+    # FILTER: Skip Ukraine/negative score tweets
+    return len(tweets), [t for t in tweets if t['score'] >= 0]
+
+
 def create_twitter_summary(tweet):
     """Create twitter-compatible summary"""
     text = tweet['text'][:200]
@@ -288,67 +489,424 @@ def build_rss_description(tweet):
     return "\n".join(parts)
 
 
-def generate_twitter_rss(tweets, filename, title='SPZ Twitter Aggregator', desc='Twitter feed via Nitter'):
-    """Generate RSS feed from tweets"""
-    tweets = tweets or []
+def iter_twitter_rss(tweets, filename, title='SPZ Twitter Aggregator', desc='Twitter feed via Nitter', skipped=()):
+    """Yield the RSS document for some tweets line by line
+    skipped: accounts this run left out for time, listed on the channel.
+    """
+    yield '<?xml version="1.0" encoding="UTF-8"?>'
+    yield f'<rss version="2.0" xmlns:atom="http://www.w3.org/2005/Atom" xmlns:spz="{SPZ_NS}" xmlns:twitter="{SPZ_NS}/twitter">'
+    yield '<channel>'
+    yield f'  <title>{title}</title>'
+    yield f'  <link>https://spz.local/{filename}</link>'
+    yield f'  <description>{desc}</description>'
+    yield f'  <lastBuildDate>{format_rfc2822()}</lastBuildDate>'
+    yield '  <language>en</language>'
+    yield from skipped_elements(skipped)
+    
+    for tweet in tweets or []:
+        yield '  <item>'
+        yield f'    <title>{escape_xml(tweet["text"][:100])}...</title>'
+        yield f'    <link>{tweet["url"]}</link>'
+        yield f'    <guid isPermaLink="true">{tweet["url"]}</guid>'
+        yield f'    <description><![CDATA[{build_rss_description(tweet)}]]></description>'
+        yield f'    <spz:twitter_summary><![CDATA[{create_twitter_summary(tweet)}]]></spz:twitter_summary>'
+        yield f'    <twitter:username>@{tweet["username"]}</twitter:username>'
+        yield f'    <spz:score>{tweet["score"]}</spz:score>'
+        yield f'    <pubDate>{tweet.get("published") or tweet["fetched_at"]}</pubDate>'
+        yield '  </item>'
+    
+    yield '</channel>'
+    yield '</rss>'
+
+
+def save_feed(lines, filename):
+    """Write a feed line by line to a temp file, then swap it in atomically"""
+    filepath = os.path.join(CONFIG['output_dir'], filename)
+    tmp_path = f"{filepath}.{os.getpid()}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        f.write(next(lines))
+        for line in lines:
+            f.write('\n')
+            f.write(line)
+    os.replace(tmp_path, filepath)
+    if CONFIG['precompress_outputs']:
+        with open(filepath, 'rb') as f:
+            write_precompressed(filepath, f.read())
+
+
+def tweet_json(tweet):
+    """JSON Feed entry and snapshot record for one tweet"""
+    published = parse_pub_date(tweet.get('published'))
+    twitter_summary = create_twitter_summary(tweet)
+    entry = {
+        "id": tweet['url'],
+        "url": tweet['url'],
+        "title": tweet['text'][:100],
+        "content_html": build_rss_description(tweet),
+        "content_text": tweet['text'],
+        "date_published": iso_date(published),
+        "authors": [{"name": f"@{tweet['username']}", "url": f"https://twitter.com/{tweet['username']}"}],
+        "_spz": {
+            "score": tweet.get('score'),
+            "twitter_summary": twitter_summary,
+        },
+    }
+    snapshot = {
+        "id": tweet['id'],
+        "username": tweet['username'],
+        "text": tweet['text'],
+        "url": tweet['url'],
+        "published": published,
+        "score": tweet.get('score'),
+        "twitter_summary": twitter_summary,
+    }
+    return entry, snapshot
+
+
+def tweet_index_row(tweet):
+    return {
+        'uid': f"twitter:{tweet['id']}",
+        'kind': 'twitter',
+        'source': f"@{tweet['username']}",
+        'language': 'he' if re.search(r'[\u05d0-\u05ea]', tweet['text']) else 'en',
+        'score': tweet.get('score', 0),
+        'published': parse_pub_date(tweet.get('published')) or int(time.time()),
+        'url': tweet['url'],
+        'title': tweet['text'][:100],
+        'body': tweet['text'],
+    }
+
+
+def tweet_archive_record(tweet):
+    return {
+        'uid': f"twitter:{tweet['id']}",
+        'source': tweet['username'],
+        'published': parse_pub_date(tweet.get('published')) or int(time.time()),
+        'item': tweet,
+    }
+
+
+def record_tweets(tweets):
+    """Add tweets to the search index and the archive"""
+    index_items([tweet_index_row(t) for t in tweets])
+    archive_items('twitter', [tweet_archive_record(t) for t in tweets])
+
+
+def rerender_tweets(args):
+    """Rebuild the four Twitter feeds for a time window from the archive, no network
+    Tweets are re-scored, so rule and template changes take effect.
+    """
+    start, end = parse_window(args.since, args.until)
+    records = read_archive('twitter', start, end, args.source)
+    print(f"[RERENDER] {len(records)} archived tweets in window -> {args.out}")
+    
+    CONFIG['output_dir'] = args.out
+    CONFIG['precompress_outputs'] = False
+    os.makedirs(args.out, exist_ok=True)
     
-    date = format_rfc2822()
+    tweets = []
+    for record in records:
+        tweet = record['item']
+        tweet['score'] = calculate_score(tweet)
+        if tweet['score'] >= 0:
+            tweets.append(tweet)
     
-    xml = ['<?xml version="1.0" encoding="UTF-8"?>']
-    xml.append('<rss version="2.0" xmlns:atom="http://www.w3.org/2005/Atom">')
-    xml.append('<channel>')
-    xml.append(f'  <title>{title}</title>')
-    xml.append(f'  <link>https://spz.local/{filename}</link>')
-    xml.append(f'  <description>{desc}</description>')
-    xml.append(f'  <lastBuildDate>{date}</lastBuildDate>')
-    xml.append('  <language>en</language>')
+    write_feeds(tweets)
+
+
+def tweet_meter_entry(tweet):
+    return {
+        'uid': f"twitter:{tweet['id']}",
+        'kind': 'twitter',
+        'source': f"@{tweet['username']}",
+        'title': tweet['text'][:100],
+        'url': tweet['url'],
+        'summary': tweet['text'],
+        'published': tweet.get('published') or tweet.get('fetched_at'),
+        'relevance': round(tweet.get('score', 0) / 10, 1),
+    }
+
+
+def account_priority(username):
+    if username in HIGH_PRIORITY_ACCOUNTS:
+        return "high"
+    return "low" if username in LOW_PRIORITY_ACCOUNTS else "medium"
+
+
+def poll_accounts(accounts, health, health_updates, report, deadline_skipped, budget_skipped, deadline,
+                  seen_ids=None):
+    """Fetch each account and parse/score it on the pool, yielding (username, tweets, result)
+    Downloads stay in this process; each account is finished (breaking lane, budget,
+    health) as soon as its parse is done. `result` is the account's --report entry;
+    skipped ones only go into `report`, which may be None. seen_ids maps an account to
+    its newest stored status ID; only tweets after it are yielded.
+    """
+    seen_ids = seen_ids or {}
+    budget = load_budget()
+    errors = {}
+    pool = open_cpu_pool()
+    queue = list(accounts)
+    pending = []                        # (username, parse future or None if every instance failed, seconds)
+    while queue or pending:
+        if queue:
+            username = queue.pop(0)
+            idx = len(accounts) - len(queue)
+            skipped = None
+            if is_quarantined(health.get(username)):
+                print(f"\n[{idx}/{len(accounts)}] @{username} - quarantined, skipped")
+                skipped = {'ok': False, 'error': 'quarantined', 'items': []}
+            elif account_priority(username) in CONFIG['budget_skip_priorities'] and budget_reached(budget):
+                print(f"\n[{idx}/{len(accounts)}] @{username} - relevancy budget reached, skipped")
+                skipped = {'ok': True, 'error': None, 'items': [], 'skipped': 'budget'}
+                budget_skipped.append(username)
+            elif out_of_time(account_priority(username), health.get(username), deadline):
+                print(f"\n[{idx}/{len(accounts)}] @{username} - {account_priority(username)} priority, "
+                      f"{max(0, deadline - time.time()):.0f}s left, skipped")
+                skipped = {'ok': True, 'error': None, 'items': [], 'skipped': 'deadline'}
+                health_updates[username] = record_deadline_skip(health, username)
+                deadline_skipped.append(username)
+            if skipped:
+                if report is not None:
+                    report[username] = skipped
+                continue
+            print(f"\n[{idx}/{len(accounts)}] @{username}")
+            
+            started = time.time()
+            rss_content = fetch_nitter_feed(username, errors=errors)
+            parse = (run_in_pool(pool, parse_account, username, rss_content, seen_ids.get(username, 0))
+                     if rss_content else None)
+            pending.append((username, parse, time.time() - started))
+            
+            done = [job for job in pending if job[1] is None or job[1].done()]
+        else:
+            done = pending[:1]          # Nothing left to download: wait for parses in order
+        
+        for job in done:
+            pending.remove(job)
+            username, parse, latency = job
+            tweets = None
+            if parse is not None:
+                try:
+                    parsed, tweets = parse.result()
+                    print(f"   [OK] @{username}: {parsed} new tweets, {len(tweets)} kept")
+                except Exception as e:
+                    errors[username] = f"{type(e).__name__}: {e}"
+            
+            result = {'ok': tweets is not None, 'error': None, 'items': []}
+            if tweets is not None:
+                meter_entries = [tweet_meter_entry(t) for t in tweets]
+                emit_breaking(meter_entries)
+                budget = add_to_budget(meter_entries)
+                result['items'] = [[t['id'], parse_pub_date(t['published'])] for t in tweets]
+            else:
+                print(f"   [FAIL] Could not fetch @{username}")
+                result['error'] = errors.get(username, "all instances failed")
+                tweets = []
+            
+            health_updates[username] = record_health(health, username, result['ok'], latency,
+                                                     len(tweets), result['error'])
+            if report is not None:
+                report[username] = result
+            memory_source('@' + username)
+            yield username, tweets, result
+    
+    if pool is not None:
+        pool.shutdown()
+
+
+def record_stage(polled):
+    """Index and archive each account's tweets as they pass, then pass them on"""
+    for username, tweets, result in polled:
+        record_tweets(tweets)
+        yield from tweets
+
+
+def load_tweets_store():
+    """Load last fetched tweets per account"""
+    try:
+        with open(CONFIG['tweets_store_file'], 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except:
+        return {}
+
+
+def save_tweets_store(store):
+    with open(CONFIG['tweets_store_file'], 'w', encoding='utf-8') as f:
+        json.dump(store, f, ensure_ascii=False)
+
+
+def store_tweets(store, username, tweets):
+    """Add an account's new tweets to its stored ones, keeping the newest max_tweets_per_account"""
+    by_id = {t['id']: t for t in store.get(username, []) + tweets}
+    store[username] = sorted(by_id.values(), key=tweet_snowflake, reverse=True)[:CONFIG['max_tweets_per_account']]
+    return store[username]
+
+
+def seen_status_ids(store):
+    """Newest stored status ID per account: anything up to it was fetched before"""
+    return {username: max(map(tweet_snowflake, tweets), default=0) for username, tweets in store.items()}
+
+
+def parse_args():
+    import argparse
+    
+    parser = argparse.ArgumentParser(description="SPZ Twitter Scraper via Nitter")
+    parser.add_argument('--source', action='append',
+                        help="Only fetch the named account, without @ (repeatable)")
+    parser.add_argument('--report',
+                        help="Write per-account poll results (ok, item ids, publish times) as JSON")
+    parser.add_argument('--list-sources', action='store_true',
+                        help="Print configured accounts as JSON and exit")
+    parser.add_argument('--deadline', type=float,
+                        help="Seconds to spend fetching (default max_total_time); medium/low accounts that won't fit are skipped")
+    parser.add_argument('--results',
+                        help="Fetch only: write fetched tweets per account as JSON, no XML")
+    parser.add_argument('--stream', action='store_true',
+                        help="Low-memory run: keep only the top 40 tweets, no per-account store (not with --results)")
+    parser.add_argument('--assemble',
+                        help="Render only: write feeds from a --results JSON file, no fetching")
+    parser.add_argument('--rerender', action='store_true',
+                        help="Regenerate feeds from the archive (see --since/--until/--out), no fetching")
+    parser.add_argument('--since', help="Re-render window start, e.g. 2026-10-01 or 2026-10-01T06:00")
+    parser.add_argument('--until', help="Re-render window end (default now)")
+    parser.add_argument('--out', default="spz-rerender/",
+                        help="Output directory for --rerender (default spz-rerender/)")
+    parser.add_argument('--profile-memory', action='store_true',
+                        help="Trace allocations and report memory per stage and per source (see memory_report_file)")
+    parser.add_argument('--memory-budget', type=float, metavar='MB',
+                        help="With --profile-memory: exit with status 3 if peak RSS goes over this many MB")
+    return parser.parse_args()
+
+
+def assemble_tweets(results_file):
+    """Merge fetched results (see --results) into the tweets store, return all tweets"""
+    with open(results_file, 'r', encoding='utf-8') as f:
+        results = json.load(f)
+    
+    store = load_tweets_store()
+    for username, result in results.items():
+        if result.get('ok'):
+            store_tweets(store, username, result.get('tweets', []))
+    save_tweets_store(store)
+    
+    return list(merge_timelines(store.get(username, []) for username in ACCOUNTS))
+
+
+def main(args=None):
+    if args is None:
+        args = parse_args()
     
-    for tweet in tweets:
-        xml.append('  <item>')
-        xml.append(f'    <title>{escape_xml(tweet["text"][:100])}...</title>')
-        xml.append(f'    <link>{tweet["url"]}</link>')
-        xml.append(f'    <guid isPermaLink="true">{tweet["url"]}</guid>')
-        xml.append(f'    <description><![CDATA[{build_rss_description(tweet)}]]></description>')
-        xml.append(f'    <twitter_summary><![CDATA[{create_twitter_summary(tweet)}]]></twitter_summary>')
-        xml.append(f'    <twitter:username>@{tweet["username"]}</twitter:username>')
-        xml.append(f'    <score>{tweet["score"]}</score>')
-        xml.append(f'    <pubDate>{tweet["fetched_at"]}</pubDate>')
-        xml.append('  </item>')
+    if args.list_sources:
+        print(json.dumps([{"name": a, "priority": account_priority(a)} for a in ACCOUNTS]))
+        return
     
-    xml.append('</channel>')
-    xml.append('</rss>')
+    if args.assemble:
+        all_tweets = assemble_tweets(args.assemble)
+        record_tweets(all_tweets)
+        write_feeds(all_tweets)
+        return
+    
+    if args.rerender:
+        rerender_tweets(args)
+        return
+    
+    accounts = ACCOUNTS
+    if args.source:
+        accounts = [a for a in ACCOUNTS if a in args.source]
     
-    return '\n'.join(xml)
-
-
-def main():
     print("=" * 60)
     print("SPZ Twitter Scraper via Nitter")
     print("=" * 60)
     
-    all_tweets = []
+    store = load_tweets_store()
+    health = load_health()
+    health_updates = {}
+    # A streamed run only keeps per-account results if they were asked for
+    report = {} if args.report or not args.stream else None
+    accounts = schedule_sources(accounts, health, account_priority)
+    deadline = time.time() + (args.deadline or CONFIG['max_total_time'])
+    deadline_skipped = []
+    budget_skipped = []
+    # Tweets already in the store aren't parsed, scored or counted again (stream runs have no store)
+    seen_ids = {} if args.stream else seen_status_ids(store)
+    polled = poll_accounts(accounts, health, health_updates, report, deadline_skipped, budget_skipped, deadline,
+                           seen_ids)
+    
+    if args.stream:
+        # Tweets flow through one account at a time; only the feed slots stay in memory
+        top = top_unique(record_stage(polled), FEED_SLOTS, tweet_rank, tweet_id)
+    else:
+        fetched = {}
+        timelines = []
+        for username, tweets, result in polled:
+            # The ranking still gets the account's earlier tweets, from the store
+            timelines.append(store_tweets(store, username, tweets) if result['ok'] else tweets)
+            fetched[username] = {'ok': result['ok'], 'tweets': tweets}
+    
+    memory_stage('fetch')
+    
+    save_health(health_updates)
+    save_throttle()
+    print_health_summary(health)
+    print_budget(load_budget())
+    if deadline_skipped:
+        print(f"\n[DEADLINE] Skipped {len(deadline_skipped)} accounts: {', '.join('@' + a for a in deadline_skipped)}")
+    
+    if args.report:
+        with open(args.report, 'w') as f:
+            json.dump(report, f)
+    
+    if args.stream:
+        write_feeds(top, ['@' + a for a in deadline_skipped])
+        return
     
-    for idx, username in enumerate(ACCOUNTS, 1):
-        print(f"\n[{idx}/{len(ACCOUNTS)}] @{username}")
-        
-        rss_content = fetch_nitter_feed(username)
-        if rss_content:
-            tweets = parse_tweets(rss_content, username)
-            print(f"   [OK] {len(tweets)} tweets")
-            
-            # Calculate scores
-            for tweet in tweets:
-                tweet['score'] = calculate_score(tweet)
-            
-            # FILTER: Skip Ukraine/negative score tweets
-            tweets = [t for t in tweets if t['score'] >= 0]
-            
-            all_tweets.extend(tweets)
-        else:
-            print(f"   [FAIL] Could not fetch")
-        
-        time.sleep(CONFIG.get('delay_between_accounts', 3.0))  # Be nice to Nitter
+    # Fetch-only run: the assemble step renders and updates the store
+    if args.results:
+        with open(args.results, 'w', encoding='utf-8') as f:
+            json.dump(fetched, f, ensure_ascii=False)
+        return
     
+    save_tweets_store(store)
+    
+    # Partial runs (and accounts skipped for time or budget) keep their last tweets in the ranking
+    for username in ACCOUNTS:
+        if username not in accounts or username in deadline_skipped or username in budget_skipped:
+            timelines.append(store.get(username, []))
+    
+    # One time-ordered stream of every account's tweets, oldest first
+    all_tweets = list(merge_timelines(timelines))
+    record_tweets(all_tweets)
+    write_feeds(all_tweets, ['@' + a for a in deadline_skipped])
+
+
+# Four feeds of ten: top10, hot, trending, fresh
+FEED_SLOTS = 40
+
+
+def tweet_rank(tweet):
+    """Score, then newest first"""
+    return tweet.get('score', 0), tweet_snowflake(tweet)
+
+
+def tweet_id(tweet):
+    return tweet['id']
+
+
+def dedupe_tweets(tweets):
+    """Keep the best ranked copy of each status, so a retweet by several accounts shows once
+    Keyed on the tweet ID: the status ID, or the content hash of a tweet without one.
+    """
+    seen = set()
+    unique = []
+    for tweet in tweets:
+        if tweet['id'] not in seen:
+            seen.add(tweet['id'])
+            unique.append(tweet)
+    return unique
+
+
+def write_feeds(all_tweets, skipped=()):
+    """Rank tweets and write the four Twitter feeds (skipped: accounts left out for time)"""
     print(f"\n{'='*60}")
     print(f"Total tweets: {len(all_tweets)}")
     print("=" * 60)
@@ -358,7 +916,8 @@ def main():
         return
     
     # Sort by score (highest first)
-    all_tweets.sort(key=lambda x: -x.get('score', 0))
+    all_tweets.sort(key=tweet_rank, reverse=True)
+    all_tweets = dedupe_tweets(all_tweets)
     
     # Create 4 feeds like Reddit
     feeds = [
@@ -369,23 +928,19 @@ def main():
     ]
     
     for filename, tweets, title, desc in feeds:
-        if tweets:
-            xml = generate_twitter_rss(tweets, filename, title, desc)
-            if xml:
-                filepath = os.path.join(CONFIG['output_dir'], filename)
-                with open(filepath, 'w', encoding='utf-8') as f:
-                    f.write(xml)
-                print(f"[SAVED] {filename} ({len(tweets)} tweets)")
-        else:
-            # Create empty feed
-            xml = generate_twitter_rss([], filename, title, desc)
-            filepath = os.path.join(CONFIG['output_dir'], filename)
-            with open(filepath, 'w', encoding='utf-8') as f:
-                f.write(xml)
-            print(f"[SAVED] {filename} (0 tweets)")
+        # Always create file, even with 0 tweets
+        collected = []
+        save_feed(iter_twitter_rss(collect_json(tweets, tweet_json, collected), filename, title, desc, skipped), filename)
+        save_json_outputs(filename, title, desc, 'en', collected, skipped)
+        print(f"[SAVED] {filename} ({len(tweets)} tweets)")
     
     print("\n[DONE]")
 
 
 if __name__ == "__main__":
-    main()
+    args = parse_args()
+    if args.profile_memory:
+        start_memory_profile(args.memory_budget)
+    main(args)
+    if not finish_memory_profile():
+        sys.exit(MEMORY_BUDGET_EXIT)
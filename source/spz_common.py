@@ -0,0 +1,1461 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+SPZ Common
+Helpers shared by the scrapers, spz-auto-update.py and spz-search.py. Each script
+passes its own CONFIG in with use_config(); the helpers read their settings from it.
+"""
+
+import os
+import sys
+import io
+import re
+import json
+import gzip
+import time
+import random
+import hashlib
+import heapq
+import importlib.util
+import shlex
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from urllib.parse import urlsplit, urlunsplit
+from concurrent.futures import ThreadPoolExecutor, Future
+
+# The calling script's CONFIG (same dict, so changes it makes later are seen here)
+CONFIG = {}
+
+
+def use_config(config):
+    global CONFIG
+    CONFIG = config
+
+
+# === KEYWORD MATCHING (Hebrew-aware) ===
+# Niqqud and cantillation marks (maqaf U+05BE is handled as a word break)
+HEBREW_MARKS_RE = re.compile(r'[\u0591-\u05bd\u05bf-\u05c7]')
+# Geresh/gershayim inside acronyms: צה"ל -> צהל
+HEBREW_ACRONYM_RE = re.compile(r'(?<=[\u05d0-\u05ea])["\'\u05f3\u05f4](?=[\u05d0-\u05ea])')
+HEBREW_FINALS = str.maketrans('ךםןףץ', 'כמנפצ')
+HEBREW_PREFIXES = 'והבלמשכ'
+# Plural/adjective endings after final-letter folding: ים -> ימ, ות, ית
+HEBREW_SUFFIXES = ('ימ', 'ות', 'ית')
+TOKEN_RE = re.compile(r'\w+')
+
+
+def normalize_text(text):
+    """Lowercase, strip niqqud, fold Hebrew final letters"""
+    text = HEBREW_MARKS_RE.sub('', text.lower()).replace('\u05be', ' ')
+    text = HEBREW_ACRONYM_RE.sub('', text)
+    return text.translate(HEBREW_FINALS)
+
+
+def token_variants(token):
+    """Token plus forms with attached Hebrew prefixes, Hebrew plural endings or English plural stripped"""
+    variants = [token]
+    if 'א' <= token[0] <= 'ת':
+        stem = token
+        for _ in range(3):
+            if len(stem) > 2 and stem[0] in HEBREW_PREFIXES:
+                stem = stem[1:]
+                variants.append(stem)
+            else:
+                break
+        # איראנים -> איראנ, folded the same way as the keyword איראן
+        variants += [v[:-2] for v in variants if len(v) > 4 and v.endswith(HEBREW_SUFFIXES)]
+    else:
+        if len(token) > 3 and token.endswith('es'):
+            variants.append(token[:-2])
+        if len(token) > 2 and token.endswith('s'):
+            variants.append(token[:-1])
+    return variants
+
+
+def build_keyword_trie(groups, aliases):
+    """Compile {group: [english keywords]} plus {alias: english keyword} into a token trie
+    Terminal nodes hold (group, canonical keyword) pairs under the None key.
+    """
+    trie = {}
+    for group, keywords in groups.items():
+        for keyword in keywords:
+            phrases = [keyword] + [alias for alias, canonical in aliases.items() if canonical == keyword]
+            for phrase in phrases:
+                node = trie
+                for token in TOKEN_RE.findall(normalize_text(phrase)):
+                    node = node.setdefault(token, {})
+                node.setdefault(None, set()).add((group, keyword))
+    return trie
+
+
+def match_keywords(text, trie):
+    """Single pass over the tokens, returns {group: set of matched keywords}"""
+    tokens = TOKEN_RE.findall(normalize_text(text or ''))
+    hits = {}
+    for i, token in enumerate(tokens):
+        # Prefixes only attach to the first word of a phrase
+        for variant in token_variants(token):
+            node = trie.get(variant)
+            j = i + 1
+            while node is not None:
+                for group, keyword in node.get(None, ()):
+                    hits.setdefault(group, set()).add(keyword)
+                if j >= len(tokens):
+                    break
+                node = node.get(tokens[j])
+                j += 1
+    return hits
+
+
+# === URLS ===
+# Query parameters that only track the click, never change the page
+TRACKING_PARAMS = {'fbclid', 'gclid', 'dclid', 'msclkid', 'yclid', 'igshid', 'mc_cid', 'mc_eid',
+                   'ref_src', 'ref_url', 'cmpid', 'smid', 'smtyp', 'ocid', 'ito', '_ga'}
+TRACKING_PARAM_PREFIXES = ('utm_', 'at_', 'ns_')
+
+
+# Nitter instances spz-twitter-nitter.py reads from (tried in order if one fails)
+NITTER_INSTANCES = [
+    "https://nitter.privacydev.net",
+    "https://nitter.net",
+    "https://nitter.it",
+]
+
+# Tweet hosts, including those Nitter mirrors
+TWITTER_HOSTS = ({'twitter.com', 'www.twitter.com', 'mobile.twitter.com', 'x.com', 'www.x.com'}
+                 | {urlsplit(instance).hostname for instance in NITTER_INSTANCES})
+TWEET_PATH_RE = re.compile(r'^/(\w{1,15})/status(?:es)?/(\d+)')
+
+
+def canonical_url(url):
+    """One spelling per page, for IDs, dedup and the page cache
+    https, lowercase host without default port, no tracking parameters, fragment or
+    trailing slash; tweet links from x.com or a Nitter mirror become twitter.com status URLs.
+    """
+    url = (url or '').strip()
+    try:
+        parts = urlsplit(url)
+        port = parts.port
+    except ValueError:
+        return url
+    if parts.scheme.lower() not in ('http', 'https') or not parts.hostname:
+        return url
+    
+    host = parts.hostname.rstrip('.')
+    if host in TWITTER_HOSTS:
+        match = TWEET_PATH_RE.match(parts.path)
+        if match:
+            return f"https://twitter.com/{match.group(1)}/status/{match.group(2)}"
+        host = 'twitter.com'
+    if port and port not in (80, 443):
+        host = f"{host}:{port}"
+    
+    query = '&'.join(pair for pair in parts.query.split('&')
+                     if pair and not is_tracking_param(pair.split('=', 1)[0].lower()))
+    return urlunsplit(('https', host, parts.path.rstrip('/') or '/', query, ''))
+
+
+def is_tracking_param(name):
+    return name in TRACKING_PARAMS or name.startswith(TRACKING_PARAM_PREFIXES)
+
+
+# === FEED OUTPUT ===
+def format_rfc2822(dt=None):
+    """Format datetime to RFC 2822 format"""
+    if dt is None:
+        dt = datetime.now(timezone.utc)
+    return dt.strftime("%a, %d %b %Y %H:%M:%S %z")
+
+
+def parse_pub_date(value):
+    """Parse an RFC 2822 pubDate into epoch seconds (None if unparseable)"""
+    if not value:
+        return None
+    try:
+        return int(parsedate_to_datetime(value).timestamp())
+    except (TypeError, ValueError):
+        return None
+
+
+def escape_xml(text):
+    """Escape special XML characters"""
+    if not text:
+        return ""
+    return (text
+        .replace("&", "&amp;")
+        .replace("<", "&lt;")
+        .replace(">", "&gt;")
+        .replace('"', "&quot;")
+        .replace("'", "&apos;"))
+
+
+def accept_encoding():
+    """Accept-Encoding header value - brotli only if requests can decode it"""
+    if importlib.util.find_spec('brotli'):
+        return 'gzip, deflate, br'
+    return 'gzip, deflate'
+
+
+def transfer_stats(response):
+    """Return (wire_bytes, decoded_bytes) for a fully read response"""
+    decoded = len(response.content)
+    try:
+        wire = response.raw.tell()
+    except Exception:
+        wire = 0
+    if not wire:
+        wire = int(response.headers.get('Content-Length') or decoded)
+    return wire, decoded
+
+
+def write_precompressed(filepath, data):
+    """Write .gz (and .br if brotli is installed) siblings of an output file"""
+    # mtime=0 keeps the .gz bytes identical when the feed didn't change
+    with open(f"{filepath}.gz", 'wb') as f:
+        f.write(gzip.compress(data, compresslevel=9, mtime=0))
+    
+    try:
+        import brotli
+    except ImportError:
+        return
+    with open(f"{filepath}.br", 'wb') as f:
+        f.write(brotli.compress(data, quality=11))
+
+
+def write_atomic(path, text):
+    """Write via a temp file + rename so readers never see a partial file"""
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        f.write(text)
+    os.replace(tmp_path, path)
+
+
+@contextmanager
+def file_lock(path):
+    """Hold an exclusive lock on path (created if missing) for the with block
+    Other processes taking the same lock wait, so read-modify-writes don't interleave.
+    """
+    with open(path, 'a+b') as f:
+        try:
+            import fcntl
+            fcntl.flock(f, fcntl.LOCK_EX)
+        except ImportError:
+            import msvcrt
+            f.seek(0)
+            msvcrt.locking(f.fileno(), msvcrt.LK_LOCK, 1)
+        yield
+
+
+# Extension elements in the RSS output (scores, summaries) live in our own namespace
+SPZ_NS = "https://spz.local/ns/1.0"
+JSON_FEED_VERSION = "https://jsonfeed.org/version/1.1"
+
+
+def collect_json(items, to_json, collected):
+    """Pass items through to the RSS writer, collecting (JSON Feed entry, snapshot) pairs
+    on the way, so all three outputs come from one pass over the items.
+    """
+    for item in items:
+        collected.append(to_json(item))
+        yield item
+
+
+def top_unique(items, n, rank, identity):
+    """The n best ranked items, keeping only the best copy of items with the same identity
+    Like heapq.nlargest for --stream runs: holds at most n identities (an identity that
+    dropped out competes again if a better copy comes later), and dedupes before ranking
+    so duplicates don't take feed slots.
+    """
+    live = {}                           # identity -> its entry in the heap
+    heap = []                           # also holds entries replaced by a better copy, skipped lazily
+    for seq, item in enumerate(items):
+        key, item_rank = identity(item), rank(item)
+        # -seq keeps nlargest's order for ties: earlier items first
+        entry = (item_rank, -seq, key, item)
+        current = live.get(key)
+        if current is not None:
+            if item_rank <= current[0]:
+                continue
+            live[key] = entry
+            heapq.heappush(heap, entry)
+        elif len(live) < n:
+            live[key] = entry
+            heapq.heappush(heap, entry)
+        else:
+            while heap[0] is not live.get(heap[0][2]):
+                heapq.heappop(heap)
+            if entry > heap[0]:
+                del live[heapq.heapreplace(heap, entry)[2]]
+                live[key] = entry
+        if len(heap) > 2 * n:
+            heap = list(live.values())
+            heapq.heapify(heap)
+    return [entry[3] for entry in sorted(live.values(), reverse=True)]
+
+
+def iso_date(timestamp):
+    """RFC 3339 date for JSON Feed from epoch seconds (None stays None)"""
+    return datetime.fromtimestamp(timestamp, timezone.utc).isoformat(timespec='seconds') if timestamp else None
+
+
+def skipped_elements(skipped):
+    """spz:skipped channel lines for the sources this run left out to meet its deadline"""
+    for name in skipped:
+        yield f'  <spz:skipped reason="deadline">{escape_xml(name)}</spz:skipped>'
+
+
+def save_json_outputs(filename, title, description, language, collected, skipped=()):
+    """Write <name>.json (JSON Feed 1.1) and <name>.ndjson (one compact item per line) next to the RSS
+    Deadline-skipped sources go in the JSON Feed's "_spz" extension object.
+    """
+    base = os.path.splitext(filename)[0]
+    feed = {
+        "version": JSON_FEED_VERSION,
+        "title": title,
+        "home_page_url": "https://spz.local/",
+        "feed_url": f"https://spz.local/{base}.json",
+        "description": description,
+        "language": language,
+        "items": [{k: v for k, v in entry.items() if v not in (None, '', [])} for entry, snapshot in collected],
+        "_spz": {"skipped": {"deadline": list(skipped)}} if skipped else None,
+    }
+    path = os.path.join(CONFIG['output_dir'], base)
+    write_atomic(f"{path}.json", json.dumps({k: v for k, v in feed.items() if v is not None},
+                                            ensure_ascii=False, indent=1))
+    write_atomic(f"{path}.ndjson", ''.join(json.dumps(snapshot, ensure_ascii=False, separators=(',', ':')) + '\n'
+                                          for entry, snapshot in collected))
+
+
+# === MEDIA (enclosure probes, thumbnail proxy) ===
+def load_media_cache():
+    """Load probed media metadata, dropping entries older than the TTL
+    Failed probes ({'failed_at': ...}) are kept for media_probe_retry_hours only.
+    """
+    try:
+        with open(CONFIG['media_cache_file'], 'r') as f:
+            cache = json.load(f)
+    except:
+        return {}
+    
+    cutoff = time.time() - CONFIG['media_cache_ttl_hours'] * 3600
+    retry_before = time.time() - CONFIG['media_probe_retry_hours'] * 3600
+    return {url: meta for url, meta in cache.items()
+            if meta.get('probed_at', 0) >= cutoff or meta.get('failed_at', 0) >= retry_before}
+
+
+def save_media_cache(cache):
+    """Save probed media metadata"""
+    with open(CONFIG['media_cache_file'], 'w') as f:
+        json.dump(cache, f)
+
+
+def probe_media_url(url):
+    """Get real Content-Type and Content-Length for a media URL
+    Tries HEAD first, falls back to a one-byte ranged GET when HEAD is refused.
+    """
+    import requests
+    
+    headers = {'User-Agent': CONFIG['user_agent']}
+    timeout = CONFIG['media_probe_timeout']
+    
+    try:
+        resp = requests.head(url, timeout=timeout, headers=headers, allow_redirects=True)
+        content_type = resp.headers.get('Content-Type', '')
+        length = resp.headers.get('Content-Length')
+        if resp.ok and content_type and length:
+            return {'type': content_type.split(';')[0].strip(), 'length': int(length)}
+        
+        # HEAD refused or incomplete - ask for the first byte only
+        resp = requests.get(url, timeout=timeout, headers={**headers, 'Range': 'bytes=0-0'},
+            stream=True, allow_redirects=True)
+        resp.close()
+        if not resp.ok:
+            return None
+        
+        content_type = resp.headers.get('Content-Type', '').split(';')[0].strip()
+        content_range = resp.headers.get('Content-Range', '')
+        if resp.status_code == 206 and '/' in content_range:
+            total = content_range.rsplit('/', 1)[1]
+            length = int(total) if total.isdigit() else 0
+        else:
+            length = int(resp.headers.get('Content-Length') or 0)
+        
+        if not content_type:
+            return None
+        return {'type': content_type, 'length': length}
+        
+    except Exception:
+        return None
+
+
+def probe_media(urls, cache):
+    """Probe uncached media URLs concurrently, return {url: meta} for the ones that answered
+    Failures are cached too, so a dead URL isn't probed again on every run.
+    """
+    pending = sorted({u for u in urls if u and u not in cache})
+    
+    if pending:
+        with ThreadPoolExecutor(max_workers=CONFIG['media_probe_workers']) as pool:
+            for url, meta in zip(pending, pool.map(probe_media_url, pending)):
+                if meta:
+                    meta['probed_at'] = int(time.time())
+                    cache[url] = meta
+                else:
+                    cache[url] = {'failed_at': int(time.time())}
+    
+    return {u: cache[u] for u in urls if u in cache and 'type' in cache[u]}
+
+
+def load_media_store():
+    """Load the thumbnail store index, or None when the media proxy is off
+    Thumbnails live in media_proxy_dir as <sha256 of original>.jpg, so URLs for the
+    same image share one file.
+    """
+    if not CONFIG.get('media_proxy_base_url'):
+        return None
+    if not importlib.util.find_spec('PIL'):
+        print("[MEDIA] Pillow is not installed - media proxy disabled")
+        return None
+    
+    media_dir = CONFIG['media_proxy_dir']
+    os.makedirs(media_dir, exist_ok=True)
+    try:
+        with open(os.path.join(media_dir, 'index.json'), 'r') as f:
+            index = json.load(f)
+    except:
+        index = {}
+    
+    fingerprints = BKTree()
+    shapes = {}
+    for entry in index.values():
+        if entry['file'] and entry.get('width'):
+            shapes[entry['file']] = (entry['width'], entry['height'])
+            if dhash_informative(int(entry['dhash'], 16)):
+                fingerprints.add(int(entry['dhash'], 16), entry['file'])
+    
+    return {
+        'dir': media_dir,
+        'index': index,
+        'fingerprints': fingerprints,
+        'shapes': shapes,
+        'stats': {'hits': 0, 'stored': 0, 'failed': 0, 'evictions': 0, 'near_dupes': 0},
+    }
+
+
+class BKTree:
+    """Hamming-distance metric tree over 64-bit image hashes
+    find() only descends into children whose edge distance can still be within range,
+    so a lookup touches a small part of the tree instead of every stored hash.
+    """
+    
+    def __init__(self):
+        self.root = None
+    
+    def add(self, value, item):
+        if self.root is None:
+            self.root = (value, item, {})
+            return
+        node = self.root
+        while True:
+            distance = bin(node[0] ^ value).count('1')
+            if distance == 0:
+                return                          # Keep the first item for an exact hash
+            child = node[2].get(distance)
+            if child is None:
+                node[2][distance] = (value, item, {})
+                return
+            node = child
+    
+    def find(self, value, max_distance):
+        """(distance, item) pairs within max_distance, nearest first"""
+        found = []
+        stack = [self.root] if self.root else []
+        while stack:
+            node = stack.pop()
+            distance = bin(node[0] ^ value).count('1')
+            if distance <= max_distance:
+                found.append((distance, node[1]))
+            for edge, child in node[2].items():
+                if distance - max_distance <= edge <= distance + max_distance:
+                    stack.append(child)
+        return sorted(found)
+
+
+# Flat, blank or dark images hash to (almost) all zeros or ones, so they would all
+# match each other; their hashes are never used for near-duplicate matching
+DHASH_MIN_BITS = 8
+# Near-duplicates must also have the same shape, within this fraction of the aspect ratio
+ASPECT_TOLERANCE = 0.05
+
+
+def dhash_informative(dhash):
+    return DHASH_MIN_BITS <= bin(dhash).count('1') <= 64 - DHASH_MIN_BITS
+
+
+def same_shape(size, other):
+    """True if two (width, height) pairs have the same aspect ratio, within ASPECT_TOLERANCE"""
+    aspect, other_aspect = size[0] / size[1], other[0] / other[1]
+    return abs(aspect - other_aspect) <= ASPECT_TOLERANCE * max(aspect, other_aspect)
+
+
+def image_dhash(image):
+    """64-bit difference hash: brighter-than-right-neighbour bits on a 9x8 grayscale copy
+    Survives resizing and re-encoding, so the same photo from two sites hashes within a few bits.
+    """
+    from PIL import Image
+    
+    pixels = image.convert('L').resize((9, 8), Image.LANCZOS).tobytes()
+    bits = 0
+    for row in range(8):
+        for col in range(8):
+            bits = bits << 1 | (pixels[row * 9 + col] > pixels[row * 9 + col + 1])
+    return bits
+
+
+def make_thumbnail(data):
+    """JPEG thumbnail (longest side media_thumb_size), its size and dHash of image bytes, or None"""
+    from PIL import Image
+    
+    size = CONFIG['media_thumb_size']
+    try:
+        with Image.open(io.BytesIO(data)) as image:
+            image.draft('RGB', (size, size))      # Let the JPEG decoder downscale for us
+            image = image.convert('RGB')
+            image.thumbnail((size, size))
+            out = io.BytesIO()
+            image.save(out, 'JPEG', quality=CONFIG['media_thumb_quality'], optimize=True, progressive=True)
+            return out.getvalue(), image.size, image_dhash(image)
+    except Exception:
+        return None
+
+
+def fetch_media(url):
+    """Download one image and thumbnail it -> (digest, thumbnail, thumbnail size, original bytes, dhash) or None
+    Originals over media_proxy_max_download are abandoned mid-download.
+    """
+    import requests
+    
+    try:
+        with requests.get(url, timeout=CONFIG['media_probe_timeout'], stream=True,
+                          headers={'User-Agent': 'Mozilla/5.0'}) as resp:
+            if not resp.ok or not resp.headers.get('Content-Type', '').startswith('image/'):
+                return None
+            data = bytearray()
+            for chunk in resp.iter_content(64 * 1024):
+                data += chunk
+                if len(data) > CONFIG['media_proxy_max_download']:
+                    return None
+    except Exception:
+        return None
+    
+    made = make_thumbnail(bytes(data))
+    if made is None:
+        return None
+    thumb, size, dhash = made
+    return hashlib.sha256(data).hexdigest()[:32], thumb, size, len(data), dhash
+
+
+def media_store_put(store, url, fetched):
+    """Store a fetched thumbnail and index it by URL
+    A visually identical image already in the store (dHash within media_dhash_distance,
+    same aspect ratio) is reused instead of adding a second copy. Flat images never match.
+    """
+    if fetched is None:
+        store['index'][url] = {'file': None, 'failed_at': time.time(), 'last_access': time.time()}
+        store['stats']['failed'] += 1
+        return
+    
+    digest, thumb, (width, height), original_size, dhash = fetched
+    name = f"{digest}.jpg"
+    if dhash_informative(dhash):
+        for distance, existing in store['fingerprints'].find(dhash, CONFIG['media_dhash_distance']):
+            shape = store['shapes'].get(existing)
+            if shape and same_shape(shape, (width, height)) and os.path.exists(os.path.join(store['dir'], existing)):
+                name = existing
+                if existing != f"{digest}.jpg":
+                    store['stats']['near_dupes'] += 1
+                break
+    
+    path = os.path.join(store['dir'], name)
+    if not os.path.exists(path):
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, 'wb') as f:
+            f.write(thumb)
+        os.replace(tmp_path, path)
+        store['shapes'][name] = (width, height)
+        if dhash_informative(dhash):
+            store['fingerprints'].add(dhash, name)
+    width, height = store['shapes'].get(name, (width, height))
+    store['index'][url] = {'file': name, 'size': os.path.getsize(path), 'original_size': original_size,
+                           'width': width, 'height': height, 'dhash': f"{dhash:016x}",
+                           'last_access': time.time()}
+    store['stats']['stored'] += 1
+
+
+def proxy_media(urls, store):
+    """Make sure each image URL has a local thumbnail, fetching new ones concurrently
+    Returns {url: (public thumbnail URL, size)}; URLs that failed within a day aren't retried.
+    """
+    index = store['index']
+    retry_before = time.time() - 24 * 3600
+    pending = set()
+    for url in filter(None, urls):
+        entry = index.get(url)
+        if entry and entry['file'] and os.path.exists(os.path.join(store['dir'], entry['file'])):
+            continue
+        if entry and not entry['file'] and entry['failed_at'] > retry_before:
+            continue
+        pending.add(url)
+    
+    if pending:
+        pending = sorted(pending)
+        with ThreadPoolExecutor(max_workers=CONFIG['media_proxy_workers']) as pool:
+            for url, fetched in zip(pending, pool.map(fetch_media, pending)):
+                media_store_put(store, url, fetched)
+    
+    base_url = CONFIG['media_proxy_base_url'].rstrip('/')
+    proxied = {}
+    for url in filter(None, urls):
+        entry = index.get(url)
+        if entry and entry['file']:
+            entry['last_access'] = time.time()
+            if url not in pending:
+                store['stats']['hits'] += 1
+            proxied[url] = (f"{base_url}/{entry['file']}", entry['size'])
+    return proxied
+
+
+def save_media_store(store):
+    """Evict least recently used thumbnails down to the byte cap, then save the index
+    Entries another scraper added since we loaded are kept.
+    """
+    if store is None:
+        return
+    
+    index_path = os.path.join(store['dir'], 'index.json')
+    index = store['index']
+    try:
+        with open(index_path, 'r') as f:
+            for url, entry in json.load(f).items():
+                index.setdefault(url, entry)
+    except:
+        pass
+    
+    sizes = {e['file']: e['size'] for e in index.values() if e['file']}
+    total = sum(sizes.values())
+    refs = {}
+    for entry in index.values():
+        if entry['file']:
+            refs[entry['file']] = refs.get(entry['file'], 0) + 1
+    
+    for url in sorted(index, key=lambda u: index[u]['last_access']):
+        if total <= CONFIG['media_proxy_max_bytes']:
+            break
+        entry = index.pop(url)
+        if not entry['file']:
+            continue
+        store['stats']['evictions'] += 1
+        refs[entry['file']] -= 1
+        if refs[entry['file']] == 0:
+            total -= entry['size']
+            try:
+                os.remove(os.path.join(store['dir'], entry['file']))
+            except OSError:
+                pass
+    
+    write_atomic(index_path, json.dumps(index))
+    stats = store['stats']
+    print(f"[MEDIA] Thumbnails: {stats['hits']} cached, {stats['stored']} new ({stats['near_dupes']} near-duplicates), "
+          f"{stats['failed']} failed, {stats['evictions']} evicted, {total / 1024:.0f} KB stored")
+
+
+def shareable_image(entry):
+    """Whether a stored image can show that two items share a photo
+    Flat images (logos, blank placeholders) can't, and neither can entries stored before
+    sizes were recorded, which were matched without the shape check.
+    """
+    return bool(entry and entry['file'] and entry.get('width') and dhash_informative(int(entry['dhash'], 16)))
+
+
+def report_image_dupes(labelled, store):
+    """Print items that carry the same (or a visually identical) image
+    labelled: (label, source image URL) pairs from this run. Earlier items from any
+    scraper that used the image count too. Returns {thumbnail file: [labels]}.
+    """
+    index = store['index']
+    groups = {}
+    for label, url in labelled:
+        entry = index.get(url)
+        if not shareable_image(entry):
+            continue
+        entry.setdefault('label', label)
+        groups.setdefault(entry['file'], {})[label] = True
+    
+    for entry in index.values():
+        if entry['file'] in groups and entry.get('label') and shareable_image(entry):
+            groups[entry['file']][entry['label']] = True
+    
+    groups = {name: list(labels) for name, labels in groups.items() if len(labels) > 1}
+    if groups:
+        print(f"\n[IMAGES] {len(groups)} images shared across items:")
+        for labels in groups.values():
+            print("   " + " = ".join(labels[:4]) + (f" (+{len(labels) - 4})" if len(labels) > 4 else ""))
+    return groups
+
+
+# === PER-HOST THROTTLE ===
+class RateLimited(Exception):
+    """A host is backing off for longer than throttle_max_wait"""
+
+
+# Per-host token buckets, loaded on first use and saved by save_throttle()
+throttle_hosts = None
+
+
+def load_throttle():
+    """Per-host throttle state left by recent runs (older than throttle_state_ttl is dropped)"""
+    try:
+        with open(CONFIG['throttle_file'], 'r', encoding='utf-8') as f:
+            hosts = json.load(f)
+    except:
+        return {}
+    cutoff = time.time() - CONFIG['throttle_state_ttl']
+    return {host: state for host, state in hosts.items() if state.get('updated', 0) > cutoff}
+
+
+def save_throttle():
+    """Merge this run's host states into the throttle file (newest state per host wins)"""
+    if not throttle_hosts:
+        return
+    hosts = load_throttle()
+    for host, state in throttle_hosts.items():
+        if state['updated'] >= hosts.get(host, {}).get('updated', 0):
+            hosts[host] = state
+    write_atomic(CONFIG['throttle_file'], json.dumps(hosts, indent=1))
+
+
+def host_state(url):
+    global throttle_hosts
+    if throttle_hosts is None:
+        throttle_hosts = load_throttle()
+    host = urlsplit(url).hostname or url
+    return host, throttle_hosts.setdefault(host, {
+        'tokens': CONFIG['throttle_burst'], 'updated': time.time(), 'blocked_until': 0, 'failures': 0,
+    })
+
+
+def throttle_wait(url):
+    """Take a token from the host's bucket, sleeping until one is free
+    Raises RateLimited instead when the host's backoff runs past throttle_max_wait.
+    """
+    host, state = host_state(url)
+    rate, burst = CONFIG['throttle_rate'], CONFIG['throttle_burst']
+    now = time.time()
+    tokens = min(burst, state['tokens'] + (now - state['updated']) * rate)
+    wait = max(state['blocked_until'] - now, (1 - tokens) / rate)
+    if wait > CONFIG['throttle_max_wait']:
+        raise RateLimited(f"{host} backing off for another {wait:.0f}s")
+    if wait > 0:
+        time.sleep(wait)
+        tokens = min(burst, tokens + wait * rate)
+    state['tokens'] = tokens - 1
+    state['updated'] = time.time()
+
+
+def retry_after(response):
+    """Seconds from a Retry-After header (delay or HTTP date), or None"""
+    value = response.headers.get('Retry-After')
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+def throttle_update(url, response):
+    """Learn from a response (None for a connection error)
+    X-Ratelimit-Remaining/Reset (Reddit) pause the host once its window is used up;
+    429 and 5xx back off for Retry-After, else exponentially with jitter.
+    """
+    host, state = host_state(url)
+    now = time.time()
+    status = response.status_code if response is not None else None
+    if status is not None and status != 429 and status < 500:
+        state['failures'] = 0
+        remaining = response.headers.get('X-Ratelimit-Remaining')
+        reset = response.headers.get('X-Ratelimit-Reset')
+        try:
+            if remaining is not None and reset is not None and float(remaining) < 1:
+                state['blocked_until'] = now + float(reset)
+                print(f"   [THROTTLE] {host}: rate limit window used up, pausing {float(reset):.0f}s")
+        except ValueError:
+            pass
+        return
+    
+    state['failures'] += 1
+    delay = retry_after(response) if response is not None else None
+    if delay is None:
+        delay = min(CONFIG['throttle_backoff_max'], CONFIG['throttle_backoff_base'] * 2 ** (state['failures'] - 1))
+        delay *= random.uniform(0.5, 1.5)
+    state['blocked_until'] = max(state['blocked_until'], now + delay)
+    print(f"   [THROTTLE] {host}: {status or 'connection error'}, backing off {delay:.0f}s")
+
+
+def throttled_get(url, retries=None, **kwargs):
+    """requests.get behind the per-host throttle
+    429/5xx responses are retried (up to throttle_retries) once the host's backoff has
+    passed; the last response is returned either way.
+    """
+    import requests
+    
+    if retries is None:
+        retries = CONFIG['throttle_retries']
+    for attempt in range(retries + 1):
+        throttle_wait(url)
+        try:
+            response = requests.get(url, **kwargs)
+        except requests.RequestException:
+            throttle_update(url, None)
+            raise
+        throttle_update(url, response)
+        if response.status_code != 429 and response.status_code < 500:
+            break
+    return response
+
+
+# === CPU POOL ===
+def open_cpu_pool():
+    """Process pool for parse/score/render work, or None to run it inline
+    Only used when cpu_workers is set; never more workers than cores.
+    """
+    workers = min(CONFIG.get('cpu_workers') or 0, os.cpu_count() or 1)
+    if workers < 1:
+        return None
+    from concurrent.futures import ProcessPoolExecutor
+    return ProcessPoolExecutor(max_workers=workers)
+
+
+def run_in_pool(pool, fn, *args):
+    """Submit fn to the pool; without one, run it now and return a finished Future"""
+    if pool is not None:
+        return pool.submit(fn, *args)
+    future = Future()
+    try:
+        future.set_result(fn(*args))
+    except Exception as e:
+        future.set_exception(e)
+    return future
+
+
+# === SEARCH INDEX AND ARCHIVE ===
+def open_index():
+    """Open the local full-text index (items table + FTS5 mirror kept by triggers)"""
+    import sqlite3
+    
+    conn = sqlite3.connect(CONFIG['index_db'], timeout=30)
+    conn.executescript("""
+        CREATE TABLE IF NOT EXISTS items (
+            rowid INTEGER PRIMARY KEY,
+            uid TEXT UNIQUE NOT NULL,
+            kind TEXT NOT NULL,
+            source TEXT NOT NULL,
+            language TEXT,
+            score REAL,
+            published INTEGER NOT NULL,
+            url TEXT,
+            title TEXT,
+            body TEXT,
+            terms TEXT
+        );
+        CREATE INDEX IF NOT EXISTS items_published ON items (published);
+        CREATE INDEX IF NOT EXISTS items_source ON items (source, published);
+        CREATE VIRTUAL TABLE IF NOT EXISTS items_fts USING fts5 (
+            title, body, terms, content='items', content_rowid='rowid'
+        );
+        CREATE TRIGGER IF NOT EXISTS items_ai AFTER INSERT ON items BEGIN
+            INSERT INTO items_fts (rowid, title, body, terms) VALUES (new.rowid, new.title, new.body, new.terms);
+        END;
+        CREATE TRIGGER IF NOT EXISTS items_ad AFTER DELETE ON items BEGIN
+            INSERT INTO items_fts (items_fts, rowid, title, body, terms)
+            VALUES ('delete', old.rowid, old.title, old.body, old.terms);
+        END;
+        CREATE TRIGGER IF NOT EXISTS items_au AFTER UPDATE ON items BEGIN
+            INSERT INTO items_fts (items_fts, rowid, title, body, terms)
+            VALUES ('delete', old.rowid, old.title, old.body, old.terms);
+            INSERT INTO items_fts (rowid, title, body, terms) VALUES (new.rowid, new.title, new.body, new.terms);
+        END;
+    """)
+    return conn
+
+
+def search_terms(text):
+    """Normalized tokens plus prefix/plural-stripped variants, for the FTS terms column"""
+    tokens = TOKEN_RE.findall(normalize_text(text or ''))
+    extra = [v for token in tokens for v in token_variants(token)[1:]]
+    return ' '.join(tokens + extra)
+
+
+def index_items(rows):
+    """Add accepted items to the index and prune past the retention window
+    rows: dicts with uid, kind, source, language, score, published, url, title, body
+    """
+    if not CONFIG.get('index_db') or not rows:
+        return
+    
+    try:
+        conn = open_index()
+        with conn:
+            conn.executemany("""
+                INSERT INTO items (uid, kind, source, language, score, published, url, title, body, terms)
+                VALUES (:uid, :kind, :source, :language, :score, :published, :url, :title, :body, :terms)
+                ON CONFLICT (uid) DO UPDATE SET score = excluded.score
+            """, [{**row, 'terms': search_terms(f"{row['title']} {row['body']}")} for row in rows])
+            
+            cutoff = int(time.time()) - CONFIG['index_retention_days'] * 86400
+            pruned = conn.execute("DELETE FROM items WHERE published < ?", (cutoff,)).rowcount
+        conn.close()
+        print(f"[INDEX] {len(rows)} items indexed, {pruned} pruned")
+    except Exception as e:
+        print(f"[WARN] Index update failed: {e}")
+
+
+def open_archive():
+    """Open the archive's index of which item is stored in which day partition"""
+    import sqlite3
+    
+    os.makedirs(CONFIG['archive_dir'], exist_ok=True)
+    conn = sqlite3.connect(os.path.join(CONFIG['archive_dir'], 'index.db'), timeout=30)
+    conn.executescript("""
+        CREATE TABLE IF NOT EXISTS archive (
+            uid TEXT PRIMARY KEY,
+            kind TEXT NOT NULL,
+            source TEXT NOT NULL,
+            published INTEGER NOT NULL,
+            day TEXT NOT NULL
+        ) WITHOUT ROWID;
+        CREATE INDEX IF NOT EXISTS archive_published ON archive (kind, published);
+        CREATE INDEX IF NOT EXISTS archive_source ON archive (kind, source, published);
+    """)
+    return conn
+
+
+def archive_path(kind, day):
+    return os.path.join(CONFIG['archive_dir'], kind, f"{day}.jsonl.gz")
+
+
+def archive_items(kind, records):
+    """Append items not archived yet to the partition for their (UTC) publish day
+    records: dicts with uid, source, published (epoch) and the raw item
+    Each call adds one gzip member per touched day; files are never rewritten.
+    """
+    if not CONFIG.get('archive_dir') or not records:
+        return
+    
+    try:
+        conn = open_archive()
+        new_by_day = {}
+        with conn:
+            for record in records:
+                day = datetime.fromtimestamp(record['published'], timezone.utc).strftime('%Y-%m-%d')
+                cursor = conn.execute("INSERT OR IGNORE INTO archive VALUES (?, ?, ?, ?, ?)",
+                                      (record['uid'], kind, record['source'], record['published'], day))
+                if cursor.rowcount:
+                    new_by_day.setdefault(day, []).append(record)
+            
+            # Written before the index commits, so a crash can only leave a duplicate
+            # (readers skip those), never an indexed item that isn't on disk
+            os.makedirs(os.path.join(CONFIG['archive_dir'], kind), exist_ok=True)
+            for day, day_records in new_by_day.items():
+                lines = ''.join(json.dumps(r, ensure_ascii=False) + '\n' for r in day_records)
+                with open(archive_path(kind, day), 'ab') as f:
+                    f.write(gzip.compress(lines.encode('utf-8')))
+        conn.close()
+        print(f"[ARCHIVE] {sum(map(len, new_by_day.values()))} new items archived")
+    except Exception as e:
+        print(f"[WARN] Archive update failed: {e}")
+
+
+def read_archive(kind, start, end, sources=None):
+    """Archived records with start <= published < end, oldest first"""
+    conn = open_archive()
+    sql = "SELECT DISTINCT day FROM archive WHERE kind = ? AND published >= ? AND published < ?"
+    params = [kind, start, end]
+    if sources:
+        sql += f" AND source IN ({', '.join('?' * len(sources))})"
+        params += list(sources)
+    days = sorted(day for (day,) in conn.execute(sql, params))
+    conn.close()
+    
+    records = {}
+    for day in days:
+        path = archive_path(kind, day)
+        try:
+            with gzip.open(path, 'rt', encoding='utf-8') as f:
+                for line in f:
+                    record = json.loads(line)
+                    if not start <= record['published'] < end:
+                        continue
+                    if sources and record['source'] not in sources:
+                        continue
+                    records.setdefault(record['uid'], record)
+        except (OSError, EOFError, ValueError) as e:
+            print(f"[WARN] {path}: {e}")
+    return sorted(records.values(), key=lambda r: r['published'])
+
+
+def parse_window(since, until):
+    """--since/--until (ISO date or date + time, local) to an epoch range"""
+    start = datetime.fromisoformat(since).timestamp() if since else 0
+    end = datetime.fromisoformat(until).timestamp() if until else time.time() + 1
+    return int(start), int(end)
+
+
+# === SOURCE HEALTH AND SCHEDULING ===
+def load_health():
+    """Load per-source health records"""
+    try:
+        with open(CONFIG['health_file'], 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except:
+        return {}
+
+
+def save_health(updates):
+    """Merge this run's records into the health file (other runs may have written it)"""
+    if not updates:
+        return
+    health = load_health()
+    health.update(updates)
+    tmp_path = f"{CONFIG['health_file']}.{os.getpid()}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(health, f, ensure_ascii=False, indent=1)
+    os.replace(tmp_path, CONFIG['health_file'])
+
+
+def is_quarantined(record, now=None):
+    return (record or {}).get('quarantined_until', 0) > (now or time.time())
+
+
+def health_record(health, name):
+    return health.setdefault(name, {
+        'runs': 0, 'failures': 0, 'consecutive_failures': 0,
+        'items': 0, 'latencies': [], 'quarantine_level': 0,
+    })
+
+
+def record_health(health, name, ok, latency, items=0, error=None):
+    """Update one source's health record after a poll
+    Quarantines the source after `quarantine_after` consecutive failures; each failed
+    re-probe doubles the wait, one success clears it.
+    """
+    now = time.time()
+    record = health_record(health, name)
+    record['runs'] += 1
+    record['latencies'] = (record['latencies'] + [round(latency, 2)])[-CONFIG['health_latency_samples']:]
+    
+    if ok:
+        if record.get('quarantine_level'):
+            print(f"   [HEALTH] {name} recovered, leaving quarantine")
+        record['consecutive_failures'] = 0
+        record['quarantine_level'] = 0
+        record['items'] += items
+        record['last_ok'] = int(now)
+        record.pop('quarantined_until', None)
+        return record
+    
+    error = error or "UnknownError"
+    record['failures'] += 1
+    record['consecutive_failures'] += 1
+    record['error_class'] = error.split(':', 1)[0]
+    record['last_error'] = error[:200]
+    record['last_failure'] = int(now)
+    
+    if record['consecutive_failures'] >= CONFIG['quarantine_after']:
+        delay = min(CONFIG['quarantine_base'] * 2 ** record['quarantine_level'], CONFIG['quarantine_max'])
+        record['quarantined_until'] = int(now + delay)
+        record['quarantine_level'] += 1
+        print(f"   [QUARANTINE] {name}: {record['consecutive_failures']} failures in a row "
+              f"({record['error_class']}), re-probe in {delay / 3600:.1f}h")
+    return record
+
+
+def latency_percentiles(latencies):
+    """(p50, p95) of the recorded poll latencies in seconds"""
+    if not latencies:
+        return 0, 0
+    ordered = sorted(latencies)
+    return ordered[len(ordered) // 2], ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))]
+
+
+def print_health_summary(health):
+    """List quarantined sources (and ones failing but not yet quarantined)"""
+    now = time.time()
+    quarantined = sorted((n, r) for n, r in health.items() if is_quarantined(r, now))
+    failing = sorted((n, r) for n, r in health.items()
+                     if r.get('consecutive_failures') and not is_quarantined(r, now))
+    if not quarantined and not failing:
+        return
+    
+    print(f"\n[HEALTH] {len(quarantined)} quarantined, {len(failing)} failing")
+    for name, record in quarantined + failing:
+        p50, p95 = latency_percentiles(record['latencies'])
+        status = "failing"
+        if is_quarantined(record, now):
+            status = f"quarantined until {datetime.fromtimestamp(record['quarantined_until']):%m-%d %H:%M}"
+        print(f"   {name}: {status}, {record['consecutive_failures']}x {record.get('error_class')}, "
+              f"p50 {p50:.1f}s / p95 {p95:.1f}s, {record['items']} items in {record['runs']} runs")
+
+
+PRIORITY_RANK = {"high": 0, "medium": 1, "low": 2}
+
+
+def expected_poll_time(record):
+    """Seconds one source is expected to cost (p95 latency, throttle waits included)"""
+    if not record or not record.get('latencies'):
+        return CONFIG['timeout']
+    return latency_percentiles(record['latencies'])[1]
+
+
+def expected_yield(record):
+    """Accepted items per second of polling; sources with no history go first"""
+    if not record or not record.get('runs'):
+        return float('inf')
+    return record['items'] / record['runs'] / expected_poll_time(record)
+
+
+def source_name(source):
+    """Sources are config dicts with a name, or bare account names (Twitter)"""
+    return source if isinstance(source, str) else source['name']
+
+
+def schedule_sources(sources, health, priority_of=None):
+    """High priority first, then medium, then low; best yield first within each
+    priority_of(source) defaults to the source's own 'priority' key.
+    """
+    priority_of = priority_of or (lambda source: source.get('priority'))
+    return sorted(sources, key=lambda s: (PRIORITY_RANK.get(priority_of(s), 1),
+                                          -expected_yield(health.get(source_name(s)))))
+
+
+def out_of_time(priority, record, deadline):
+    """True if a medium/low source wouldn't finish before the deadline (high always runs)"""
+    if priority == 'high':
+        return False
+    return time.time() + expected_poll_time(record) > deadline
+
+
+def record_deadline_skip(health, name):
+    """Note a skip for lack of time; failure and quarantine state stay as they were"""
+    record = health_record(health, name)
+    record['deadline_skips'] = record.get('deadline_skips', 0) + 1
+    record['last_deadline_skip'] = int(time.time())
+    return record
+
+
+# === MEMORY PROFILING (--profile-memory) ===
+MB = 1024 * 1024
+MEMORY_BUDGET_EXIT = 3                  # Exit status of a --profile-memory run over its memory budget
+
+
+# --profile-memory state; while it is None every hook below returns at once
+memory_profile = None
+
+
+def rss_bytes():
+    """(current, peak, children's peak) resident set size; None where the OS doesn't say
+    The children's peak is the largest finished child process (the orchestrator's scrapers).
+    """
+    try:
+        import resource
+    except ImportError:
+        return None, None, None
+    unit = 1 if sys.platform == 'darwin' else 1024  # macOS reports bytes, Linux KB
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * unit
+    children_peak = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss * unit
+    try:
+        with open('/proc/self/statm') as f:
+            current = int(f.read().split()[1]) * resource.getpagesize()
+    except (OSError, ValueError, IndexError):
+        current = None
+    return current, peak, children_peak or None
+
+
+def memory_snapshot():
+    import tracemalloc
+    
+    return tracemalloc.take_snapshot().filter_traces([tracemalloc.Filter(False, tracemalloc.__file__)])
+
+
+def start_memory_profile(budget_mb=None):
+    """Start tracemalloc; the stage and source hooks record from here on
+    Parse/score/render then run inline: tracemalloc and RUSAGE_SELF can't see pool workers.
+    """
+    import tracemalloc
+    global memory_profile
+    
+    if CONFIG.get('cpu_workers', 0) != 0:
+        print("[MEMORY] Profiling: CPU pool disabled, parse/score/render run in this process")
+        CONFIG['cpu_workers'] = 0
+    tracemalloc.start()
+    memory_profile = {
+        'budget_mb': budget_mb if budget_mb is not None else CONFIG['memory_budget_mb'],
+        'snapshot': memory_snapshot(),
+        'stage_peak': 0,
+        'stages': [],
+        'sources': {},
+    }
+
+
+def memory_source(name):
+    """Record traced and resident memory after one source"""
+    if memory_profile is None:
+        return
+    import tracemalloc
+    
+    current, peak = tracemalloc.get_traced_memory()
+    memory_profile['stage_peak'] = max(memory_profile['stage_peak'], peak)
+    memory_profile['sources'][name] = {'traced': current, 'traced_peak': peak, 'rss_peak': rss_bytes()[1]}
+    tracemalloc.reset_peak()
+
+
+def memory_stage(name):
+    """Close a stage: memory now, its peak, and the allocation sites that grew most since the last stage"""
+    if memory_profile is None:
+        return
+    import tracemalloc
+    
+    current, peak = tracemalloc.get_traced_memory()
+    snapshot = memory_snapshot()
+    top = snapshot.compare_to(memory_profile['snapshot'], 'lineno')[:CONFIG['memory_top_sites']]
+    rss, rss_peak, children_peak = rss_bytes()
+    stage = {
+        'stage': name,
+        'traced': current,
+        'traced_peak': max(peak, memory_profile['stage_peak']),
+        'rss': rss,
+        'rss_peak': rss_peak,
+        'children_rss_peak': children_peak,
+        'top': [{'site': str(s.traceback[0]), 'size_diff': s.size_diff, 'count_diff': s.count_diff} for s in top],
+    }
+    memory_profile['stages'].append(stage)
+    del memory_profile['stages'][:-100]  # Long-running processes keep the recent ones
+    memory_profile['snapshot'] = snapshot
+    memory_profile['stage_peak'] = 0
+    tracemalloc.reset_peak()
+    
+    print(f"[MEMORY] {name}: {current / MB:.1f} MB traced (peak {stage['traced_peak'] / MB:.1f} MB)"
+          + (f", RSS {rss / MB:.0f} MB" if rss else "") + (f", RSS peak {rss_peak / MB:.0f} MB" if rss_peak else "")
+          + (f", child processes' RSS peak {children_peak / MB:.0f} MB" if children_peak else ""))
+    for site in stage['top']:
+        print(f"   {site['size_diff'] / 1024:+9.0f} KB {site['count_diff']:+8d} blocks  {site['site']}")
+
+
+def memory_over_budget():
+    """True once peak RSS (traced peak where RSS is unavailable) has passed the budget"""
+    if memory_profile is None or memory_profile['budget_mb'] is None or not memory_profile['stages']:
+        return False
+    peak = max(s['rss_peak'] or s['traced_peak'] for s in memory_profile['stages'])
+    if peak <= memory_profile['budget_mb'] * MB:
+        return False
+    print(f"[MEMORY] Peak {peak / MB:.0f} MB is over the {memory_profile['budget_mb']:g} MB budget")
+    return True
+
+
+def finish_memory_profile():
+    """Close the last stage, save the report to memory_report_file; False if over budget"""
+    if memory_profile is None:
+        return True
+    import tracemalloc
+    
+    memory_stage('finish')
+    sources = sorted(memory_profile['sources'].items(), key=lambda kv: kv[1]['traced_peak'], reverse=True)
+    if sources:
+        print("[MEMORY] Highest traced peaks by source:")
+        for name, record in sources[:5]:
+            print(f"   {record['traced_peak'] / MB:7.1f} MB  {name}")
+    report = {key: memory_profile[key] for key in ('budget_mb', 'stages', 'sources')}
+    write_atomic(CONFIG['memory_report_file'], json.dumps(report, indent=1))
+    tracemalloc.stop()
+    return not memory_over_budget()
+
+
+# === BREAKING LANE ===
+# The publish command runs once per scraper run; later items go out with the cycle's upload
+breaking_published = False
+
+
+def load_breaking():
+    """Load the breaking lane's current items (shared by all scrapers)"""
+    try:
+        with open(CONFIG['breaking_store_file'], 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except:
+        return []
+
+
+def render_breaking(entries):
+    """RSS for the breaking lane, newest first"""
+    xml = ['<?xml version="1.0" encoding="UTF-8"?>']
+    xml.append('<rss version="2.0">')
+    xml.append('<channel>')
+    xml.append('  <title>SPZ Breaking</title>')
+    xml.append(f'  <link>https://spz.local/{CONFIG["breaking_file"]}</link>')
+    xml.append(f'  <description>Items scoring {CONFIG["breaking_threshold"]}+ on the relevancy meter, '
+               f'published as soon as they are found</description>')
+    xml.append(f'  <lastBuildDate>{format_rfc2822()}</lastBuildDate>')
+    
+    for entry in entries:
+        xml.append('  <item>')
+        xml.append(f'    <title>{escape_xml(entry["title"])}</title>')
+        xml.append(f'    <link>{escape_xml(entry["url"])}</link>')
+        xml.append(f'    <guid isPermaLink="false">{escape_xml(entry["uid"])}</guid>')
+        xml.append(f'    <description>{escape_xml(entry["summary"])}</description>')
+        xml.append(f'    <pubDate>{entry["published"]}</pubDate>')
+        xml.append(f'    <category>{escape_xml(entry["source"])}</category>')
+        xml.append(f'    <relevance>{entry["relevance"]}</relevance>')
+        xml.append('  </item>')
+    
+    xml.append('</channel>')
+    xml.append('</rss>')
+    return '\n'.join(xml)
+
+
+def breaking_alert(entry):
+    """Alert text in the relevancy meter's format"""
+    return (f"🚨 HIGH RELEVANCY ALERT\n"
+            f"Score: {entry['relevance']}/10\n"
+            f"Source: {entry['source']}\n"
+            f"Title: {entry['title']}\n"
+            f"URL: {entry['url']}")
+
+
+def post_breaking_webhook(entry):
+    import requests
+    
+    try:
+        requests.post(CONFIG['breaking_webhook'], json=entry, timeout=5)
+    except Exception as e:
+        print(f"   [WARN] Breaking webhook failed: {e}")
+
+
+def command_argv(command):
+    """Hook commands are argv lists; a plain string is split, never run through a shell"""
+    return shlex.split(command) if isinstance(command, str) else list(command)
+
+
+def fire_breaking_hooks(new_entries):
+    """Hand new breaking items to the local hook/webhook without waiting on them"""
+    import subprocess
+    import threading
+    global breaking_published
+    
+    for entry in new_entries:
+        if CONFIG.get('breaking_hook'):
+            try:
+                proc = subprocess.Popen(command_argv(CONFIG['breaking_hook']), stdin=subprocess.PIPE,
+                                        env={**os.environ, 'SPZ_ALERT': breaking_alert(entry)})
+                proc.stdin.write(json.dumps(entry, ensure_ascii=False).encode('utf-8'))
+                proc.stdin.close()
+            except Exception as e:
+                print(f"   [WARN] Breaking hook failed: {e}")
+        if CONFIG.get('breaking_webhook'):
+            threading.Thread(target=post_breaking_webhook, args=(entry,)).start()
+    
+    if CONFIG.get('breaking_publish_cmd') and not breaking_published:
+        breaking_published = True
+        try:
+            subprocess.Popen(command_argv(CONFIG['breaking_publish_cmd']))
+        except Exception as e:
+            print(f"   [WARN] Breaking publish failed: {e}")
+
+
+def emit_breaking(candidates):
+    """Fast lane: put items at or above breaking_threshold into breaking.xml right away
+    candidates: meter entries (uid, kind, source, title, url, summary, published, relevance)
+    """
+    if not CONFIG.get('breaking_threshold'):
+        return
+    hot = [c for c in candidates if c['relevance'] >= CONFIG['breaking_threshold']]
+    if not hot:
+        return
+    
+    # Every scraper updates the same store; the lock keeps concurrent runs from dropping items
+    with file_lock(f"{CONFIG['breaking_store_file']}.lock"):
+        entries = load_breaking()
+        known = {e['uid'] for e in entries}
+        new_entries = [dict(c, accepted_at=int(time.time())) for c in hot if c['uid'] not in known]
+        if not new_entries:
+            return
+        
+        cutoff = time.time() - CONFIG['breaking_max_age_hours'] * 3600
+        entries = [e for e in entries if e['accepted_at'] >= cutoff] + new_entries
+        entries.sort(key=lambda e: -e['accepted_at'])
+        entries = entries[:CONFIG['breaking_max_items']]
+        
+        write_atomic(CONFIG['breaking_store_file'], json.dumps(entries, ensure_ascii=False))
+        write_atomic(os.path.join(CONFIG['output_dir'], CONFIG['breaking_file']), render_breaking(entries))
+    for entry in new_entries:
+        print(f"   [BREAKING] {entry['relevance']}/10 {entry['source']}: {entry['title'][:60]}")
+    fire_breaking_hooks(new_entries)
+
+
+# === RELEVANCY BUDGET ===
+def budget_window(now=None):
+    """(start, end) epoch seconds of the current relevancy budget window"""
+    span = CONFIG['budget_window_hours'] * 3600
+    start = int((now or time.time()) // span * span)
+    return start, start + span
+
+
+def load_budget():
+    """Current window's accepted items: {"window_start", "items": {uid: [kind, score]}}"""
+    start, _ = budget_window()
+    try:
+        with open(CONFIG['budget_file'], 'r', encoding='utf-8') as f:
+            budget = json.load(f)
+    except:
+        budget = {}
+    if budget.get('window_start') != start:
+        budget = {'window_start': start, 'items': {}}
+    return budget
+
+
+def budget_total(budget):
+    return round(sum(score for _, score in budget['items'].values()), 1)
+
+
+def budget_reached(budget):
+    return bool(CONFIG.get('budget_limit')) and budget_total(budget) >= CONFIG['budget_limit']
+
+
+def add_to_budget(entries):
+    """Add accepted items' meter scores to the window (each uid counts once), return the budget
+    Every scraper updates the same file; the lock keeps concurrent runs from dropping items.
+    """
+    os.makedirs(os.path.dirname(CONFIG['budget_file']) or '.', exist_ok=True)
+    with file_lock(f"{CONFIG['budget_file']}.lock"):
+        budget = load_budget()
+        new_items = {e['uid']: [e['kind'], e['relevance']] for e in entries if e['uid'] not in budget['items']}
+        if new_items:
+            budget['items'].update(new_items)
+            write_atomic(CONFIG['budget_file'], json.dumps(budget))
+    return budget
+
+
+def print_budget(budget):
+    start, end = budget_window()
+    by_kind = {}
+    for kind, score in budget['items'].values():
+        by_kind[kind] = by_kind.get(kind, 0) + score
+    breakdown = ', '.join(f"{kind} {score:.1f}" for kind, score in sorted(by_kind.items()))
+    print(f"\n[BUDGET] Window {datetime.fromtimestamp(start):%H:%M}-{datetime.fromtimestamp(end):%H:%M}: "
+          f"{budget_total(budget)}/{CONFIG['budget_limit']} from {len(budget['items'])} items"
+          + (f" ({breakdown})" if breakdown else ""))
+    if budget_reached(budget):
+        print(f"[BUDGET] Limit reached - skipping {', '.join(CONFIG['budget_skip_priorities'])} priority sources until {datetime.fromtimestamp(end):%H:%M}")
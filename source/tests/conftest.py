@@ -0,0 +1,38 @@
+"""Shared fixtures: put source/ on the path and load the hyphenated scripts once per run"""
+import importlib.util
+import os
+import sys
+
+import pytest
+
+SOURCE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, SOURCE_DIR)
+
+
+def load_script(filename):
+    """Import a script by file name (spz-twitter-nitter.py is not a valid module name)"""
+    name = os.path.splitext(filename)[0].replace('-', '_')
+    if name not in sys.modules:
+        spec = importlib.util.spec_from_file_location(name, os.path.join(SOURCE_DIR, filename))
+        module = importlib.util.module_from_spec(spec)
+        sys.modules[name] = module
+        # The scripts rewrap stdout/stderr as UTF-8 on import; put pytest's capture back and
+        # detach the wrappers so they don't close its buffers when collected
+        streams = sys.stdout, sys.stderr
+        try:
+            spec.loader.exec_module(module)
+        finally:
+            for wrapper in {sys.stdout, sys.stderr} - set(streams):
+                wrapper.detach()
+            sys.stdout, sys.stderr = streams
+    return sys.modules[name]
+
+
+@pytest.fixture(scope='session')
+def rss():
+    return load_script('multi_feed_generator.py')
+
+
+@pytest.fixture(scope='session')
+def twitter():
+    return load_script('spz-twitter-nitter.py')
@@ -0,0 +1,46 @@
+import random
+
+from spz_common import BKTree
+
+
+def hamming(a, b):
+    return bin(a ^ b).count('1')
+
+
+def test_find_returns_nearest_first():
+    tree = BKTree()
+    for value, item in [(0b0000, 'zero'), (0b0001, 'one'), (0b0111, 'three'), (0b1111, 'four')]:
+        tree.add(value, item)
+    assert tree.find(0b0000, 1) == [(0, 'zero'), (1, 'one')]
+    assert tree.find(0b0011, 1) == [(1, 'one'), (1, 'three')]
+    assert tree.find(0b0000, 0) == [(0, 'zero')]
+
+
+def test_exact_hash_keeps_first_item():
+    tree = BKTree()
+    tree.add(42, 'first')
+    tree.add(42, 'second')
+    assert tree.find(42, 0) == [(0, 'first')]
+
+
+def test_empty_tree():
+    assert BKTree().find(0, 64) == []
+
+
+def test_matches_linear_scan():
+    rng = random.Random(11)
+    stored = {}
+    tree = BKTree()
+    for i in range(2000):
+        value = rng.getrandbits(64)
+        if value not in stored:
+            stored[value] = f'img{i}.jpg'
+            tree.add(value, stored[value])
+    for _ in range(200):
+        base = rng.choice(list(stored))
+        # Flip a few bits so some lookups land near stored hashes
+        query = base ^ sum(1 << rng.randrange(64) for _ in range(rng.randrange(6)))
+        max_distance = rng.randrange(12)
+        expected = sorted((hamming(value, query), item) for value, item in stored.items()
+                          if hamming(value, query) <= max_distance)
+        assert tree.find(query, max_distance) == expected
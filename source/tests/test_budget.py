@@ -0,0 +1,25 @@
+import pytest
+
+import spz_common
+
+
+@pytest.fixture(autouse=True)
+def six_hour_windows(monkeypatch):
+    monkeypatch.setattr(spz_common, 'CONFIG', {'budget_window_hours': 6})
+
+
+def test_window_is_aligned_to_its_span():
+    # 2026-10-01 08:30 UTC falls in the 06:00-12:00 window
+    assert spz_common.budget_window(1790843400) == (1790834400, 1790856000)
+
+
+def test_window_boundaries():
+    start, end = spz_common.budget_window(1790834400)
+    assert (start, end) == (1790834400, 1790856000)
+    assert spz_common.budget_window(end - 1) == (start, end)
+    assert spz_common.budget_window(end)[0] == end
+
+
+def test_window_defaults_to_now(monkeypatch):
+    monkeypatch.setattr(spz_common.time, 'time', lambda: 1790843400.5)
+    assert spz_common.budget_window() == (1790834400, 1790856000)
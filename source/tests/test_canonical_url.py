@@ -0,0 +1,38 @@
+import pytest
+
+from spz_common import canonical_url
+
+
+@pytest.mark.parametrize('url, expected', [
+    ('http://Example.COM:80/news/story/?utm_source=x&id=7&fbclid=abc#comments',
+     'https://example.com/news/story?id=7'),
+    ('https://example.com.:443', 'https://example.com/'),
+    ('https://example.com:8443/a/', 'https://example.com:8443/a'),
+    ('  https://example.com/a?at_medium=rss&ns_mchannel=x  ', 'https://example.com/a'),
+    ('https://example.com/search?q=iran&page=2', 'https://example.com/search?q=iran&page=2'),
+])
+def test_tracking_and_spelling_are_dropped(url, expected):
+    assert canonical_url(url) == expected
+
+
+@pytest.mark.parametrize('url', [
+    'https://x.com/IDF/status/1790000000000000001?s=20',
+    'https://mobile.twitter.com/IDF/statuses/1790000000000000001',
+    'https://nitter.net/IDF/status/1790000000000000001#m',
+    'http://twitter.com/IDF/status/1790000000000000001/photo/1',
+])
+def test_tweet_links_become_twitter_status_urls(url):
+    assert canonical_url(url) == 'https://twitter.com/IDF/status/1790000000000000001'
+
+
+def test_other_twitter_pages_move_to_twitter_com():
+    assert canonical_url('https://x.com/IDF/') == 'https://twitter.com/IDF'
+
+
+@pytest.mark.parametrize('url', ['', 'mailto:desk@example.com', 'not a url', 'http://[::1'])
+def test_non_web_urls_pass_through(url):
+    assert canonical_url(url) == url
+
+
+def test_none_is_empty():
+    assert canonical_url(None) == ''
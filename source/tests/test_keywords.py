@@ -0,0 +1,25 @@
+from spz_common import build_keyword_trie, match_keywords, normalize_text, token_variants
+
+TRIE = build_keyword_trie({'medium': ['iran'], 'high': ['israel', 'idf']},
+                          {'איראן': 'iran', 'ישראל': 'israel', 'צה"ל': 'idf'})
+
+
+def test_hebrew_plural_endings_match_singular_keyword():
+    assert match_keywords('האיראנים תקפו', TRIE) == {'medium': {'iran'}}
+    assert match_keywords('מתיישבים ישראלים', TRIE) == {'high': {'israel'}}
+    assert match_keywords('הממשלה הישראלית', TRIE) == {'high': {'israel'}}
+
+
+def test_short_words_keep_their_ending():
+    assert 'ב' not in token_variants(normalize_text('בית'))
+    assert 'של' not in token_variants(normalize_text('שלות'))
+
+
+def test_prefixes_niqqud_and_acronyms():
+    assert match_keywords('וּבְיִשְׂרָאֵל', TRIE) == {'high': {'israel'}}
+    assert match_keywords('דובר צה״ל', TRIE) == {'high': {'idf'}}
+
+
+def test_english_plurals_and_no_substring_hits():
+    assert match_keywords('Israels allies', TRIE) == {'high': {'israel'}}
+    assert match_keywords('Iranian media', TRIE) == {}
@@ -0,0 +1,73 @@
+import pytest
+
+ATOM = b'''<?xml version="1.0" encoding="utf-8"?>
+<feed xmlns="http://www.w3.org/2005/Atom">
+  <title>Example</title>
+  <entry>
+    <title>Atom entry</title>
+    <link rel="enclosure" type="image/jpeg" href="https://example.com/a.jpg"/>
+    <link rel="alternate" href="https://example.com/a"/>
+    <id>tag:example.com,2026:a</id>
+    <updated>2026-10-01T08:30:00Z</updated>
+    <author><name>Dana</name></author>
+    <content type="html">Full text</content>
+  </entry>
+</feed>'''
+
+RDF = b'''<?xml version="1.0"?>
+<rdf:RDF xmlns:rdf="http://www.w3.org/1999/02/22-rdf-syntax-ns#"
+         xmlns="http://purl.org/rss/1.0/" xmlns:dc="http://purl.org/dc/elements/1.1/">
+  <channel rdf:about="https://example.com/"><title>Example</title></channel>
+  <item rdf:about="https://example.com/b">
+    <title>RDF item</title>
+    <link>https://example.com/b</link>
+    <description>Summary</description>
+    <dc:date>2026-10-01T08:30:00+00:00</dc:date>
+    <dc:creator>Noam</dc:creator>
+  </item>
+</rdf:RDF>'''
+
+BROKEN_RSS = b'''<?xml version="1.0"?>
+<rss version="2.0" xmlns:media="http://search.yahoo.com/mrss/"><channel><title>Example</title>
+  <item><title>Good one</title><link>https://example.com/1</link></item>
+  <item><title>Bad & unescaped <b>markup</title><link>https://example.com/2</link></item>
+  <item><title>Good two</title><link>https://example.com/3</link><media:thumbnail url="x"/></item>
+</channel>'''
+
+
+@pytest.fixture
+def parse(rss, monkeypatch):
+    monkeypatch.setitem(rss.CONFIG, 'xml_parser', 'etree')
+    return rss.parse_feed
+
+
+def test_atom_entry(parse):
+    items, dropped = parse(ATOM)
+    assert dropped == 0
+    assert items == [{
+        'title': 'Atom entry',
+        'link': 'https://example.com/a',
+        'description': 'Full text',
+        'published': 'Thu, 01 Oct 2026 08:30:00 +0000',
+        'author': 'Dana',
+        'enclosure': 'https://example.com/a.jpg',
+    }]
+
+
+def test_rdf_item(parse):
+    items, dropped = parse(RDF)
+    assert dropped == 0
+    assert [(i['title'], i['link'], i['description'], i['author']) for i in items] == [
+        ('RDF item', 'https://example.com/b', 'Summary', 'Noam')]
+    assert items[0]['published'] == 'Thu, 01 Oct 2026 08:30:00 +0000'
+
+
+def test_malformed_item_only_loses_itself(parse):
+    items, dropped = parse(BROKEN_RSS)
+    assert [i['title'] for i in items] == ['Good one', 'Good two']
+    assert dropped == 1
+
+
+def test_not_a_feed(parse):
+    with pytest.raises(ValueError):
+        parse(b'<html><body>Moved</body></html>')
@@ -0,0 +1,19 @@
+def test_snowflake_ms_decodes_creation_time(twitter):
+    # 2026-10-01 08:30:00.123 UTC, worker/sequence bits set
+    created_ms = 1790843400123
+    tweet_id = ((created_ms - twitter.TWITTER_EPOCH_MS) << 22) | 0x2abcd
+    assert twitter.snowflake_ms(tweet_id) == created_ms
+    assert twitter.snowflake_ms(str(tweet_id)) == created_ms
+
+
+def test_snowflake_ms_rejects_pre_snowflake_and_bad_ids(twitter):
+    assert twitter.snowflake_ms('20') is None               # 2006 sequential ID
+    assert twitter.snowflake_ms('') is None
+    assert twitter.snowflake_ms('abc') is None
+    assert twitter.snowflake_ms(None) is None
+
+
+def test_tweet_snowflake_orders_by_status_id(twitter):
+    tweets = [{'id': '1790000000000000005'}, {'id': ''}, {'id': '1790000000000000001'}]
+    assert [twitter.tweet_snowflake(t) for t in tweets] == [1790000000000000005, 0, 1790000000000000001]
+    assert twitter.tweet_snowflake({}) == 0
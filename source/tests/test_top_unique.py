@@ -0,0 +1,43 @@
+import heapq
+import random
+
+from spz_common import top_unique
+
+
+def brute_force(items, n, rank, identity):
+    """Best copy per identity, then heapq.nlargest over those"""
+    best = {}
+    for item in items:
+        key = identity(item)
+        if key not in best or rank(item) > rank(best[key]):
+            best[key] = item
+    return heapq.nlargest(n, best.values(), key=rank)
+
+
+def test_keeps_best_copy_of_each_identity():
+    items = [('a', 5), ('b', 3), ('a', 9), ('c', 7), ('b', 8), ('d', 1)]
+    assert top_unique(items, 3, rank=lambda i: i[1], identity=lambda i: i[0]) == [
+        ('a', 9), ('b', 8), ('c', 7)]
+
+
+def test_dropped_identity_competes_again():
+    items = [('a', 1), ('b', 5), ('c', 6), ('a', 10)]
+    assert top_unique(items, 2, rank=lambda i: i[1], identity=lambda i: i[0]) == [
+        ('a', 10), ('c', 6)]
+
+
+def test_ties_keep_first_seen_order():
+    items = [('a', 1), ('b', 1), ('c', 1)]
+    assert top_unique(items, 2, rank=lambda i: i[1], identity=lambda i: i[0]) == [
+        ('a', 1), ('b', 1)]
+
+
+def test_matches_brute_force():
+    rng = random.Random(7)
+    for _ in range(500):
+        items = [(rng.randrange(12), rng.randrange(20)) for _ in range(rng.randrange(60))]
+        n = rng.randrange(1, 8)
+        args = dict(rank=lambda i: i[1], identity=lambda i: i[0])
+        result = top_unique(items, n, **args)
+        assert [i[1] for i in result] == [i[1] for i in brute_force(items, n, **args)]
+        assert len({i[0] for i in result}) == len(result)